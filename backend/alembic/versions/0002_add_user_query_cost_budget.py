@@ -0,0 +1,24 @@
+"""Add per-user query cost budget
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('query_cost_budget', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'query_cost_budget')
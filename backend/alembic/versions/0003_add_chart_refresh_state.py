@@ -0,0 +1,37 @@
+"""Add chart refresh state for incremental chart refresh
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('chart_refresh_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dashboard_id', sa.Integer(), nullable=False),
+        sa.Column('chart_index', sa.Integer(), nullable=False),
+        sa.Column('config_hash', sa.String(length=64), nullable=False),
+        sa.Column('watermark', sa.JSON(), nullable=True),
+        sa.Column('partials', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chart_refresh_state_id'), 'chart_refresh_state', ['id'], unique=False)
+    op.create_index(op.f('ix_chart_refresh_state_dashboard_id'), 'chart_refresh_state', ['dashboard_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chart_refresh_state_dashboard_id'), table_name='chart_refresh_state')
+    op.drop_index(op.f('ix_chart_refresh_state_id'), table_name='chart_refresh_state')
+    op.drop_table('chart_refresh_state')
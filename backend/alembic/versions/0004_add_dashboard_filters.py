@@ -0,0 +1,24 @@
+"""Add dashboard-level filter parameters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('dashboards', sa.Column('filters', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('dashboards', 'filters')
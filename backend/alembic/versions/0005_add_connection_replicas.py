@@ -0,0 +1,24 @@
+"""Add read replica endpoints to database connections
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('database_connections', sa.Column('replicas', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('database_connections', 'replicas')
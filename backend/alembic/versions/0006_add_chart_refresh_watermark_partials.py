@@ -0,0 +1,24 @@
+"""Keep the partial aggregates at the incremental watermark separately
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chart_refresh_state', sa.Column('watermark_partials', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chart_refresh_state', 'watermark_partials')
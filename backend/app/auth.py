@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 import os
 
 from app.database import get_db, User
+from app.tracing import tracer
+from app.scheduler import scheduler
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -36,24 +38,38 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
+    return get_user_from_token(credentials.credentials, db)
+
+def get_user_from_token(token: str, db: Session) -> User:
+    """Resolve a bearer token; also used by streaming endpoints that take the token as a query parameter"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with tracer.span("auth.get_current_user"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            raise credentials_exception
+        # Queries issued by this request are queued fairly per user
+        scheduler.set_user(user.id)
+        return user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
 
 def authenticate_user(db: Session, email: str, password: str):
     user = db.query(User).filter(User.email == email).first()
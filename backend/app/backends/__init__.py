@@ -0,0 +1,5 @@
+from app.backends.base import Backend, BackendRegistry
+from app.backends.sql import SqlBackend, SQLITE_BACKED_TYPES
+from app.backends.mongo import MongoBackend
+from app.backends.redis import RedisBackend
+from app.backends.cassandra import CassandraBackend
@@ -0,0 +1,112 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.schemas import ColumnInfo, ConnectionTestResult, TableInfo
+from app.singleflight import singleflight
+
+
+class Backend(ABC):
+    """A family of database types: connection settings, introspection, execution, paging and plans
+
+    connect, introspect, execute and browse are abstract, so an incomplete adapter fails when it is
+    instantiated for registration instead of on its first request.
+    """
+
+    db_types: Tuple[str, ...] = ()
+    # Whether execute binds params into a server-side prepared statement (chart templates need this)
+    supports_prepared = False
+
+    def connection_data(self, db_type: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Driver settings from connection fields (host, port, database_name, username, password, ...)"""
+        return {
+            "db_type": db_type,
+            "host": fields.get("host"),
+            "port": fields.get("port"),
+            "database_name": fields.get("database_name"),
+            "username": fields.get("username"),
+            "password": fields.get("password")
+        }
+
+    def validate(self, db_type: str, fields: Dict[str, Any]):
+        """Reject fields an unsaved connection cannot be tested with"""
+        if not all(fields.get(name) for name in ("host", "database_name", "username")):
+            raise ValueError("Host, database, and username are required")
+
+    def requires_password(self, db_type: str) -> bool:
+        """Whether connecting to a saved connection checks the user's password against the stored one"""
+        return True
+
+    def is_read_query(self, query: Any) -> bool:
+        """Whether identical concurrent executions can share one result"""
+        return isinstance(query, str) and singleflight.is_read_statement(query)
+
+    @abstractmethod
+    async def connect(self, connection_data: dict) -> ConnectionTestResult:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def introspect(self, connection_data: dict) -> List[TableInfo]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def execute(self, connection_data: dict, query: str, limit: int = 1000,
+                      params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                      flatten: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """One page of a table, collection or key group as {columns, rows, total_count, limit, offset}"""
+        raise NotImplementedError
+
+    async def count(self, connection_data: dict, table_name: str) -> int:
+        return (await self.browse(connection_data, table_name, 1, 0))["total_count"]
+
+    async def stream(self, connection_data: dict, query: Any, batch_size: int = 10000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield result rows in batches; backends without cursors return one bounded batch"""
+        result = await self.execute(connection_data, query, batch_size)
+        if not result["success"]:
+            raise ValueError(result.get("error") or "Query failed")
+        yield result["data"]
+
+    async def explain(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        raise ValueError(f"EXPLAIN is not supported for {connection_data.get('db_type')}")
+
+    def table_infos(self, tables: List[Dict[str, Any]]) -> List[TableInfo]:
+        return [TableInfo(
+            name=table["name"],
+            row_count=table.get("row_count", 0),
+            columns=[ColumnInfo(
+                name=col["name"],
+                type=col["type"],
+                nullable=col.get("nullable", True),
+                primary_key=col.get("primary_key", False),
+                default_value=None,
+                presence=col.get("presence")
+            ) for col in table.get("columns", [])]
+        ) for table in tables]
+
+
+class BackendRegistry:
+    """db_type -> the backend that serves it"""
+
+    def __init__(self):
+        self._backends: Dict[str, Backend] = {}
+
+    def register(self, backend: Backend):
+        if not isinstance(backend, Backend):
+            raise TypeError(f"Expected a Backend instance, got {backend!r}")
+        for db_type in backend.db_types:
+            self._backends[db_type] = backend
+
+    def get(self, db_type: Optional[str]) -> Backend:
+        backend = self._backends.get(db_type)
+        if backend is None:
+            raise ValueError(f"Unsupported database type: {db_type}")
+        return backend
+
+    def __contains__(self, db_type: Optional[str]) -> bool:
+        return db_type in self._backends
+
+    def types(self) -> List[str]:
+        return list(self._backends)
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.backends.base import Backend
+from app.cassandra_manager import cassandra_manager
+from app.schemas import ConnectionTestResult, TableInfo
+
+
+class CassandraBackend(Backend):
+    """CQL through the cached token-aware sessions of cassandra_manager"""
+
+    db_types = ("cassandra",)
+
+    async def connect(self, connection_data: dict) -> ConnectionTestResult:
+        return await cassandra_manager.test_connection(connection_data)
+
+    async def introspect(self, connection_data: dict) -> List[TableInfo]:
+        return self.table_infos(await cassandra_manager.get_tables(connection_data))
+
+    async def execute(self, connection_data: dict, query: str, limit: int = 1000,
+                      params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                      flatten: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        return await cassandra_manager.execute_query(connection_data, query, limit, params, page_token)
+
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await cassandra_manager.get_table_data(connection_data, table_name, limit, offset)
+
+    async def stream(self, connection_data: dict, query: Any, batch_size: int = 10000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Driver pages, fetched one at a time off the event loop"""
+        pages = cassandra_manager.iter_pages(connection_data, query.strip().rstrip(";"), page_size=batch_size)
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield [cassandra_manager.serialize_row(row) for row in page[0]]
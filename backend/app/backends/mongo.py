@@ -0,0 +1,85 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.backends.base import Backend
+from app.mongo_manager import mongo_manager
+from app.mongo_shell import mongo_shell
+from app.schemas import ConnectionTestResult, TableInfo
+
+
+class MongoBackend(Backend):
+    """MongoDB and Atlas through the cached Motor clients of mongo_manager"""
+
+    db_types = ("mongodb", "mongodb-atlas")
+
+    def connection_data(self, db_type: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        if db_type == "mongodb-atlas":
+            if not fields.get("connection_string"):
+                raise ValueError("MongoDB Atlas connection string not found")
+            return {
+                "db_type": db_type,
+                "connection_string": fields["connection_string"],
+                "database_name": fields.get("database_name")
+            }
+        return super().connection_data(db_type, fields)
+
+    def validate(self, db_type: str, fields: Dict[str, Any]):
+        if db_type == "mongodb-atlas":
+            if not fields.get("connection_string"):
+                raise ValueError("MongoDB Atlas requires a connection string")
+            return
+        super().validate(db_type, fields)
+
+    def requires_password(self, db_type: str) -> bool:
+        return db_type != "mongodb-atlas"
+
+    def is_read_query(self, query: Any) -> bool:
+        if not isinstance(query, str):
+            query = json.dumps(query, default=str)
+        # $out/$merge stages write their results
+        return "$out" not in query and "$merge" not in query
+
+    def parse_query(self, query: Any) -> Dict[str, Any]:
+        """Accept a shell string, a JSON string or an already parsed query dict"""
+        if isinstance(query, str):
+            query_dict = mongo_shell.parse(query)
+            if query_dict is not None:
+                return query_dict
+            # Otherwise a query document, in strict or relaxed JSON
+            return mongo_shell.parse_value(query)
+        return query
+
+    async def connect(self, connection_data: dict) -> ConnectionTestResult:
+        if connection_data.get("db_type") == "mongodb-atlas":
+            return await mongo_manager.test_atlas_connection(connection_data)
+        return await mongo_manager.test_connection(connection_data)
+
+    async def introspect(self, connection_data: dict) -> List[TableInfo]:
+        return self.table_infos(await mongo_manager.get_collections(connection_data))
+
+    async def execute(self, connection_data: dict, query: str, limit: int = 1000,
+                      params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                      flatten: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            query_dict = self.parse_query(query)
+            # Async driver: no worker thread runs this query alone, so it is traced rather than cProfiled
+            return await mongo_manager.execute_query(connection_data, query_dict, limit, flatten)
+        except (json.JSONDecodeError, ValueError, SyntaxError) as e:
+            return {
+                "success": False,
+                "data": [],
+                "columns": [],
+                "row_count": 0,
+                "execution_time": 0,
+                "error": f"Invalid query format for MongoDB: {e}"
+            }
+
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await mongo_manager.get_collection_data(connection_data, table_name, limit, offset)
+
+    async def stream(self, connection_data: dict, query: Any, batch_size: int = 10000) -> AsyncIterator[List[Dict[str, Any]]]:
+        async for documents in mongo_manager.iter_documents(connection_data, self.parse_query(query), batch_size):
+            yield documents
+
+    async def explain(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        return await mongo_manager.explain_query(connection_data, self.parse_query(query), limit)
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List, Optional
+
+from app.backends.base import Backend
+from app.redis_manager import redis_manager
+from app.schemas import ConnectionTestResult, TableInfo
+
+
+class RedisBackend(Backend):
+    """Read-only Redis commands and SCAN-based key groups through redis_manager"""
+
+    db_types = ("redis",)
+
+    def validate(self, db_type: str, fields: Dict[str, Any]):
+        # Host and port default to localhost:6379 and the database to 0; no username is needed
+        pass
+
+    def connection_data(self, db_type: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        data = super().connection_data(db_type, fields)
+        data["database_name"] = data["database_name"] or "0"
+        return data
+
+    def is_read_query(self, query: Any) -> bool:
+        # redis_manager refuses anything outside its read-only command list
+        return True
+
+    async def connect(self, connection_data: dict) -> ConnectionTestResult:
+        return await redis_manager.test_connection(connection_data)
+
+    async def introspect(self, connection_data: dict) -> List[TableInfo]:
+        return self.table_infos(await redis_manager.get_keyspace(connection_data))
+
+    async def execute(self, connection_data: dict, query: str, limit: int = 1000,
+                      params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                      flatten: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        # Async driver: no worker thread runs this query alone, so it is traced rather than cProfiled
+        return await redis_manager.execute_query(connection_data, query, limit)
+
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await redis_manager.get_key_data(connection_data, table_name, limit, offset)
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.backends.base import Backend
+from app.replicas import replica_router, REPLICA_TYPES
+from app.schemas import ConnectionTestResult, TableInfo
+
+# Connection types whose data lives in a SQLite file (imported flat files are converted to SQLite)
+SQLITE_BACKED_TYPES = ("sqlite", "flatfile")
+# Batches a SQL stream may fetch ahead of its consumer
+SQL_STREAM_PREFETCH = int(os.getenv("SQL_STREAM_PREFETCH", "2"))
+
+
+class SqlBackend(Backend):
+    """PostgreSQL, MySQL and SQLite through the pooled SQLAlchemy engines of DatabaseManager"""
+
+    db_types = ("postgresql", "mysql") + SQLITE_BACKED_TYPES
+    supports_prepared = True
+
+    def __init__(self, manager):
+        self.manager = manager
+        replica_router.attach(manager)
+
+    def connection_data(self, db_type: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        if db_type in SQLITE_BACKED_TYPES:
+            if not fields.get("file_path"):
+                raise ValueError("SQLite file path not found")
+            return {"db_type": "sqlite", "database_name": fields["file_path"]}
+        data = super().connection_data(db_type, fields)
+        if db_type in REPLICA_TYPES and fields.get("replicas"):
+            data["replicas"] = fields["replicas"]
+        return data
+
+    def validate(self, db_type: str, fields: Dict[str, Any]):
+        if db_type in SQLITE_BACKED_TYPES:
+            if not fields.get("file_path"):
+                raise ValueError("SQLite requires a file path")
+            return
+        super().validate(db_type, fields)
+
+    def requires_password(self, db_type: str) -> bool:
+        return db_type not in SQLITE_BACKED_TYPES
+
+    async def connect(self, connection_data: dict) -> ConnectionTestResult:
+        return await self.manager.test_sql_connection(connection_data)
+
+    async def introspect(self, connection_data: dict) -> List[TableInfo]:
+        return await asyncio.to_thread(self.manager.get_sql_tables, connection_data)
+
+    async def execute(self, connection_data: dict, query: str, limit: int = 1000,
+                      params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                      flatten: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        async def run(target: dict) -> Dict[str, Any]:
+            # The driver call blocks, so it runs in a worker thread instead of stalling the event loop
+            return await asyncio.to_thread(self.manager.execute_sql, target, query, limit, params, prepared)
+
+        if not self.is_read_query(query):
+            return await run(connection_data)
+        return await replica_router.read(connection_data, run, failed=lambda result: not result["success"])
+
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await replica_router.read(
+            connection_data,
+            lambda target: asyncio.to_thread(self.manager.get_sql_table_data, target, table_name, limit, offset)
+        )
+
+    async def count(self, connection_data: dict, table_name: str) -> int:
+        return await asyncio.to_thread(self.manager.count_sql_rows, connection_data, table_name)
+
+    async def stream(self, connection_data: dict, query: Any, batch_size: int = 10000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Server-side cursor batches; one dedicated thread owns the connection and cursor for the whole stream"""
+        loop = asyncio.get_running_loop()
+        batches: asyncio.Queue = asyncio.Queue()
+        # The producer fetches at most this many batches ahead of the consumer
+        credits = threading.Semaphore(SQL_STREAM_PREFETCH)
+        stop = threading.Event()
+
+        def deliver(item):
+            if not stop.is_set():
+                loop.call_soon_threadsafe(batches.put_nowait, item)
+
+        def produce():
+            try:
+                # DBAPI connections such as sqlite3's must stay on the thread that opened them
+                cursor = self.manager.iter_query_batches(connection_data, query, batch_size)
+                try:
+                    while True:
+                        credits.acquire()
+                        if stop.is_set():
+                            return
+                        batch = next(cursor, None)
+                        if batch is None:
+                            break
+                        deliver(batch)
+                finally:
+                    cursor.close()
+                deliver(None)
+            except Exception as e:
+                deliver(e)
+
+        # Copy the context like asyncio.to_thread, so connection spans join the current trace
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                    name="sql-stream", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = await batches.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                credits.release()
+                columns, rows = item
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            stop.set()
+            credits.release()
+            # Wait for the cursor and connection to be released before the stream counts as closed
+            await asyncio.to_thread(producer.join)
+
+    async def explain(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.manager.explain_sql, connection_data,
+                                       self.manager.prepare_sql_query(connection_data, query, limit))
@@ -0,0 +1,388 @@
+import asyncio
+import base64
+import datetime
+import decimal
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.profiling import profiler
+from app.schemas import ConnectionTestResult
+from app.tracing import tracer
+
+# Rows per page requested from the coordinator; a page is the most ever held in memory per query
+CASSANDRA_FETCH_SIZE = int(os.getenv("CASSANDRA_FETCH_SIZE", "1000"))
+CASSANDRA_SESSION_CACHE_SIZE = int(os.getenv("CASSANDRA_SESSION_CACHE_SIZE", "8"))
+# Prepared statements kept per session, least recently used evicted first
+CASSANDRA_PREPARED_CACHE_SIZE = int(os.getenv("CASSANDRA_PREPARED_CACHE_SIZE", "256"))
+# Local datacenter for DC-aware routing; empty lets the driver pick the first contact point's DC
+CASSANDRA_LOCAL_DC = os.getenv("CASSANDRA_LOCAL_DC") or None
+CASSANDRA_REQUEST_TIMEOUT = float(os.getenv("CASSANDRA_REQUEST_TIMEOUT", "30"))
+
+SYSTEM_KEYSPACES = {"system", "system_schema", "system_auth", "system_distributed", "system_traces",
+                    "system_views", "system_virtual_schema"}
+# DML can be prepared; DDL and other statements run as simple statements
+PREPARABLE_PATTERN = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+# Digest bytes prefixed to paging states so a token cannot be replayed against another query
+TOKEN_DIGEST_BYTES = 8
+
+
+class CassandraManager:
+    """Cached token-aware sessions, prepared-statement reuse and fetch_size paging for Cassandra"""
+
+    def __init__(self):
+        # (contact points, port, keyspace, username, password) -> (cluster, session), least recently used first
+        self._sessions: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # id(session) -> {query text: PreparedStatement}
+        self._prepared: Dict[int, "OrderedDict[str, Any]"] = {}
+        self._lock = threading.Lock()
+
+    def _session_key(self, connection_data: dict) -> tuple:
+        hosts = tuple(host.strip() for host in (connection_data.get("host") or "localhost").split(",") if host.strip())
+        return (hosts, int(connection_data.get("port") or 9042), connection_data.get("database_name") or None,
+                connection_data.get("username"), connection_data.get("password"))
+
+    def _create_session(self, key: tuple):
+        from cassandra.auth import PlainTextAuthProvider
+        from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
+        from cassandra.policies import DCAwareRoundRobinPolicy, TokenAwarePolicy
+        from cassandra.query import dict_factory
+
+        hosts, port, keyspace, username, password = key
+        profile = ExecutionProfile(
+            # Prepared statements carry their routing key, so requests go straight to a replica
+            load_balancing_policy=TokenAwarePolicy(DCAwareRoundRobinPolicy(local_dc=CASSANDRA_LOCAL_DC)),
+            row_factory=dict_factory,
+            request_timeout=CASSANDRA_REQUEST_TIMEOUT
+        )
+        cluster = Cluster(
+            list(hosts), port=port,
+            auth_provider=PlainTextAuthProvider(username=username, password=password) if username else None,
+            execution_profiles={EXEC_PROFILE_DEFAULT: profile}
+        )
+        try:
+            return cluster, cluster.connect(keyspace)
+        except Exception:
+            cluster.shutdown()
+            raise
+
+    def get_session(self, connection_data: dict):
+        """Shared session for the connection; callers must not shut it down"""
+        key = self._session_key(connection_data)
+        with self._lock:
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+                return self._sessions[key][1]
+
+        # Connecting discovers the ring, which is slow: done outside the lock
+        cluster, session = self._create_session(key)
+        evicted = None
+        with self._lock:
+            if key in self._sessions:
+                evicted = (cluster, session)
+                session = self._sessions[key][1]
+            else:
+                self._sessions[key] = (cluster, session)
+                if len(self._sessions) > CASSANDRA_SESSION_CACHE_SIZE:
+                    _, evicted = self._sessions.popitem(last=False)
+            if evicted:
+                self._prepared.pop(id(evicted[1]), None)
+        if evicted:
+            evicted[0].shutdown()
+        return session
+
+    def _statement(self, session, query: str, params: Optional[Dict[str, Any]], fetch_size: int):
+        """A bound prepared statement for DML, or a simple statement with its parameters for anything else"""
+        from cassandra.query import SimpleStatement
+
+        if not PREPARABLE_PATTERN.match(query):
+            return SimpleStatement(query, fetch_size=fetch_size), params or None
+        with self._lock:
+            cache = self._prepared.setdefault(id(session), OrderedDict())
+            prepared = cache.get(query)
+            if prepared is not None:
+                cache.move_to_end(query)
+        if prepared is None:
+            with tracer.span("cassandra.prepare"):
+                prepared = session.prepare(query)
+            with self._lock:
+                cache[query] = prepared
+                if len(cache) > CASSANDRA_PREPARED_CACHE_SIZE:
+                    cache.popitem(last=False)
+        statement = prepared.bind(params or ())
+        statement.fetch_size = fetch_size
+        return statement, None
+
+    def _digest(self, query: str) -> bytes:
+        return hashlib.sha1(query.encode()).digest()[:TOKEN_DIGEST_BYTES]
+
+    def encode_page_token(self, query: str, paging_state: Optional[bytes]) -> Optional[str]:
+        if not paging_state:
+            return None
+        return base64.urlsafe_b64encode(self._digest(query) + paging_state).decode("ascii")
+
+    def decode_page_token(self, query: str, page_token: Optional[str]) -> Optional[bytes]:
+        if not page_token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(page_token.encode("ascii"))
+        except (ValueError, UnicodeEncodeError):
+            raise ValueError("Invalid page token")
+        if raw[:TOKEN_DIGEST_BYTES] != self._digest(query):
+            raise ValueError("Page token does not belong to this query")
+        return raw[TOKEN_DIGEST_BYTES:]
+
+    def iter_pages(self, connection_data: dict, query: str, params: Optional[Dict[str, Any]] = None,
+                   paging_state: Optional[bytes] = None,
+                   page_size: int = CASSANDRA_FETCH_SIZE) -> Iterator[Tuple[List[Dict[str, Any]], Optional[bytes]]]:
+        """Yield (rows, paging state after them) one driver page at a time, so big partitions never sit in memory"""
+        session = self.get_session(connection_data)
+        while True:
+            statement, values = self._statement(session, query, params, page_size)
+            with tracer.span("cassandra.fetch_page", fetch_size=page_size):
+                result = session.execute(statement, values, paging_state=paging_state)
+            paging_state = result.paging_state
+            requested = yield result.current_rows, paging_state
+            if not paging_state:
+                return
+            # The consumer may ask for a smaller next page with send(); paging state is independent of page size
+            page_size = requested or page_size
+
+    def _collect(self, connection_data: dict, query: str, limit: int, params: Optional[Dict[str, Any]],
+                 paging_state: Optional[bytes], skip: int = 0) -> Tuple[List[Dict[str, Any]], Optional[bytes]]:
+        """Up to limit rows after skipping skip rows, and the paging state right after the last one returned"""
+        rows: List[Dict[str, Any]] = []
+        pages = self.iter_pages(connection_data, query, params, paging_state,
+                                min(skip + limit, CASSANDRA_FETCH_SIZE) or 1)
+        page, paging_state = next(pages)
+        while True:
+            if skip:
+                dropped = min(skip, len(page))
+                page, skip = page[dropped:], skip - dropped
+            rows.extend(self.serialize_row(row) for row in page)
+            remaining = skip + limit - len(rows)
+            if remaining <= 0 or not paging_state:
+                return rows, paging_state
+            # Never fetch past the limit, so the paging state always lands exactly after the last row
+            page, paging_state = pages.send(min(remaining, CASSANDRA_FETCH_SIZE))
+
+    def _serialize_value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if isinstance(value, (bytes, bytearray)):
+            return "0x" + bytes(value).hex()
+        if hasattr(value, "items"):
+            return {str(key): self._serialize_value(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple, set, frozenset)) or hasattr(value, "__iter__"):
+            return [self._serialize_value(item) for item in value]
+        # cassandra.util.Date, Time, Duration and the like
+        return str(value)
+
+    def serialize_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """JSON-safe copy of a driver row"""
+        return {name: self._serialize_value(value) for name, value in row.items()}
+
+    def _execute(self, connection_data: dict, query: str, limit: int, params: Optional[Dict[str, Any]],
+                 page_token: Optional[str]) -> Dict[str, Any]:
+        start_time = time.time()
+        try:
+            query = query.strip().rstrip(";")
+            rows, paging_state = self._collect(connection_data, query, limit, params,
+                                               self.decode_page_token(query, page_token))
+            columns = list(dict.fromkeys(name for row in rows for name in row))
+            return {
+                "success": True,
+                "data": rows,
+                "columns": [{"name": name, "type": "string"} for name in columns],
+                "row_count": len(rows),
+                "next_page_token": self.encode_page_token(query, paging_state),
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "data": [],
+                "columns": [],
+                "row_count": 0,
+                "execution_time": int((time.time() - start_time) * 1000),
+                "error": str(e)
+            }
+
+    async def execute_query(self, connection_data: dict, query: str, limit: int = 1000,
+                            params: Optional[Dict[str, Any]] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+        """Execute a CQL statement; next_page_token resumes where this page ended"""
+        # The driver blocks on each page, so paging runs in a worker thread
+        execute = profiler.wrap(self._execute, "execute_query", db_type="cassandra", query=str(query)[:500],
+                                limit=limit, trace_id=tracer.current_trace_id())
+        return await asyncio.to_thread(execute, connection_data, query, limit, params, page_token)
+
+    def _quote(self, identifier: str) -> str:
+        return ".".join(part if part.startswith('"') else '"' + part.replace('"', '""') + '"'
+                        for part in identifier.split("."))
+
+    def _get_tables(self, connection_data: dict) -> List[Dict[str, Any]]:
+        session = self.get_session(connection_data)
+        keyspace = connection_data.get("database_name")
+        with tracer.span("cassandra.system_schema", keyspace=keyspace):
+            if keyspace:
+                table_rows = session.execute("SELECT keyspace_name, table_name FROM system_schema.tables "
+                                             "WHERE keyspace_name = %s", (keyspace,))
+                column_rows = session.execute("SELECT keyspace_name, table_name, column_name, kind, position, type "
+                                              "FROM system_schema.columns WHERE keyspace_name = %s", (keyspace,))
+            else:
+                table_rows = session.execute("SELECT keyspace_name, table_name FROM system_schema.tables")
+                column_rows = session.execute("SELECT keyspace_name, table_name, column_name, kind, position, type "
+                                              "FROM system_schema.columns")
+            # Partition estimates per token range; exact counts would need a full scan of every table
+            estimates: Dict[Tuple[str, str], int] = {}
+            try:
+                if keyspace:
+                    estimate_rows = session.execute("SELECT keyspace_name, table_name, partitions_count "
+                                                    "FROM system.size_estimates WHERE keyspace_name = %s", (keyspace,))
+                else:
+                    estimate_rows = session.execute("SELECT keyspace_name, table_name, partitions_count "
+                                                    "FROM system.size_estimates")
+                for row in estimate_rows:
+                    table_key = (row["keyspace_name"], row["table_name"])
+                    estimates[table_key] = estimates.get(table_key, 0) + (row["partitions_count"] or 0)
+            except Exception:
+                pass
+
+        kind_order = {"partition_key": 0, "clustering": 1, "static": 2, "regular": 3}
+        columns: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for row in sorted(column_rows, key=lambda r: (kind_order.get(r["kind"], 4), r["position"], r["column_name"])):
+            columns.setdefault((row["keyspace_name"], row["table_name"]), []).append({
+                "name": row["column_name"],
+                "type": row["type"],
+                "nullable": row["kind"] not in ("partition_key", "clustering"),
+                "primary_key": row["kind"] in ("partition_key", "clustering")
+            })
+
+        tables = []
+        for row in table_rows:
+            if not keyspace and row["keyspace_name"] in SYSTEM_KEYSPACES:
+                continue
+            table_key = (row["keyspace_name"], row["table_name"])
+            tables.append({
+                "name": row["table_name"] if keyspace else f"{row['keyspace_name']}.{row['table_name']}",
+                "row_count": estimates.get(table_key, 0),
+                "columns": columns.get(table_key, [])
+            })
+        return tables
+
+    async def get_tables(self, connection_data: dict) -> List[Dict[str, Any]]:
+        """Tables and columns from system_schema, with partition estimates from system.size_estimates"""
+        get_tables = profiler.wrap(self._get_tables, "get_tables", db_type="cassandra",
+                                   trace_id=tracer.current_trace_id())
+        return await asyncio.to_thread(get_tables, connection_data)
+
+    def _get_table_data(self, connection_data: dict, table_name: str, limit: int, offset: int) -> Dict[str, Any]:
+        query = f"SELECT * FROM {self._quote(table_name)}"
+        # No OFFSET in CQL: skipped rows are paged through and dropped, never held all at once
+        rows, paging_state = self._collect(connection_data, query, limit, None, None, skip=offset)
+        columns = list(dict.fromkeys(name for row in rows for name in row))
+        return {
+            "columns": columns,
+            "rows": [[row.get(column) for column in columns] for row in rows],
+            "total_count": offset + len(rows) + (1 if paging_state else 0),
+            "limit": limit,
+            "offset": offset
+        }
+
+    async def get_table_data(self, connection_data: dict, table_name: str,
+                             limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._get_table_data, connection_data, table_name, limit, offset)
+
+    async def test_connection(self, connection_data: dict) -> ConnectionTestResult:
+        """Test Cassandra connection"""
+        try:
+            from cassandra.cluster import Cluster
+            from cassandra.auth import PlainTextAuthProvider
+            
+            start_time = time.time()
+            
+            # First try without authentication
+            try:
+                cluster = Cluster(
+                    [connection_data.get("host", "localhost")],
+                    port=connection_data.get("port", 9042),
+                    auth_provider=None
+                )
+                
+                session = cluster.connect()
+                
+                # Test connection with a simple query
+                session.execute("SELECT release_version FROM system.local")
+                
+                latency = int((time.time() - start_time) * 1000)
+                session.shutdown()
+                cluster.shutdown()
+                
+                return ConnectionTestResult(
+                    success=True,
+                    message="Cassandra connection successful (no authentication)",
+                    latency=latency
+                )
+            except Exception as e1:
+                # If no credentials provided and connection failed
+                if not (connection_data.get("username") and connection_data.get("password")):
+                    return ConnectionTestResult(
+                        success=False,
+                        message="Authentication required - please provide username and password",
+                        error="Cassandra connection failed without credentials"
+                    )
+                
+                # Try with authentication
+                try:
+                    auth_provider = PlainTextAuthProvider(
+                        username=connection_data["username"],
+                        password=connection_data["password"]
+                    )
+                    
+                    cluster = Cluster(
+                        [connection_data.get("host", "localhost")],
+                        port=connection_data.get("port", 9042),
+                        auth_provider=auth_provider
+                    )
+                    
+                    session = cluster.connect()
+                    
+                    # Test connection with a simple query
+                    session.execute("SELECT release_version FROM system.local")
+                    
+                    latency = int((time.time() - start_time) * 1000)
+                    session.shutdown()
+                    cluster.shutdown()
+                    
+                    return ConnectionTestResult(
+                        success=True,
+                        message="Cassandra connection successful",
+                        latency=latency
+                    )
+                except Exception as e2:
+                    return ConnectionTestResult(
+                        success=False,
+                        message="Cassandra connection failed",
+                        error=str(e2)
+                    )
+                    
+        except Exception as e:
+            return ConnectionTestResult(
+                success=False,
+                message="Cassandra connection failed",
+                error=str(e)
+            )
+
+# Create global instance
+cassandra_manager = CassandraManager()
@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.singleflight import QUOTED_PATTERN
+
+# :name bind variables, not ::casts or :name inside quoted text
+BIND_PATTERN = re.compile(r"(?<![:\w]):([A-Za-z_][A-Za-z0-9_]*)")
+
+
+class ChartTemplateManager:
+    """Resolves typed chart parameters and rewrites templates for server-side prepared statements"""
+
+    def bind_names(self, template: str) -> List[str]:
+        """Bind variables referenced by the template, in order of first appearance"""
+        names: List[str] = []
+        for index, part in enumerate(QUOTED_PATTERN.split(template)):
+            if index % 2 == 0:
+                for name in BIND_PATTERN.findall(part):
+                    if name not in names:
+                        names.append(name)
+        return names
+
+    def coerce(self, name: str, value: Any, param_type: str) -> Any:
+        """Convert a JSON value to the declared parameter type"""
+        if value is None:
+            return None
+        try:
+            if param_type == "integer":
+                if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                    raise ValueError
+                return int(value)
+            if param_type == "number":
+                if isinstance(value, bool):
+                    raise ValueError
+                return float(value)
+            if param_type == "boolean":
+                if isinstance(value, str) and value.lower() in ("true", "false", "1", "0"):
+                    return value.lower() in ("true", "1")
+                if not isinstance(value, bool):
+                    raise ValueError
+                return value
+            if param_type == "date":
+                return datetime.date.fromisoformat(str(value))
+            if param_type == "datetime":
+                return datetime.datetime.fromisoformat(str(value))
+            if not isinstance(value, (str, int, float)):
+                raise ValueError
+            return str(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Parameter '{name}' expects a value of type {param_type}")
+
+    def check_backend(self, backend):
+        """Templates are bound server-side; a backend that cannot do that would run them unbound"""
+        if not backend.supports_prepared:
+            raise ValueError("Parameterized charts are only supported for SQL databases")
+
+    def resolve(self, chart: Dict[str, Any], dashboard_filters: Optional[List[Dict[str, Any]]],
+                values: Dict[str, Any]) -> Dict[str, Any]:
+        """Bind values by precedence: request values, then dashboard filter defaults, then chart defaults"""
+        declared = {param["name"]: param for param in chart.get("parameters") or []}
+        filters = {flt["name"]: flt for flt in dashboard_filters or []}
+        referenced = self.bind_names(chart["query"])
+
+        unknown = [name for name in values if name not in declared and name not in filters]
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(unknown)}")
+        undeclared = [name for name in referenced if name not in declared and name not in filters]
+        if undeclared:
+            raise ValueError(f"Query references undeclared parameter(s): {', '.join(undeclared)}")
+
+        params = {}
+        for name in referenced:
+            param = declared.get(name) or filters[name]
+            param_type = param.get("type") or "string"
+            if name in values:
+                value = values[name]
+            elif name in filters and filters[name].get("default") is not None:
+                value = filters[name]["default"]
+            else:
+                value = param.get("default")
+            if value is None and param.get("required"):
+                raise ValueError(f"Parameter '{name}' is required")
+            params[name] = self.coerce(name, value, param_type)
+        return params
+
+    def statement_name(self, sql: str) -> str:
+        return "chart_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+    def to_positional(self, template: str) -> Tuple[str, List[str]]:
+        """Rewrite :name binds as $1..$n for PREPARE; returns the SQL and the parameter order"""
+        names = self.bind_names(template)
+        parts = QUOTED_PATTERN.split(template)
+        for index in range(0, len(parts), 2):
+            parts[index] = BIND_PATTERN.sub(lambda match: f"${names.index(match.group(1)) + 1}", parts[index])
+        return "".join(parts), names
+
+# Create global instance
+chart_templates = ChartTemplateManager()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -23,6 +23,7 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role = Column(String(50), default="user")
     is_active = Column(Boolean, default=True)
+    query_cost_budget = Column(Float, nullable=True)  # Max estimated planner cost per query
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class DatabaseConnection(Base):
@@ -31,7 +32,7 @@ class DatabaseConnection(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
     name = Column(String(255), nullable=False)
-    db_type = Column(String(50), nullable=False)  # postgresql, mysql, sqlite, mongodb-atlas
+    db_type = Column(String(50), nullable=False)  # postgresql, mysql, sqlite, mongodb-atlas, flatfile
     host = Column(String(255))
     port = Column(Integer)
     database_name = Column(String(255), nullable=False)
@@ -39,6 +40,7 @@ class DatabaseConnection(Base):
     password = Column(Text)  # Encrypted
     connection_string = Column(Text, nullable=True)  # For MongoDB Atlas
     file_path = Column(String(500), nullable=True)  # For SQLite file path
+    replicas = Column(JSON, nullable=True)  # Read replica endpoints for PostgreSQL/MySQL, passwords encrypted
     status = Column(String(50), default="disconnected")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -64,9 +66,22 @@ class Dashboard(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text)
     charts = Column(JSON)  # Store chart configurations
+    filters = Column(JSON, nullable=True)  # Dashboard-level filter parameters
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class ChartRefreshState(Base):
+    __tablename__ = "chart_refresh_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dashboard_id = Column(Integer, nullable=False, index=True)
+    chart_index = Column(Integer, nullable=False)
+    config_hash = Column(String(64), nullable=False)  # Invalidates the state when the chart changes
+    watermark = Column(JSON)
+    partials = Column(JSON)  # Partial aggregates per group, rows below the watermark
+    watermark_partials = Column(JSON)  # Partial aggregates of the rows at the watermark, recomputed each refresh
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # Database dependency
 def get_db():
     db = SessionLocal()
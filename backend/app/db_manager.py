@@ -6,12 +6,38 @@ import asyncio
 import time
 from typing import Dict, List, Any, Optional, Tuple
 from contextlib import contextmanager
+from collections import OrderedDict
 from app.schemas import ConnectionTestResult, TableInfo, ColumnInfo
 from app.mongo_manager import mongo_manager
+from app.tracing import tracer
+from app.profiling import profiler
+from app.sqlite_fts import sqlite_fts_manager
+from app.uploads import DATA_DIR
+from app.singleflight import singleflight
+from app.scheduler import scheduler
+from app.chart_templates import chart_templates
+from app.backends import BackendRegistry, SqlBackend, MongoBackend, RedisBackend, CassandraBackend
 from cryptography.fernet import Fernet
 from fastapi import HTTPException
 import os
 import re
+import json
+import threading
+
+# Explore search limits: wall-clock budget per search and rows examined by fallback scans
+SEARCH_TIME_LIMIT_MS = int(os.getenv("SEARCH_TIME_LIMIT_MS", "5000"))
+SEARCH_SCAN_LIMIT = int(os.getenv("SEARCH_SCAN_LIMIT", "100000"))
+
+# Uploaded SQLite datasets are opened read-only/immutable through a warm per-file pool
+SQLITE_READONLY_UPLOADS = os.getenv("SQLITE_READONLY_UPLOADS", "true").lower() in ("1", "true", "yes")
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+
+# PostgreSQL/MySQL engines are kept per connection string so pooled sessions (and their prepared statements) are reused
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_ENGINE_CACHE_SIZE = int(os.getenv("DB_ENGINE_CACHE_SIZE", "32"))
+PREPARED_STATEMENTS_PER_CONNECTION = int(os.getenv("PREPARED_STATEMENTS_PER_CONNECTION", "100"))
 
 class DatabaseManager:
     def __init__(self):
@@ -25,6 +51,18 @@ class DatabaseManager:
         key_bytes = dev_key.ljust(32, '0')[:32].encode()  # Ensure 32 bytes
         self.cipher_key = base64.urlsafe_b64encode(key_bytes)
         self.cipher = Fernet(self.cipher_key)
+        
+        # file path -> ((mtime_ns, size), engine) for read-only uploaded datasets
+        self._sqlite_engines: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._sqlite_engines_lock = threading.Lock()
+        # connection string -> engine, least recently used first
+        self._engines: "OrderedDict[str, Any]" = OrderedDict()
+        self._engines_lock = threading.Lock()
+        
+        # db_type -> backend; routing by database type happens only here
+        self.backends = BackendRegistry()
+        for backend in (SqlBackend(self), MongoBackend(), RedisBackend(), CassandraBackend()):
+            self.backends.register(backend)
     
     def sanitize_data_for_json(self, data):
         """Sanitize data to ensure it can be JSON serialized"""
@@ -71,6 +109,34 @@ class DatabaseManager:
             print(f"Warning: Password decryption failed: {e}")
             return encrypted_password
     
+    def connection_data_for(self, connection, password: Optional[str] = None) -> Dict[str, Any]:
+        """Driver settings for a saved connection; password overrides the stored one"""
+        if password is None and connection.password:
+            password = self.decrypt_password(connection.password)
+        fields = {
+            "host": connection.host,
+            "port": connection.port,
+            "database_name": connection.database_name,
+            "username": connection.username,
+            "password": password,
+            "connection_string": connection.connection_string,
+            "file_path": connection.file_path,
+            "replicas": [{**replica, "password": self.decrypt_password(replica["password"]) if replica.get("password") else None}
+                         for replica in connection.replicas or []]
+        }
+        return self.backends.get(connection.db_type).connection_data(connection.db_type, fields)
+    
+    def get_sqlite_file_path(self, connection_data: dict) -> str:
+        # For SQLite, use the stored file path
+        file_path = connection_data.get('file_path') or connection_data.get('database_name')
+        if not file_path:
+            raise ValueError("SQLite file path is required")
+        
+        # Convert relative paths to absolute paths
+        if not os.path.isabs(file_path):
+            file_path = os.path.abspath(file_path)
+        return file_path
+    
     def build_connection_string(self, connection_data: dict) -> str:
         db_type = connection_data["db_type"]
         
@@ -82,16 +148,7 @@ class DatabaseManager:
             return connection_string
         
         elif db_type == "sqlite":
-            # For SQLite, use the stored file path
-            file_path = connection_data.get('file_path') or connection_data.get('database_name')
-            if not file_path:
-                raise ValueError("SQLite file path is required")
-            
-            # Convert relative paths to absolute paths
-            if not os.path.isabs(file_path):
-                file_path = os.path.abspath(file_path)
-            
-            return f"sqlite:///{file_path}"
+            return f"sqlite:///{self.get_sqlite_file_path(connection_data)}"
         
         # Map localhost to Docker service names when running in container
         host = connection_data.get('host', 'localhost')
@@ -137,14 +194,86 @@ class DatabaseManager:
         else:
             raise ValueError(f"Unsupported database type: {db_type}")
     
+    def is_uploaded_sqlite(self, connection_data: dict) -> bool:
+        """Whether this is a dataset uploaded to DATA_DIR, which the app never modifies"""
+        if connection_data.get("db_type") != "sqlite":
+            return False
+        file_path = self.get_sqlite_file_path(connection_data)
+        return os.path.commonpath([file_path, os.path.abspath(DATA_DIR)]) == os.path.abspath(DATA_DIR)
+    
+    def get_sqlite_readonly_engine(self, file_path: str):
+        """Pooled read-only engine for file_path, recreated when the file changes on disk"""
+        stat = os.stat(file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._sqlite_engines_lock:
+            cached = self._sqlite_engines.get(file_path)
+            if cached and cached[0] == version:
+                return cached[1]
+            
+            # immutable=1 skips locking and change detection, so a modified file needs a new engine
+            engine = create_engine(
+                f"sqlite:///file:{file_path}?mode=ro&immutable=1&uri=true",
+                poolclass=sqlalchemy.pool.QueuePool,
+                pool_size=SQLITE_POOL_SIZE,
+                max_overflow=SQLITE_POOL_SIZE,
+                connect_args={"check_same_thread": False}
+            )
+            
+            @sqlalchemy.event.listens_for(engine, "connect")
+            def configure_connection(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+                # Negative cache_size is in KiB
+                cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_MB * 1024}")
+                cursor.execute("PRAGMA query_only = ON")
+                cursor.close()
+            
+            self._sqlite_engines[file_path] = (version, engine)
+            if cached:
+                cached[1].dispose()
+            return engine
+    
+    def dispose_sqlite_engine(self, file_path: str):
+        with self._sqlite_engines_lock:
+            cached = self._sqlite_engines.pop(file_path, None)
+        if cached:
+            cached[1].dispose()
+    
+    def get_pooled_engine(self, connection_string: str):
+        """Shared pooled engine for a server database, evicting the least recently used one"""
+        with self._engines_lock:
+            engine = self._engines.get(connection_string)
+            if engine is not None:
+                self._engines.move_to_end(connection_string)
+                return engine
+            
+            engine = create_engine(
+                connection_string,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_POOL_SIZE,
+                pool_pre_ping=True,
+                pool_recycle=1800
+            )
+            self._engines[connection_string] = engine
+            if len(self._engines) > DB_ENGINE_CACHE_SIZE:
+                _, evicted = self._engines.popitem(last=False)
+                evicted.dispose()
+            return engine
+    
     @contextmanager
     def get_connection(self, connection_data: dict):
-        connection_string = self.build_connection_string(connection_data)
         engine = None
         connection = None
         try:
-            engine = create_engine(connection_string)
-            connection = engine.connect()
+            with tracer.span("db.get_connection", db_type=connection_data.get("db_type")):
+                if SQLITE_READONLY_UPLOADS and self.is_uploaded_sqlite(connection_data):
+                    # Shared engine: only the connection goes back to the pool
+                    connection = self.get_sqlite_readonly_engine(self.get_sqlite_file_path(connection_data)).connect()
+                elif connection_data.get("db_type") in ["postgresql", "mysql"]:
+                    connection = self.get_pooled_engine(self.build_connection_string(connection_data)).connect()
+                else:
+                    engine = create_engine(self.build_connection_string(connection_data))
+                    connection = engine.connect()
             yield connection
         except Exception as e:
             if connection:
@@ -157,16 +286,9 @@ class DatabaseManager:
                 engine.dispose()
     
     async def test_connection(self, connection_data: dict) -> ConnectionTestResult:
-        # Route MongoDB connections to mongo_manager
-        if connection_data.get("db_type") == "mongodb":
-            return await mongo_manager.test_connection(connection_data)
-        elif connection_data.get("db_type") == "mongodb-atlas":
-            return await mongo_manager.test_atlas_connection(connection_data)
-        elif connection_data.get("db_type") == "redis":
-            return await self.test_redis_connection(connection_data)
-        elif connection_data.get("db_type") == "cassandra":
-            return await self.test_cassandra_connection(connection_data)
-        
+        return await self.backends.get(connection_data.get("db_type")).connect(connection_data)
+    
+    async def test_sql_connection(self, connection_data: dict) -> ConnectionTestResult:
         try:
             start_time = time.time()
             
@@ -244,31 +366,19 @@ class DatabaseManager:
             return conn.execute(text("SELECT 1"))
     
     async def get_tables(self, connection_data: dict) -> List[TableInfo]:
-        # Route MongoDB connections to mongo_manager
-        if connection_data.get("db_type") in ["mongodb", "mongodb-atlas"]:
-            collections = await mongo_manager.get_collections(connection_data)
-            # Convert MongoDB collections to TableInfo format
-            tables = []
-            for collection in collections:
-                columns = []
-                for col in collection.get("columns", []):
-                    columns.append(ColumnInfo(
-                        name=col["name"],
-                        type=col["type"],
-                        nullable=col.get("nullable", True),
-                        primary_key=col.get("primary_key", False),
-                        default_value=None
-                    ))
-                
-                tables.append(TableInfo(
-                    name=collection["name"],
-                    row_count=collection.get("row_count", 0),
-                    columns=columns
-                ))
-            return tables
-        
+        with tracer.span("db.get_tables", db_type=connection_data.get("db_type")):
+            async with scheduler.slot(connection_data):
+                return await self._get_tables(connection_data)
+
+    async def _get_tables(self, connection_data: dict) -> List[TableInfo]:
+        return await self.backends.get(connection_data.get("db_type")).introspect(connection_data)
+
+    def get_sql_tables(self, connection_data: dict) -> List[TableInfo]:
+        """Blocking inspection; run it in a worker thread"""
         try:
-            with self.get_connection(connection_data) as conn:
+            with profiler.profile("get_tables", db_type=connection_data.get("db_type"),
+                                  trace_id=tracer.current_trace_id()), \
+                    self.get_connection(connection_data) as conn:
                 inspector = inspect(conn)
                 tables = []
                 
@@ -334,125 +444,184 @@ class DatabaseManager:
                 else:
                     processed_columns.append(col)
         
-        # Reconstruct the query
+        # Reconstruct the query; only the first (outermost) select list was processed, so only it is replaced
         new_columns_part = ', '.join(processed_columns)
-        new_query = re.sub(select_pattern, f'SELECT {new_columns_part} FROM', query, flags=re.IGNORECASE | re.DOTALL)
+        new_query = re.sub(select_pattern, lambda _: f'SELECT {new_columns_part} FROM', query, count=1,
+                           flags=re.IGNORECASE | re.DOTALL)
         
         return new_query
 
-    async def execute_query(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
-        # Route MongoDB connections to mongo_manager
-        if connection_data.get("db_type") in ["mongodb", "mongodb-atlas"]:
-            try:
-                # Try to parse as a mongo shell command string first
-                if isinstance(query, str):
-                    # Regex to parse db.collection.operation(args)
-                    match = re.match(r"^\s*db\.(?P<collection>\w+)\.(?P<operation>\w+)\((?P<args>.*)\)\s*$", query, re.DOTALL)
-                    if match:
-                        collection = match.group('collection')
-                        operation = match.group('operation')
-                        args_str = match.group('args').strip()
-
-                        # The arguments for aggregate are a list, for find it's a dict
-                        if operation == "aggregate":
-                            # Parse the aggregation pipeline
-                            # Remove the outer brackets if present
-                            if args_str.startswith('[') and args_str.endswith(']'):
-                                pipeline_str = args_str[1:-1]
-                            else:
-                                pipeline_str = args_str
-                            
-                            # Convert JavaScript-like syntax to Python/JSON
-                            # Replace MongoDB operators and field references
-                            pipeline_str = pipeline_str.replace('$sum:', '"$sum":')
-                            pipeline_str = pipeline_str.replace('$group:', '"$group":')
-                            pipeline_str = pipeline_str.replace('$project:', '"$project":')
-                            pipeline_str = pipeline_str.replace('$sort:', '"$sort":')
-                            pipeline_str = pipeline_str.replace('$limit:', '"$limit":')
-                            pipeline_str = pipeline_str.replace('$match:', '"$match":')
-                            pipeline_str = pipeline_str.replace('_id:', '"_id":')
-                            pipeline_str = pipeline_str.replace('value:', '"value":')
-                            pipeline_str = pipeline_str.replace('name:', '"name":')
-                            
-                            # Parse the pipeline as JSON
-                            import json
-                            try:
-                                pipeline = json.loads(f"[{pipeline_str}]")
-                            except json.JSONDecodeError:
-                                # Fallback: try to manually parse common aggregation patterns
-                                if "$group" in pipeline_str and "$project" in pipeline_str:
-                                    # Extract the field being grouped by
-                                    group_match = re.search(r'\{\s*"_id":\s*"\$(\w+)",\s*"value":\s*\{\s*"\$sum":\s*1\s*\}\s*\}', pipeline_str)
-                                    if group_match:
-                                        field = group_match.group(1)
-                                        pipeline = [
-                                            { "$group": { "_id": f"${field}", "value": { "$sum": 1 } } },
-                                            { "$project": { "name": "$_id", "value": 1, "_id": 0 } },
-                                            { "$sort": { "value": -1 } },
-                                            { "$limit": 10 }
-                                        ]
-                                    else:
-                                        raise ValueError("Could not parse aggregation pipeline")
-                                else:
-                                    raise ValueError("Could not parse aggregation pipeline")
-                            
-                            query_dict = {
-                                "collection": collection,
-                                "operation": "aggregate",
-                                "pipeline": pipeline
-                            }
-                        elif operation == "find":
-                            # Arguments are (filter, projection)
-                            # This is more complex to parse robustly with regex/ast from a JS-like string
-                            # A simplified approach for now:
-                            from .utils import extract_json_objects
-                            json_objects = extract_json_objects(args_str)
-                            
-                            filter_arg = json_objects[0] if len(json_objects) > 0 else {}
-                            projection_arg = json_objects[1] if len(json_objects) > 1 else None
-
-                            query_dict = {
-                                "collection": collection,
-                                "operation": "find",
-                                "filter": filter_arg,
-                                "projection": projection_arg
-                            }
-                        else:
-                            raise ValueError(f"Unsupported MongoDB operation: {operation}")
-                            
-                        return await mongo_manager.execute_query(connection_data, query_dict, limit)
-
-                # Fallback to assuming the query is already a JSON string or dict
-                import json
-                query_dict = json.loads(query) if isinstance(query, str) else query
-                return await mongo_manager.execute_query(connection_data, query_dict, limit)
-            except (json.JSONDecodeError, ValueError, SyntaxError) as e:
-                return {
-                    "success": False,
-                    "data": [],
-                    "columns": [],
-                    "row_count": 0,
-                    "execution_time": 0,
-                    "error": f"Invalid query format for MongoDB: {e}"
-                }
+    def parse_mongo_query(self, query) -> Dict[str, Any]:
+        """Accept a shell string, a JSON string or an already parsed query dict"""
+        return self.backends.get("mongodb").parse_query(query)
+
+    def prepare_sql_query(self, connection_data: dict, query: str, limit: int) -> str:
+        """Apply the same rewrites execute_query performs before sending SQL to the driver"""
+        # Preprocess PostgreSQL queries to handle case-sensitive column names
+        if connection_data.get("db_type") == "postgresql":
+            query = self.preprocess_postgresql_query(query)
+        
+        # Add LIMIT to SELECT queries if not present
+        query_upper = query.strip().upper()
+        if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper:
+            query = f"{query.rstrip(';')} LIMIT {limit}"
+        return query
+
+    def build_projection_query(self, table_name: str, columns: Optional[List[str]],
+                               filters: List[Dict[str, Any]], limit: Optional[int] = None):
+        """SELECT columns FROM table WHERE filters, quoted by whichever dialect executes it"""
+        table = sqlalchemy.table(table_name, *[sqlalchemy.column(c) for c in columns or []])
+        statement = sqlalchemy.select(*[table.c[c] for c in columns]) if columns else \
+            sqlalchemy.select(sqlalchemy.text("*")).select_from(table)
         
+        for condition in filters:
+            column = sqlalchemy.column(condition["column"])
+            op, value = condition.get("op", "="), condition.get("value")
+            expressions = {
+                "=": lambda: column == value,
+                "!=": lambda: column != value,
+                "<": lambda: column < value,
+                "<=": lambda: column <= value,
+                ">": lambda: column > value,
+                ">=": lambda: column >= value,
+                "in": lambda: column.in_(value),
+                "like": lambda: column.like(value),
+                "is_null": lambda: column.is_(None),
+                "not_null": lambda: column.is_not(None)
+            }
+            if op not in expressions:
+                raise ValueError(f"Unsupported filter operator '{op}'")
+            statement = statement.where(expressions[op]())
+        
+        if limit is not None:
+            statement = statement.limit(limit)
+        return statement
+
+    def iter_query_batches(self, connection_data: dict, statement, batch_size: int = 10000):
+        """Yield (columns, rows) batches through a server-side cursor; blocking, iterate it off the event loop"""
+        if isinstance(statement, str):
+            statement = text(self.preprocess_postgresql_query(statement)
+                             if connection_data.get("db_type") == "postgresql" else statement)
+        
+        with self.get_connection(connection_data) as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(statement)
+            if not result.returns_rows:
+                raise ValueError("Query does not return rows")
+            columns = list(result.keys())
+            try:
+                while True:
+                    rows = result.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, [tuple(row) for row in rows]
+            finally:
+                result.close()
+
+    async def execute_query(self, connection_data: dict, query: str, limit: int = 1000,
+                            params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                            flatten: Optional[Dict[str, Any]] = None,
+                            page_token: Optional[str] = None, cost_budget: Optional[float] = None) -> Dict[str, Any]:
+        """Run a query in its source's scheduler slot; with cost_budget, refuse it first if its planner estimate exceeds that"""
+        with tracer.span("db.execute_query", db_type=connection_data.get("db_type"), limit=limit) as span:
+            backend = self.backends.get(connection_data.get("db_type"))
+            if singleflight.enabled and backend.is_read_query(query):
+                # Identical concurrent reads share one execution
+                key = singleflight.key(connection_data, query, limit, params, flatten, page_token, cost_budget)
+                result = await singleflight.do(
+                    key, lambda: self._admit_and_execute(connection_data, query, limit, params, prepared, flatten,
+                                                         page_token, cost_budget)
+                )
+            else:
+                result = await self._admit_and_execute(connection_data, query, limit, params, prepared, flatten,
+                                                       page_token, cost_budget)
+            if span is not None:
+                span.set_attribute("row_count", result.get("row_count"))
+                span.set_attribute("success", result.get("success"))
+            return result
+
+    async def _admit_and_execute(self, connection_data: dict, query: str, limit: int,
+                                 params: Optional[Dict[str, Any]], prepared: bool = False,
+                                 flatten: Optional[Dict[str, Any]] = None,
+                                 page_token: Optional[str] = None,
+                                 cost_budget: Optional[float] = None) -> Dict[str, Any]:
+        async with scheduler.slot(connection_data):
+            if cost_budget is not None:
+                # Planned in the same slot, so a slow planner waits its turn like the query itself
+                self.check_cost_budget(await self._explain_query(connection_data, query, limit), cost_budget)
+            return await self._execute_query(connection_data, query, limit, params, prepared, flatten, page_token)
+
+    def check_cost_budget(self, plan: Dict[str, Any], cost_budget: float):
+        if plan["success"] and plan["estimated_cost"] is not None and plan["estimated_cost"] > cost_budget:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Estimated query cost {plan['estimated_cost']:.0f} exceeds your budget of {cost_budget:.0f}"
+            )
+
+    async def _execute_query(self, connection_data: dict, query: str, limit: int = 1000,
+                             params: Optional[Dict[str, Any]] = None, prepared: bool = False,
+                             flatten: Optional[Dict[str, Any]] = None,
+                             page_token: Optional[str] = None) -> Dict[str, Any]:
+        backend = self.backends.get(connection_data.get("db_type"))
+        return await backend.execute(connection_data, query, limit, params, prepared, flatten, page_token)
+
+    def execute_sql(self, connection_data: dict, query: str, limit: int,
+                    params: Optional[Dict[str, Any]], prepared: bool = False) -> Dict[str, Any]:
+        """Run a SQL statement on the calling thread; blocks, so async callers use a worker thread"""
+        # Profiled here: cProfile only sees the thread it is enabled in
+        with profiler.profile("execute_query", db_type=connection_data.get("db_type"), query=str(query)[:500],
+                              limit=limit, trace_id=tracer.current_trace_id()):
+            return self._run_sql(connection_data, query, limit, params, prepared)
+
+    def _run_prepared_postgres(self, conn, query: str, params: Dict[str, Any]) -> Tuple[List[str], List[tuple]]:
+        """EXECUTE a server-side prepared statement, preparing it once per pooled session"""
+        sql, names = chart_templates.to_positional(query)
+        name = chart_templates.statement_name(sql)
+        # Lives as long as the DBAPI connection, like the prepared statements themselves
+        prepared = conn.connection.info.setdefault("prepared_statements", OrderedDict())
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if name in prepared:
+                prepared.move_to_end(name)
+            else:
+                cursor.execute(f"PREPARE {name} AS {sql}")
+                prepared[name] = True
+                if len(prepared) > PREPARED_STATEMENTS_PER_CONNECTION:
+                    evicted, _ = prepared.popitem(last=False)
+                    cursor.execute(f"DEALLOCATE {evicted}")
+            arguments = f" ({', '.join(['%s'] * len(names))})" if names else ""
+            cursor.execute(f"EXECUTE {name}{arguments}", [params.get(param) for param in names])
+            return [description[0] for description in cursor.description], cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _run_sql(self, connection_data: dict, query: str, limit: int,
+                 params: Optional[Dict[str, Any]], prepared: bool = False) -> Dict[str, Any]:
         try:
             start_time = time.time()
             
             with self.get_connection(connection_data) as conn:
-                # Preprocess PostgreSQL queries to handle case-sensitive column names
-                if connection_data.get("db_type") == "postgresql":
-                    query = self.preprocess_postgresql_query(query)
+                query = self.prepare_sql_query(connection_data, query, limit)
                 
-                # Add LIMIT to SELECT queries if not present
-                query_upper = query.strip().upper()
-                if query_upper.startswith('SELECT') and 'LIMIT' not in query_upper:
-                    query = f"{query.rstrip(';')} LIMIT {limit}"
+                if prepared and connection_data.get("db_type") == "postgresql":
+                    with tracer.span("db.driver.execute_prepared"):
+                        columns, raw_rows = self._run_prepared_postgres(conn, query, params or {})
+                    # pymysql has no server-side prepare and SQLite already caches compiled statements per connection
+                    data = [dict(zip(columns, row)) for row in raw_rows]
+                    with tracer.span("db.sanitize_data_for_json", rows=len(data)):
+                        data = self.sanitize_data_for_json(data)
+                    return {
+                        "success": True,
+                        "data": data,
+                        "columns": [{"name": col, "type": "string"} for col in columns],
+                        "row_count": len(data),
+                        "execution_time": int((time.time() - start_time) * 1000)
+                    }
                 
-                result = conn.execute(text(query))
+                with tracer.span("db.driver.execute"):
+                    result = conn.execute(text(query), params or {})
+                    rows = result.fetchall() if result.returns_rows else None
                 
                 if result.returns_rows:
-                    rows = result.fetchall()
                     # Fix the column metadata handling
                     columns = [{"name": col, "type": "string"} for col in result.keys()]
                     
@@ -464,7 +633,8 @@ class DatabaseManager:
                         data = [dict(zip(result.keys(), row)) for row in rows]
                     
                     # Sanitize data to ensure JSON serialization
-                    data = self.sanitize_data_for_json(data)
+                    with tracer.span("db.sanitize_data_for_json", rows=len(data)):
+                        data = self.sanitize_data_for_json(data)
                     
                     row_count = len(data)
                 else:
@@ -495,10 +665,21 @@ class DatabaseManager:
     
     async def get_table_data(self, connection_data: dict, table_name: str, 
                            limit: int = 10, offset: int = 0) -> Dict[str, Any]:
-        # Route MongoDB connections to mongo_manager
-        if connection_data.get("db_type") in ["mongodb", "mongodb-atlas"]:
-            return await mongo_manager.get_collection_data(connection_data, table_name, limit, offset)
-        
+        with tracer.span("db.get_table_data", db_type=connection_data.get("db_type"), table=table_name,
+                         limit=limit, offset=offset):
+            async with scheduler.slot(connection_data):
+                return await self._get_table_data(connection_data, table_name, limit, offset)
+
+    async def _get_table_data(self, connection_data: dict, table_name: str,
+                              limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return await self.backends.get(connection_data.get("db_type")).browse(connection_data, table_name, limit, offset)
+
+    def count_sql_rows(self, connection_data: dict, table_name: str) -> int:
+        with self.get_connection(connection_data) as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+
+    def get_sql_table_data(self, connection_data: dict, table_name: str,
+                           limit: int = 10, offset: int = 0) -> Dict[str, Any]:
         try:
             with self.get_connection(connection_data) as conn:
                 # Get total count
@@ -512,12 +693,14 @@ class DatabaseManager:
                 else:
                     query = text(f"SELECT * FROM {table_name} LIMIT {limit} OFFSET {offset}")
                 
-                result = conn.execute(query)
-                columns = result.keys()
-                rows = [list(row) for row in result.fetchall()]
+                with tracer.span("db.driver.execute"):
+                    result = conn.execute(query)
+                    columns = result.keys()
+                    rows = [list(row) for row in result.fetchall()]
                 
                 # Sanitize data to ensure JSON serialization
-                sanitized_rows = self.sanitize_data_for_json(rows)
+                with tracer.span("db.sanitize_data_for_json", rows=len(rows)):
+                    sanitized_rows = self.sanitize_data_for_json(rows)
                 
                 return {
                     "columns": list(columns),
@@ -529,158 +712,367 @@ class DatabaseManager:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to fetch table data: {str(e)}")
 
-    async def test_redis_connection(self, connection_data: dict) -> ConnectionTestResult:
-        """Test Redis connection"""
-        try:
-            import redis
+    async def search_table(self, connection_data: dict, table_name: str, search_term: str,
+                           column: Optional[str] = None, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """Search a table using native full-text indexes when available, else a bounded scan"""
+        async with scheduler.slot(connection_data):
+            return await self._search_table(connection_data, table_name, search_term, column, limit, offset)
+
+    async def _search_table(self, connection_data: dict, table_name: str, search_term: str,
+                            column: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+        if connection_data.get("db_type") in ["mongodb", "mongodb-atlas"]:
+            return await mongo_manager.search_collection_data(connection_data, table_name, search_term, column,
+                                                              limit, offset, SEARCH_TIME_LIMIT_MS, SEARCH_SCAN_LIMIT)
+        # Inspection, planning and the scan itself all block on the driver
+        return await asyncio.to_thread(self._search_sql, connection_data, table_name, search_term, column, limit, offset)
+
+    def _search_sql(self, connection_data: dict, table_name: str, search_term: str,
+                    column: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+        with tracer.span("db.search_table", db_type=connection_data.get("db_type"), table=table_name) as span:
             start_time = time.time()
+            if not search_term:
+                raise ValueError("Search term is required")
             
-            # First try without password
-            try:
-                r = redis.Redis(
-                    host=connection_data.get("host", "localhost"),
-                    port=connection_data.get("port", 6379),
-                    db=int(connection_data.get("database_name", "0")),
-                    password=None,  # Try without password first
-                    socket_timeout=5,
-                    socket_connect_timeout=5
-                )
-                
-                # Test connection with ping
-                r.ping()
-                r.close()
+            with self.get_connection(connection_data) as conn:
+                inspector = inspect(conn)
+                if table_name not in inspector.get_table_names():
+                    raise ValueError(f"Table '{table_name}' not found")
+                table_columns = inspector.get_columns(table_name)
+                if column and column not in [col["name"] for col in table_columns]:
+                    raise ValueError(f"Column '{column}' not found in table '{table_name}'")
                 
-                latency = int((time.time() - start_time) * 1000)
-                return ConnectionTestResult(
-                    success=True,
-                    message="Redis connection successful (no authentication)",
-                    latency=latency
-                )
-            except Exception as e1:
-                # If no password provided and connection failed
-                if not connection_data.get("password"):
-                    return ConnectionTestResult(
-                        success=False,
-                        message="Authentication required - please provide a password",
-                        error="Redis connection failed without password"
-                    )
+                side_index = None
+                if connection_data["db_type"] == "sqlite":
+                    side_index = (sqlite_fts_manager.get_index_info(self.get_sqlite_file_path(connection_data))
+                                  or {}).get(table_name)
+                    if side_index and column and column not in side_index["columns"]:
+                        side_index = None
                 
-                # Try with password
-                try:
-                    r = redis.Redis(
-                        host=connection_data.get("host", "localhost"),
-                        port=connection_data.get("port", 6379),
-                        db=int(connection_data.get("database_name", "0")),
-                        password=connection_data.get("password"),
-                        socket_timeout=5,
-                        socket_connect_timeout=5
-                    )
-                    
-                    # Test connection with ping
-                    r.ping()
-                    r.close()
-                    
-                    latency = int((time.time() - start_time) * 1000)
-                    return ConnectionTestResult(
-                        success=True,
-                        message="Redis connection successful",
-                        latency=latency
-                    )
-                except Exception as e2:
-                    return ConnectionTestResult(
-                        success=False,
-                        message="Redis connection failed",
-                        error=str(e2)
+                timed_out = False
+                if side_index:
+                    strategy = "sqlite-fts5-side-index"
+                    search_columns = [column] if column else side_index["columns"]
+                    if span is not None:
+                        span.set_attribute("strategy", strategy)
+                    try:
+                        # Fetch one extra row to know whether another page exists
+                        columns, rows = sqlite_fts_manager.search(
+                            self.get_sqlite_file_path(connection_data), table_name, side_index["fts_table"],
+                            search_term, column, limit + 1, offset, SEARCH_TIME_LIMIT_MS
+                        )
+                    except sqlite3.OperationalError as e:
+                        if "interrupted" not in str(e).lower():
+                            raise
+                        timed_out = True
+                        columns, rows = [col["name"] for col in table_columns], []
+                else:
+                    strategy, sql, params, search_columns = self._plan_search(
+                        conn, connection_data["db_type"], table_name, table_columns, search_term, column
                     )
+                    if span is not None:
+                        span.set_attribute("strategy", strategy)
+                    # Fetch one extra row to know whether another page exists
+                    params.update({"search_limit": limit + 1, "search_offset": offset})
                     
-        except Exception as e:
-            return ConnectionTestResult(
-                success=False,
-                message="Redis connection failed",
-                error=str(e)
-            )
+                    try:
+                        with self._search_time_limit(conn, connection_data["db_type"]):
+                            result = conn.execute(text(sql), params)
+                            columns = list(result.keys())
+                            rows = [dict(row._mapping) for row in result.fetchall()]
+                    except sqlalchemy.exc.OperationalError as e:
+                        if not self._is_timeout_error(e):
+                            raise
+                        timed_out = True
+                        columns, rows = [col["name"] for col in table_columns], []
+            
+            has_more = len(rows) > limit
+            data = self.sanitize_data_for_json(rows[:limit])
+            return {
+                "success": True,
+                "type": "sql",
+                "table": table_name,
+                "columns": columns,
+                "data": data,
+                "row_count": len(data),
+                "page": offset // limit + 1 if limit else 1,
+                "limit": limit,
+                "offset": offset,
+                "has_more": has_more,
+                "strategy": strategy,
+                "search_columns": search_columns,
+                "timed_out": timed_out,
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
 
-    async def test_cassandra_connection(self, connection_data: dict) -> ConnectionTestResult:
-        """Test Cassandra connection"""
-        try:
-            from cassandra.cluster import Cluster
-            from cassandra.auth import PlainTextAuthProvider
+    def _search_columns(self, table_columns: List[dict], column: Optional[str]) -> List[str]:
+        """Pick the columns to search: the requested one, else every text column"""
+        if column:
+            return [column]
+        text_columns = [col["name"] for col in table_columns if isinstance(col["type"], sqlalchemy.types.String)]
+        return text_columns or [col["name"] for col in table_columns]
+
+    def _plan_search(self, conn, db_type: str, table_name: str, table_columns: List[dict],
+                     search_term: str, column: Optional[str]) -> Tuple[str, str, Dict[str, Any], List[str]]:
+        """Return (strategy, sql, params, searched columns) for the best available search method"""
+        quote = conn.dialect.identifier_preparer.quote
+        table = quote(table_name)
+        
+        if db_type == "postgresql":
+            # A tsvector column or an expression GIN index over to_tsvector(...)
+            tsvector_columns = [col["name"] for col in table_columns if str(col["type"]).upper() == "TSVECTOR"]
+            if tsvector_columns and not column:
+                condition = " OR ".join(f"{quote(c)} @@ plainto_tsquery(:term)" for c in tsvector_columns)
+                return ("postgres-tsvector",
+                        f"SELECT * FROM {table} WHERE {condition} LIMIT :search_limit OFFSET :search_offset",
+                        {"term": search_term}, tsvector_columns)
             
-            start_time = time.time()
+            index_defs = [row[0] for row in conn.execute(
+                text("SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"),
+                {"table": table_name}
+            )]
+            for index_def in index_defs:
+                match = re.search(r"USING gin \((to_tsvector\((?:('[^']+'::regconfig), )?(.+)\))\)$", index_def)
+                if match and (not column or match.group(3).strip('"') == column):
+                    config = f"{match.group(2)}, " if match.group(2) else ""
+                    return ("postgres-fulltext-index",
+                            f"SELECT * FROM {table} WHERE {match.group(1)} @@ plainto_tsquery({config}:term) "
+                            f"LIMIT :search_limit OFFSET :search_offset",
+                            {"term": search_term}, [match.group(3).strip('"')])
             
-            # First try without authentication
+            # pg_trgm GIN/GiST indexes make ILIKE '%term%' an index search
+            trigram_columns = []
+            for index_def in index_defs:
+                for match in re.finditer(r"\(?\"?(\w+)\"? (?:gin|gist)_trgm_ops", index_def):
+                    trigram_columns.append(match.group(1))
+            indexed = [c for c in self._search_columns(table_columns, column) if c in trigram_columns]
+            if indexed:
+                condition = " OR ".join(f"{quote(c)} ILIKE :pattern ESCAPE '!'" for c in indexed)
+                return ("postgres-trigram-index",
+                        f"SELECT * FROM {table} WHERE {condition} LIMIT :search_limit OFFSET :search_offset",
+                        {"pattern": self._like_pattern(search_term)}, indexed)
+        
+        elif db_type == "mysql":
+            fulltext_indexes = conn.execute(text(
+                "SELECT INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_TYPE = 'FULLTEXT' "
+                "GROUP BY INDEX_NAME"
+            ), {"table": table_name}).fetchall()
+            for _, index_columns in fulltext_indexes:
+                index_columns = index_columns.split(",")
+                if not column or index_columns == [column]:
+                    match_columns = ", ".join(quote(c) for c in index_columns)
+                    return ("mysql-fulltext",
+                            f"SELECT /*+ MAX_EXECUTION_TIME({SEARCH_TIME_LIMIT_MS}) */ * FROM {table} "
+                            f"WHERE MATCH({match_columns}) AGAINST (:term IN NATURAL LANGUAGE MODE) "
+                            f"LIMIT :search_limit OFFSET :search_offset",
+                            {"term": search_term}, index_columns)
+        
+        elif db_type == "sqlite":
+            fts = self._find_sqlite_fts_table(conn, table_name)
+            if fts:
+                fts_table, fts_columns, is_self = fts
+                if not column or column in fts_columns:
+                    phrase = '"' + search_term.replace('"', '""') + '"'
+                    match_query = f"{quote(column)} : {phrase}" if column else phrase
+                    if is_self:
+                        sql = (f"SELECT * FROM {table} WHERE {table} MATCH :term ORDER BY rank "
+                               f"LIMIT :search_limit OFFSET :search_offset")
+                    else:
+                        sql = (f"SELECT {table}.* FROM {table} JOIN {quote(fts_table)} "
+                               f"ON {table}.rowid = {quote(fts_table)}.rowid WHERE {quote(fts_table)} MATCH :term "
+                               f"ORDER BY {quote(fts_table)}.rank LIMIT :search_limit OFFSET :search_offset")
+                    return ("sqlite-fts5", sql, {"term": match_query}, [column] if column else fts_columns)
+        
+        # Fallback: substring match over a bounded number of rows
+        searched = self._search_columns(table_columns, column)
+        cast_type = {"postgresql": "TEXT", "mysql": "CHAR"}.get(db_type)
+        like = "ILIKE" if db_type == "postgresql" else "LIKE"
+        text_names = {col["name"] for col in table_columns if isinstance(col["type"], sqlalchemy.types.String)}
+        conditions = []
+        for c in searched:
+            expression = quote(c) if c in text_names or not cast_type else f"CAST({quote(c)} AS {cast_type})"
+            conditions.append(f"{expression} {like} :pattern ESCAPE '!'")
+        hint = f"/*+ MAX_EXECUTION_TIME({SEARCH_TIME_LIMIT_MS}) */ " if db_type == "mysql" else ""
+        sql = (f"SELECT {hint}* FROM (SELECT * FROM {table} LIMIT {SEARCH_SCAN_LIMIT}) AS bounded_scan "
+               f"WHERE {' OR '.join(conditions)} LIMIT :search_limit OFFSET :search_offset")
+        return "bounded-scan", sql, {"pattern": self._like_pattern(search_term)}, searched
+
+    def _like_pattern(self, search_term: str) -> str:
+        escaped = search_term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+        return f"%{escaped}%"
+
+    def _find_sqlite_fts_table(self, conn, table_name: str) -> Optional[Tuple[str, List[str], bool]]:
+        """Find an FTS5 table for table_name: (fts table, indexed columns, table is itself FTS5)"""
+        virtual_tables = conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%'"
+        )).fetchall()
+        for name, sql in virtual_tables:
+            match = re.search(r"USING\s+fts5\s*\((.*)\)\s*$", sql, re.IGNORECASE | re.DOTALL)
+            if not match:
+                continue
+            arguments = [arg.strip() for arg in match.group(1).split(",")]
+            columns = [arg.strip('"\'`[]') for arg in arguments if "=" not in arg]
+            options = dict(arg.split("=", 1) for arg in arguments if "=" in arg)
+            content = options.get("content", "").strip().strip('"\'')
+            if name == table_name:
+                return name, columns, True
+            if content == table_name:
+                return name, columns, False
+        return None
+
+    @contextmanager
+    def _search_time_limit(self, conn, db_type: str):
+        """Abort the search statement once SEARCH_TIME_LIMIT_MS has elapsed"""
+        if db_type == "postgresql":
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(SEARCH_TIME_LIMIT_MS)}"))
+            yield
+        elif db_type == "sqlite":
+            deadline = time.monotonic() + SEARCH_TIME_LIMIT_MS / 1000
+            dbapi_connection = conn.connection.dbapi_connection
+            dbapi_connection.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
             try:
-                cluster = Cluster(
-                    [connection_data.get("host", "localhost")],
-                    port=connection_data.get("port", 9042),
-                    auth_provider=None
-                )
-                
-                session = cluster.connect()
-                
-                # Test connection with a simple query
-                session.execute("SELECT release_version FROM system.local")
-                
-                latency = int((time.time() - start_time) * 1000)
-                session.shutdown()
-                cluster.shutdown()
-                
-                return ConnectionTestResult(
-                    success=True,
-                    message="Cassandra connection successful (no authentication)",
-                    latency=latency
-                )
-            except Exception as e1:
-                # If no credentials provided and connection failed
-                if not (connection_data.get("username") and connection_data.get("password")):
-                    return ConnectionTestResult(
-                        success=False,
-                        message="Authentication required - please provide username and password",
-                        error="Cassandra connection failed without credentials"
-                    )
-                
-                # Try with authentication
-                try:
-                    auth_provider = PlainTextAuthProvider(
-                        username=connection_data["username"],
-                        password=connection_data["password"]
-                    )
-                    
-                    cluster = Cluster(
-                        [connection_data.get("host", "localhost")],
-                        port=connection_data.get("port", 9042),
-                        auth_provider=auth_provider
-                    )
-                    
-                    session = cluster.connect()
-                    
-                    # Test connection with a simple query
-                    session.execute("SELECT release_version FROM system.local")
-                    
-                    latency = int((time.time() - start_time) * 1000)
-                    session.shutdown()
-                    cluster.shutdown()
-                    
-                    return ConnectionTestResult(
-                        success=True,
-                        message="Cassandra connection successful",
-                        latency=latency
-                    )
-                except Exception as e2:
-                    return ConnectionTestResult(
-                        success=False,
-                        message="Cassandra connection failed",
-                        error=str(e2)
-                    )
-                    
-        except Exception as e:
-            return ConnectionTestResult(
-                success=False,
-                message="Cassandra connection failed",
-                error=str(e)
+                yield
+            finally:
+                dbapi_connection.set_progress_handler(None, 0)
+        else:
+            # MySQL uses a MAX_EXECUTION_TIME optimizer hint in the statement itself
+            yield
+
+    def _is_timeout_error(self, error: Exception) -> bool:
+        message = str(error).lower()
+        return any(marker in message for marker in (
+            "interrupted", "statement timeout", "canceling statement", "maximum statement execution time"
+        ))
+
+    async def explain_query(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        """Return the normalized execution plan of a query without running it"""
+        async with scheduler.slot(connection_data):
+            return await self._explain_query(connection_data, query, limit)
+
+    async def _explain_query(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        with tracer.span("db.explain_query", db_type=connection_data.get("db_type")):
+            start_time = time.time()
+            try:
+                plan = await self.backends.get(connection_data.get("db_type")).explain(connection_data, query, limit)
+            except Exception as e:
+                return {
+                    "success": False,
+                    "db_type": connection_data.get("db_type"),
+                    "execution_time": int((time.time() - start_time) * 1000),
+                    "error": str(e)
+                }
+            
+            full_scans = self._collect_full_scans(plan)
+            return {
+                "success": True,
+                "db_type": connection_data.get("db_type"),
+                "plan": plan,
+                "estimated_rows": plan.get("estimated_rows"),
+                "estimated_cost": plan.get("estimated_cost"),
+                "full_scan": bool(full_scans),
+                "warnings": [f"Query scans the whole table '{relation}'" for relation in full_scans],
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
+
+    def explain_sql(self, connection_data: dict, query: str) -> Dict[str, Any]:
+        """Normalized plan tree of a prepared SQL query; blocks like execute_sql"""
+        db_type = connection_data["db_type"]
+        with self.get_connection(connection_data) as conn:
+            if db_type == "postgresql":
+                raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+                if isinstance(raw, str):
+                    raw = json.loads(raw)
+                return self._normalize_postgres_plan(raw[0]["Plan"])
+            elif db_type == "mysql":
+                raw = json.loads(conn.execute(text(f"EXPLAIN FORMAT=JSON {query}")).scalar())
+                return self._normalize_mysql_plan(raw["query_block"])
+            elif db_type == "sqlite":
+                rows = conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).fetchall()
+                return self._normalize_sqlite_plan(rows)
+            else:
+                raise ValueError(f"EXPLAIN is not supported for {db_type}")
+
+    def _plan_node(self, operation: str, relation: Optional[str] = None, estimated_rows=None,
+                   estimated_cost=None, full_scan: bool = False, children: Optional[List[dict]] = None,
+                   detail: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "operation": operation,
+            "relation": relation,
+            "estimated_rows": float(estimated_rows) if estimated_rows is not None else None,
+            "estimated_cost": float(estimated_cost) if estimated_cost is not None else None,
+            "full_scan": full_scan,
+            "detail": detail,
+            "children": children or []
+        }
+
+    def _normalize_postgres_plan(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        return self._plan_node(
+            operation=node.get("Node Type", "Unknown"),
+            relation=node.get("Relation Name"),
+            estimated_rows=node.get("Plan Rows"),
+            estimated_cost=node.get("Total Cost"),
+            full_scan=node.get("Node Type") == "Seq Scan",
+            children=[self._normalize_postgres_plan(child) for child in node.get("Plans", [])],
+            detail=node.get("Index Name")
+        )
+
+    def _normalize_mysql_plan(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        def walk(key: str, value: Any) -> List[Dict[str, Any]]:
+            if key == "table":
+                cost_info = value.get("cost_info", {})
+                return [self._plan_node(
+                    operation=f"Table access ({value.get('access_type', 'unknown')})",
+                    relation=value.get("table_name"),
+                    estimated_rows=value.get("rows_examined_per_scan"),
+                    estimated_cost=cost_info.get("prefix_cost") or cost_info.get("read_cost"),
+                    full_scan=value.get("access_type") == "ALL",
+                    # Materialized derived tables nest their own query blocks
+                    children=[node for k, v in value.items() for node in walk(k, v)],
+                    detail=value.get("key")
+                )]
+            if isinstance(value, dict):
+                children = [node for k, v in value.items() for node in walk(k, v)]
+                if children or key == "query_block":
+                    return [self._plan_node(operation=key.replace("_", " ").title(), children=children)]
+            if isinstance(value, list):
+                return [node for item in value if isinstance(item, dict) for k, v in item.items() for node in walk(k, v)]
+            return []
+
+        children = [node for key, value in block.items() for node in walk(key, value)]
+        cost = block.get("cost_info", {}).get("query_cost")
+        rows = None
+        if len(children) == 1 and children[0]["estimated_rows"] is not None:
+            rows = children[0]["estimated_rows"]
+        return self._plan_node(operation="Query", estimated_rows=rows, estimated_cost=cost, children=children)
+
+    def _normalize_sqlite_plan(self, rows: List[Any]) -> Dict[str, Any]:
+        # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail); SQLite reports no costs
+        nodes = {0: self._plan_node(operation="Query")}
+        for row in rows:
+            node_id, parent_id, detail = row[0], row[1], row[3]
+            # Older SQLite versions print "SCAN TABLE t" instead of "SCAN t"
+            words = [word for word in detail.split() if word != "TABLE"]
+            operation = words[0] if words else detail
+            relation = words[1] if operation in ("SCAN", "SEARCH") and len(words) > 1 else None
+            if relation in ("CONSTANT", "SUBQUERY"):
+                relation = None
+            nodes[node_id] = self._plan_node(
+                operation=operation,
+                relation=relation,
+                # SCAN visits every row (or every index entry); SEARCH uses an index range
+                full_scan=operation == "SCAN" and relation is not None,
+                detail=detail
             )
-        query = f"SELECT * FROM {table_name} LIMIT {limit} OFFSET {offset}"
-        return await self.execute_query(connection_data, query, limit)
+            nodes.get(parent_id, nodes[0])["children"].append(nodes[node_id])
+        return nodes[0]
+
+    def _collect_full_scans(self, node: Dict[str, Any]) -> List[str]:
+        relations = []
+        if node.get("full_scan"):
+            relations.append(node.get("relation") or "unknown")
+        for child in node.get("children", []):
+            relations.extend(self._collect_full_scans(child))
+        return relations
 
 # Create global instance
 db_manager = DatabaseManager()
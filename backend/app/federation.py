@@ -0,0 +1,255 @@
+import asyncio
+import contextlib
+import datetime
+import decimal
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.db_manager import db_manager
+from app.mongo_manager import mongo_manager
+from app.tracing import tracer
+from app.scheduler import scheduler
+
+# Rows pulled from a single source, and fetch/insert batch size
+FEDERATION_MAX_SOURCE_ROWS = int(os.getenv("FEDERATION_MAX_SOURCE_ROWS", "1000000"))
+FEDERATION_BATCH_SIZE = int(os.getenv("FEDERATION_BATCH_SIZE", "10000"))
+# Page cache of the local engine; sorts, joins and intermediates beyond it spill to temp files
+FEDERATION_CACHE_MB = int(os.getenv("FEDERATION_CACHE_MB", "64"))
+FEDERATION_TEMP_DIR = os.getenv("FEDERATION_TEMP_DIR", tempfile.gettempdir())
+FEDERATION_TIMEOUT_SECONDS = int(os.getenv("FEDERATION_TIMEOUT_SECONDS", "300"))
+
+ALIAS_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class LocalStore:
+    """Disk-backed SQLite database the source projections are streamed into"""
+
+    def __init__(self):
+        self.path = os.path.join(FEDERATION_TEMP_DIR, f"federated-{uuid.uuid4().hex}.sqlite")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute(f"PRAGMA cache_size = -{FEDERATION_CACHE_MB * 1024}")
+        self.conn.execute("PRAGMA temp_store = FILE")
+        self.lock = threading.Lock()
+        self.columns: Dict[str, List[str]] = {}
+        # Set when the query is abandoned; loader threads stop at their next batch
+        self.cancelled = threading.Event()
+        self._loaders = 0
+        self._loaders_done = threading.Condition()
+
+    @contextlib.contextmanager
+    def loading(self):
+        """Register a worker thread writing into the store; close() waits for every one of them"""
+        with self._loaders_done:
+            if self.cancelled.is_set():
+                raise RuntimeError("Federated query was cancelled")
+            self._loaders += 1
+        try:
+            yield
+        finally:
+            with self._loaders_done:
+                self._loaders -= 1
+                self._loaders_done.notify_all()
+
+    def _quote(self, identifier: str) -> str:
+        return '"' + str(identifier).replace('"', '""') + '"'
+
+    def _to_sqlite_value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (str, int, float, bytes)):
+            return value
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return str(value)
+
+    def insert(self, alias: str, columns: List[str], rows: List[tuple]):
+        """Append rows, creating the table or adding columns as new ones appear"""
+        with self.loading(), self.lock:
+            known = self.columns.get(alias)
+            if known is None:
+                # No declared types: values keep the type the source driver returned
+                self.conn.execute(f"CREATE TABLE {self._quote(alias)} "
+                                  f"({', '.join(self._quote(c) for c in columns)})")
+                known = self.columns[alias] = list(columns)
+            for column in columns:
+                if column not in known:
+                    self.conn.execute(f"ALTER TABLE {self._quote(alias)} ADD COLUMN {self._quote(column)}")
+                    known.append(column)
+            self.conn.executemany(
+                f"INSERT INTO {self._quote(alias)} ({', '.join(self._quote(c) for c in columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [[self._to_sqlite_value(value) for value in row] for row in rows]
+            )
+
+    def finish_loading(self, indexes: Dict[str, List[str]]):
+        with self.lock:
+            for alias, index_columns in indexes.items():
+                for column in index_columns:
+                    if column in self.columns.get(alias, []):
+                        self.conn.execute(f"CREATE INDEX {self._quote(f'ix_{alias}_{column}')} "
+                                          f"ON {self._quote(alias)} ({self._quote(column)})")
+            self.conn.commit()
+            self.conn.execute("ANALYZE")
+            # Only the final SELECT runs from here on: no ATTACH of server files, no writes
+            self.conn.set_authorizer(self._authorize)
+
+    def _authorize(self, action: int, arg1, arg2, db_name, trigger) -> int:
+        if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE):
+            return sqlite3.SQLITE_OK
+        return sqlite3.SQLITE_DENY
+
+    def query(self, sql: str, limit: int):
+        with self.lock:
+            cursor = self.conn.execute(sql)
+            columns = [description[0] for description in cursor.description or []]
+            rows = cursor.fetchmany(limit)
+            cursor.close()
+        return columns, rows
+
+    def close(self):
+        with self._loaders_done:
+            self.cancelled.set()
+            self._loaders_done.wait_for(lambda: self._loaders == 0)
+        self.conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class FederatedQueryEngine:
+    """Joins data from several connections by streaming pushed-down projections into a local SQLite store"""
+
+    async def _load_sql_source(self, store: LocalStore, source: Dict[str, Any], max_rows: int) -> Dict[str, Any]:
+        connection_data = source["connection_data"]
+        if source.get("table"):
+            # One extra row tells whether the source was truncated
+            statement = db_manager.build_projection_query(source["table"], source.get("columns"),
+                                                          source.get("filters", []), max_rows + 1)
+        else:
+            statement = source["query"]
+
+        def load():
+            loaded = 0
+            # Closed on every exit, so the server-side cursor and pooled connection are released
+            with store.loading(), contextlib.closing(
+                    db_manager.iter_query_batches(connection_data, statement, FEDERATION_BATCH_SIZE)) as batches:
+                for columns, rows in batches:
+                    if store.cancelled.is_set():
+                        break
+                    rows = rows[:max_rows + 1 - loaded]
+                    store.insert(source["alias"], columns, rows[:max_rows - loaded])
+                    loaded += len(rows)
+                    if loaded > max_rows:
+                        break
+            return min(loaded, max_rows), loaded > max_rows
+
+        rows, truncated = await asyncio.to_thread(load)
+        return {"rows": rows, "truncated": truncated}
+
+    async def _load_mongo_source(self, store: LocalStore, source: Dict[str, Any], max_rows: int) -> Dict[str, Any]:
+        if source.get("table"):
+            query = {
+                "collection": source["table"],
+                "operation": "find",
+                "filter": mongo_manager.build_filter(source.get("filters", [])),
+                "projection": {column: 1 for column in source.get("columns") or []},
+                "limit": max_rows + 1
+            }
+        else:
+            query = db_manager.parse_mongo_query(source["query"])
+        return await self._load_stream_source(store, source, query, max_rows)
+
+    async def _load_stream_source(self, store: LocalStore, source: Dict[str, Any], query: Any,
+                                  max_rows: int) -> Dict[str, Any]:
+        """Load row batches from the backend's own streaming (cursors, driver pages)"""
+        backend = db_manager.backends.get(source["connection_data"]["db_type"])
+        loaded = 0
+        # Closed right away on early exit, so cursors and pooled connections are released
+        async with contextlib.aclosing(backend.stream(source["connection_data"], query, FEDERATION_BATCH_SIZE)) as batches:
+            async for documents in batches:
+                documents = documents[:max_rows + 1 - loaded]
+                kept = documents[:max_rows - loaded]
+                if kept:
+                    columns = list(dict.fromkeys(key for doc in kept for key in doc))
+                    rows = [tuple(doc.get(column) for column in columns) for doc in kept]
+                    await asyncio.to_thread(store.insert, source["alias"], columns, rows)
+                loaded += len(documents)
+                if loaded > max_rows:
+                    break
+        return {"rows": min(loaded, max_rows), "truncated": loaded > max_rows}
+
+    async def _load_source(self, store: LocalStore, source: Dict[str, Any]) -> Dict[str, Any]:
+        start_time = time.time()
+        max_rows = min(source.get("limit") or FEDERATION_MAX_SOURCE_ROWS, FEDERATION_MAX_SOURCE_ROWS)
+        db_type = source["connection_data"].get("db_type")
+        if db_type not in db_manager.backends:
+            raise ValueError(f"Federated queries do not support '{db_type}' sources")
+        with tracer.span("federation.load_source", alias=source["alias"], db_type=db_type):
+            async with scheduler.slot(source["connection_data"]):
+                if db_type in ["mongodb", "mongodb-atlas"]:
+                    stats = await self._load_mongo_source(store, source, max_rows)
+                elif db_type in ["postgresql", "mysql", "sqlite"]:
+                    stats = await self._load_sql_source(store, source, max_rows)
+                elif source.get("table"):
+                    # Projections and filters are only pushed down to SQL and MongoDB sources
+                    raise ValueError(f"Source '{source['alias']}': {db_type} sources need a query")
+                else:
+                    stats = await self._load_stream_source(store, source, source["query"], max_rows)
+        if not stats["rows"]:
+            # Keep the alias queryable even when the source returned nothing
+            await asyncio.to_thread(store.insert, source["alias"], list(source.get("columns") or ["_empty"]), [])
+        stats.update({"alias": source["alias"], "load_time": int((time.time() - start_time) * 1000)})
+        return stats
+
+    async def execute(self, sources: List[Dict[str, Any]], query: str, limit: int = 1000) -> Dict[str, Any]:
+        """Load every source under its alias, then run query against the local store"""
+        start_time = time.time()
+        aliases = [source["alias"] for source in sources]
+        if not sources:
+            raise ValueError("At least one source is required")
+        if len(set(alias.lower() for alias in aliases)) != len(aliases):
+            raise ValueError("Source aliases must be unique")
+        for source in sources:
+            if not ALIAS_PATTERN.match(source["alias"]):
+                raise ValueError(f"Invalid alias '{source['alias']}': use letters, digits and underscores")
+            if not source.get("table") and not source.get("query"):
+                raise ValueError(f"Source '{source['alias']}' needs a table or a query")
+
+        store = await asyncio.to_thread(LocalStore)
+        loads = [asyncio.ensure_future(self._load_source(store, source)) for source in sources]
+        try:
+            source_stats = await asyncio.wait_for(asyncio.gather(*loads), timeout=FEDERATION_TIMEOUT_SECONDS)
+            indexes = {source["alias"]: source.get("index") or [] for source in sources}
+            await asyncio.to_thread(store.finish_loading, indexes)
+
+            with tracer.span("federation.query"):
+                columns, rows = await asyncio.to_thread(store.query, query, limit)
+            data = db_manager.sanitize_data_for_json([dict(zip(columns, row)) for row in rows])
+            return {
+                "success": True,
+                "data": data,
+                "columns": [{"name": column, "type": "string"} for column in columns],
+                "row_count": len(data),
+                "sources": source_stats,
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
+        finally:
+            # On timeout or a failed source the other loads are still running: stop them, and let
+            # close() wait out the loader threads before the store goes away
+            for load in loads:
+                load.cancel()
+            await asyncio.gather(*loads, return_exceptions=True)
+            await asyncio.to_thread(store.close)
+
+# Create global instance
+federated_engine = FederatedQueryEngine()
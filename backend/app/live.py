@@ -0,0 +1,308 @@
+import asyncio
+import contextvars
+import datetime
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.db_manager import db_manager
+from app.chart_templates import chart_templates
+from app.incremental import incremental_refresher
+from app.mongo_manager import mongo_manager
+from app.scheduler import scheduler
+
+# Events buffered per subscriber before a slow client is resynchronised with the latest snapshot
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "16"))
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+# Bursts of changes within this window trigger one recompute
+LIVE_DEBOUNCE_MS = int(os.getenv("LIVE_DEBOUNCE_MS", "500"))
+LIVE_MAX_TOPICS = int(os.getenv("LIVE_MAX_TOPICS", "100"))
+# Dashboard live channel: refresh interval bounds, and the changed-row share above which full rows are sent
+LIVE_REFRESH_SECONDS = float(os.getenv("LIVE_REFRESH_SECONDS", "30"))
+LIVE_MIN_REFRESH_SECONDS = float(os.getenv("LIVE_MIN_REFRESH_SECONDS", "5"))
+LIVE_DIFF_MAX_RATIO = float(os.getenv("LIVE_DIFF_MAX_RATIO", "0.5"))
+
+OBJECT_ID_PATTERN = re.compile(r"^[0-9a-f]{24}$")
+# Events that invalidate any result read from the collection
+STRUCTURAL_EVENTS = ["drop", "rename", "dropDatabase", "invalidate"]
+
+
+class Topic:
+    def __init__(self, key: Any):
+        self.key = key
+        self.subscribers: set = set()
+        self.task: Optional[asyncio.Task] = None
+        # Full state sent to late joiners and to subscribers that fell behind
+        self.snapshot: Optional[Dict[str, Any]] = None
+
+
+class LiveHub:
+    """Fan-out of server-side producers to any number of subscribers; one producer runs per topic"""
+
+    def __init__(self):
+        self._topics: Dict[Any, Topic] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, key: Any, producer: Callable[[Callable[..., None]], Awaitable[None]]):
+        """Yield a queue of events for key, starting its producer for the first subscriber"""
+        topic = self._topics.get(key)
+        if topic is None:
+            if len(self._topics) >= LIVE_MAX_TOPICS:
+                raise ValueError("Too many live subscriptions, try again later")
+            topic = self._topics[key] = Topic(key)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        topic.subscribers.add(queue)
+        if topic.snapshot is not None:
+            queue.put_nowait(topic.snapshot)
+        if topic.task is None or topic.task.done():
+            # The producer outlives this request and serves every subscriber, so it starts from a clean
+            # context instead of inheriting the first subscriber's trace span and scheduler user
+            topic.task = asyncio.create_task(self._run(topic, producer), context=contextvars.Context())
+        try:
+            yield queue
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers:
+                topic.task.cancel()
+                self._topics.pop(key, None)
+
+    async def _run(self, topic: Topic, producer: Callable[[Callable[..., None]], Awaitable[None]]):
+        try:
+            await producer(lambda event, snapshot=None: self.publish(topic.key, event, snapshot))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Live producer for {topic.key} failed: {e}")
+            self.publish(topic.key, {"type": "error", "error": str(e)})
+
+    def publish(self, key: Any, event: Dict[str, Any], snapshot: Optional[Dict[str, Any]] = None):
+        """Send event to every subscriber; snapshot (default: event) is the state a newcomer starts from"""
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+        if event["type"] != "error":
+            topic.snapshot = snapshot or event
+        for queue in topic.subscribers:
+            if queue.full():
+                # Incremental events cannot be skipped, so a lagging client restarts from the snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(topic.snapshot or event)
+            else:
+                queue.put_nowait(event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(topic.subscribers) for topic in self._topics.values())
+        }
+
+
+def sse_message(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def sse_stream(hub: LiveHub, key: Any, producer, is_disconnected: Callable[[], Awaitable[bool]]):
+    """Server-sent events for a topic, with keepalive comments so proxies keep the connection open"""
+    try:
+        async with hub.subscribe(key, producer) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_message(event)
+                if event["type"] == "error":
+                    return
+    except ValueError as e:
+        yield sse_message({"type": "error", "error": str(e)})
+
+
+class MongoChartWatcher:
+    """Recomputes a MongoDB chart when a change stream reports a change that can affect its result"""
+
+    def _prefix(self, condition: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Rewrite a query filter to match change events on fullDocument, or None if it cannot be"""
+        prefixed = {}
+        for key, value in condition.items():
+            if key in ("$and", "$or", "$nor"):
+                parts = [self._prefix(part) for part in value]
+                if any(part is None for part in parts):
+                    return None
+                prefixed[key] = parts
+            elif key.startswith("$"):
+                # $expr, $text, $where ... reference the document in ways a prefix cannot express
+                return None
+            else:
+                prefixed[f"fullDocument.{key}"] = value
+        return prefixed
+
+    def _leading_match(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        if query.get("operation", "find") != "aggregate":
+            return query.get("filter") or {}
+        matches = []
+        for stage in query.get("pipeline", []):
+            if "$match" not in stage:
+                break
+            matches.append(stage["$match"])
+        return {"$and": matches} if len(matches) > 1 else (matches[0] if matches else {})
+
+    def change_pipeline(self, query: Dict[str, Any], result_ids: Optional[List[Any]]) -> List[Dict[str, Any]]:
+        """$match on the change stream keeping only events that can change the chart"""
+        match = self._prefix(self._leading_match(query)) or {}
+        clauses: List[Dict[str, Any]] = [{"operationType": {"$in": STRUCTURAL_EVENTS}}]
+        if query.get("operation", "find") == "find" and result_ids is not None:
+            # Matching documents can enter the result; documents already in it can change or leave it
+            clauses.append(dict(match, operationType={"$in": ["insert", "update", "replace"]}))
+            if result_ids:
+                clauses.append({"documentKey._id": {"$in": result_ids}})
+        else:
+            # Without pre-images an update or delete may have moved a document out of the filter
+            clauses.append(dict(match, operationType="insert"))
+            clauses.append({"operationType": {"$in": ["update", "replace", "delete"]}})
+        return [{"$match": {"$or": clauses}}]
+
+    def _result_ids(self, result: Dict[str, Any]) -> Optional[List[Any]]:
+        ids = []
+        for row in result.get("data", []):
+            if "_id" not in row:
+                return None
+            value = row["_id"]
+            ids.append(value)
+            # _id comes back serialized; match the stored ObjectId as well
+            if isinstance(value, str) and OBJECT_ID_PATTERN.match(value):
+                ids.append(ObjectId(value))
+        return ids
+
+    async def run(self, connection_data: dict, query_text: str, limit: int, publish: Callable[..., None]):
+        scheduler.set_priority("dashboard")
+        query = db_manager.parse_mongo_query(query_text)
+        dirty = asyncio.Event()
+        restart = asyncio.Event()
+        state: Dict[str, Any] = {"ids": None, "data": None}
+
+        async def recompute(event_type: str):
+            result = await db_manager.execute_query(connection_data, query_text, limit)
+            if result.get("success") and result["data"] == state["data"]:
+                return
+            ids = self._result_ids(result) if result.get("success") else state["ids"]
+            if ids != state["ids"]:
+                state["ids"] = ids
+                restart.set()
+            state["data"] = result.get("data")
+            publish({"type": event_type, "result": result,
+                     "at": datetime.datetime.utcnow().isoformat()})
+
+        async def watch():
+            # Pinned: evicting the shared client from the cache would close this stream with it
+            async with mongo_manager.pinned_client(connection_data) as client:
+                collection = client[connection_data["database_name"]][query["collection"]]
+                resume_token = None
+                while True:
+                    restart.clear()
+                    pipeline = self.change_pipeline(query, state["ids"])
+                    async with collection.watch(pipeline, full_document="updateLookup", resume_after=resume_token,
+                                                max_await_time_ms=1000) as stream:
+                        # try_next returns periodically, so a changed result set re-filters the stream promptly
+                        while not restart.is_set():
+                            change = await stream.try_next()
+                            resume_token = stream.resume_token
+                            if change is not None:
+                                dirty.set()
+                                if change["operationType"] == "invalidate":
+                                    resume_token = None
+                                    break
+
+        async def refresh_on_change():
+            while True:
+                await dirty.wait()
+                await asyncio.sleep(LIVE_DEBOUNCE_MS / 1000)
+                dirty.clear()
+                await recompute("update")
+
+        await recompute("snapshot")
+        try:
+            await asyncio.gather(watch(), refresh_on_change())
+        except OperationFailure as e:
+            # Standalone servers have no oplog to stream from
+            raise ValueError(f"Change streams are unavailable on this MongoDB deployment: {e}")
+
+class DashboardBroadcaster:
+    """Refreshes every chart of a dashboard once per interval for all of its viewers, sending only what changed"""
+
+    def diff_rows(self, old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Positional patch turning old into new, or None when resending the rows is about as small"""
+        changed = {index: row for index, row in enumerate(new) if index >= len(old) or old[index] != row}
+        if len(changed) > len(new) * LIVE_DIFF_MAX_RATIO:
+            return None
+        return {"length": len(new), "rows": changed}
+
+    def _unchanged(self, previous: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        if previous.get("success") != result.get("success"):
+            return False
+        if not result.get("success"):
+            return previous.get("error") == result.get("error")
+        return previous["data"] == result["data"] and previous["columns"] == result["columns"]
+
+    async def refresh_chart(self, chart: Dict[str, Any], connection_data: Optional[dict], filters: Optional[list],
+                            limit: int, incremental_state: Dict[int, Any], index: int) -> Dict[str, Any]:
+        if connection_data is None:
+            return {"success": False, "data": [], "columns": [], "row_count": 0, "execution_time": 0,
+                    "error": "Database connection not found"}
+        try:
+            if chart.get("incremental"):
+                # Partial aggregates live in memory for as long as the dashboard has viewers
+                refreshed = await incremental_refresher.refresh(chart, connection_data, incremental_state.get(index))
+                incremental_state[index] = refreshed["state"]
+                return refreshed["result"]
+            if chart.get("parameters") or chart_templates.bind_names(chart["query"]):
+                chart_templates.check_backend(db_manager.backends.get(connection_data.get("db_type")))
+                params = chart_templates.resolve(chart, filters, {})
+                return await db_manager.execute_query(connection_data, chart["query"], limit, params, prepared=True)
+            return await db_manager.execute_query(connection_data, chart["query"], limit)
+        except ValueError as e:
+            return {"success": False, "data": [], "columns": [], "row_count": 0, "execution_time": 0, "error": str(e)}
+
+    async def run(self, charts: List[Dict[str, Any]], connections: List[Optional[dict]], filters: Optional[list],
+                  interval: float, limit: int, publish: Callable[..., None]):
+        # Shared refreshes must not crowd out interactive queries on the same sources
+        scheduler.set_priority("background")
+        results: Dict[int, Dict[str, Any]] = {}
+        incremental_state: Dict[int, Any] = {}
+        while True:
+            refreshed = await asyncio.gather(*[
+                self.refresh_chart(chart, connections[index], filters, limit, incremental_state, index)
+                for index, chart in enumerate(charts)
+            ])
+            at = datetime.datetime.utcnow().isoformat()
+            patches = {}
+            for index, result in enumerate(refreshed):
+                previous = results.get(index)
+                if previous is not None and self._unchanged(previous, result):
+                    continue
+                patch = None
+                if previous and previous.get("success") and result.get("success") \
+                        and previous["columns"] == result["columns"]:
+                    patch = self.diff_rows(previous["data"], result["data"])
+                patches[index] = {"patch": patch} if patch is not None else {"result": result}
+                results[index] = result
+
+            snapshot = {"type": "snapshot", "charts": dict(results), "at": at}
+            if len(patches) == len(results) and all("result" in change for change in patches.values()):
+                publish(snapshot)
+            elif patches:
+                publish({"type": "patch", "charts": patches, "at": at}, snapshot)
+            await asyncio.sleep(interval)
+
+# Create global instances
+live_hub = LiveHub()
+mongo_chart_watcher = MongoChartWatcher()
+dashboard_broadcaster = DashboardBroadcaster()
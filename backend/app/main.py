@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
@@ -6,8 +6,10 @@ import os
 from dotenv import load_dotenv
 
 from app.database import engine, Base
-from app.routers import auth, databases, queries, dashboards
+from app.routers import auth, databases, queries, dashboards, admin
 from app.auth import get_current_user
+from app.tracing import tracer
+from app.scheduler import scheduler, PRIORITIES
 
 load_dotenv()
 
@@ -40,6 +42,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Query scheduling class: clients can lower theirs, e.g. dashboards refreshing in the background
+@app.middleware("http")
+async def apply_query_priority(request: Request, call_next):
+    priority = request.headers.get("X-Query-Priority")
+    if priority in PRIORITIES:
+        scheduler.set_priority(priority)
+    return await call_next(request)
+
+# Request tracing (no-op unless TRACING_ENABLED or enabled via /api/admin/tracing)
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with tracer.span(f"{request.method} {request.url.path}", method=request.method, path=request.url.path) as span:
+        response = await call_next(request)
+        if span is not None:
+            span.set_attribute("status_code", response.status_code)
+            response.headers["X-Trace-Id"] = span.trace.trace_id
+        return response
+
 # Security
 security = HTTPBearer()
 
@@ -48,6 +68,7 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(databases.router, prefix="/api/databases", tags=["Database Connections"])
 app.include_router(queries.router, prefix="/api/queries", tags=["Query Execution"])
 app.include_router(dashboards.router, prefix="/api/dashboards", tags=["Dashboards"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Administration"])
 
 @app.get("/")
 async def root():
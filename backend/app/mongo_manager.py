@@ -2,16 +2,40 @@ import asyncio
 import time
 from typing import Dict, List, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure, OperationFailure, ServerSelectionTimeoutError
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, OperationFailure, ServerSelectionTimeoutError
 from app.schemas import ConnectionTestResult
+from app.tracing import tracer
 from fastapi import HTTPException
 import json
+import re
 from bson import ObjectId
+import copy
 import datetime
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+# Lets large $group/$sort stages and sorted finds spill to temporary files on the server
+MONGO_ALLOW_DISK_USE = os.getenv("MONGO_ALLOW_DISK_USE", "true").lower() in ("1", "true", "yes")
+MONGO_CLIENT_CACHE_SIZE = int(os.getenv("MONGO_CLIENT_CACHE_SIZE", "16"))
+# Documents sampled per collection to infer its fields, and how long the result is reused
+MONGO_SCHEMA_SAMPLE_SIZE = int(os.getenv("MONGO_SCHEMA_SAMPLE_SIZE", "100"))
+MONGO_SCHEMA_CACHE_TTL_SECONDS = int(os.getenv("MONGO_SCHEMA_CACHE_TTL_SECONDS", "300"))
+MONGO_COLLECTION_CONCURRENCY = int(os.getenv("MONGO_COLLECTION_CONCURRENCY", "8"))
+# Array elements kept as a.0, a.1, ... columns when flattening documents
+MONGO_FLATTEN_ARRAY_CAP = int(os.getenv("MONGO_FLATTEN_ARRAY_CAP", "5"))
+# Stages that write their input out; no $limit may follow them
+WRITE_STAGES = ("$out", "$merge")
 
 class MongoDBManager:
     def __init__(self):
         self.client = None
+        # (event loop, connection string) -> client, least recently used first
+        self._clients: "OrderedDict[tuple, AsyncIOMotorClient]" = OrderedDict()
+        # Client key -> open change streams on it; pinned clients are never evicted
+        self._pins: Dict[tuple, int] = {}
+        # (connection string, database) -> (expires_at, collections)
+        self._schema_cache: Dict[tuple, tuple] = {}
     
     def build_connection_string(self, connection_data: dict) -> str:
         """Build MongoDB connection string"""
@@ -76,21 +100,52 @@ class MongoDBManager:
                 error=str(e)
             )
     
-    async def get_client(self, connection_data: dict) -> AsyncIOMotorClient:
-        """Get MongoDB client"""
-        # Use Atlas connection string if available, otherwise build standard connection string
-        connection_string = connection_data.get("connection_string")
-        if not connection_string:
-            connection_string = self.build_connection_string(connection_data)
-        
-        client = AsyncIOMotorClient(
+    def _create_client(self, connection_string: str) -> AsyncIOMotorClient:
+        return AsyncIOMotorClient(
             connection_string,
             serverSelectionTimeoutMS=5000,
             connectTimeoutMS=5000,
             socketTimeoutMS=5000
         )
+    
+    def _connection_string(self, connection_data: dict) -> str:
+        # Use Atlas connection string if available, otherwise build standard connection string
+        return connection_data.get("connection_string") or self.build_connection_string(connection_data)
+    
+    def _client_key(self, connection_data: dict) -> tuple:
+        # Motor clients are bound to the event loop that first used them
+        return id(asyncio.get_running_loop()), self._connection_string(connection_data)
+    
+    async def get_client(self, connection_data: dict) -> AsyncIOMotorClient:
+        """Shared MongoDB client for the connection; callers must not close it"""
+        key = self._client_key(connection_data)
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            return client
+        
+        with tracer.span("mongo.get_client"):
+            client = self._create_client(key[1])
+        self._clients[key] = client
+        if len(self._clients) > MONGO_CLIENT_CACHE_SIZE:
+            # Least recently used client without an open change stream; closing it would end the stream
+            evicted_key = next((cached for cached in self._clients if not self._pins.get(cached)), None)
+            if evicted_key is not None:
+                self._clients.pop(evicted_key).close()
         return client
     
+    @asynccontextmanager
+    async def pinned_client(self, connection_data: dict):
+        """Shared client that stays open until the block exits, for long-lived change streams"""
+        key = self._client_key(connection_data)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            yield await self.get_client(connection_data)
+        finally:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+    
     async def test_connection(self, connection_data: dict) -> ConnectionTestResult:
         """Test MongoDB connection"""
         try:
@@ -134,7 +189,8 @@ class MongoDBManager:
                 
                 # Try with authentication
                 try:
-                    client = await self.get_client(connection_data)
+                    # A dedicated client, so a stale cached one cannot mask a failure
+                    client = self._create_client(self._connection_string(connection_data))
                     
                     # Test connection by pinging the server
                     await client.admin.command('ping')
@@ -176,60 +232,91 @@ class MongoDBManager:
     
     async def get_collections(self, connection_data: dict) -> List[Dict[str, Any]]:
         """Get list of collections (equivalent to tables)"""
+        with tracer.span("mongo.get_collections"):
+            return await self._get_collections(connection_data)
+
+    async def _get_collections(self, connection_data: dict) -> List[Dict[str, Any]]:
+        cache_key = (self._connection_string(connection_data), connection_data["database_name"])
+        cached = self._schema_cache.get(cache_key)
+        if cached and cached[0] > time.time():
+            return copy.deepcopy(cached[1])
+        
         try:
             client = await self.get_client(connection_data)
             db = client[connection_data["database_name"]]
-            
-            collections = []
             collection_names = await db.list_collection_names()
             
-            for collection_name in collection_names:
-                collection = db[collection_name]
-                
-                # Get collection stats
-                try:
-                    stats = await db.command("collStats", collection_name)
-                    row_count = stats.get("count", 0)
-                except:
-                    row_count = await collection.estimated_document_count()
-                
-                # Sample document to infer schema
-                sample_doc = await collection.find_one()
-                columns = []
-                
-                if sample_doc:
-                    for key, value in sample_doc.items():
-                        columns.append({
-                            "name": key,
-                            "type": self._infer_type(value),
-                            "nullable": True,
-                            "primary_key": key == "_id"
-                        })
-                
-                collections.append({
-                    "name": collection_name,
-                    "row_count": row_count,
-                    "columns": columns
-                })
+            # Collections are sampled concurrently, a bounded number at a time
+            semaphore = asyncio.Semaphore(MONGO_COLLECTION_CONCURRENCY)
             
-            client.close()
-            return collections
+            async def describe(collection_name: str) -> Dict[str, Any]:
+                async with semaphore:
+                    collection = db[collection_name]
+                    row_count = await collection.estimated_document_count()
+                    columns = await self.infer_schema(collection, MONGO_SCHEMA_SAMPLE_SIZE)
+                    return {"name": collection_name, "row_count": row_count, "columns": columns}
             
+            with tracer.span("mongo.infer_schemas", collections=len(collection_names)):
+                collections = await asyncio.gather(*[describe(name) for name in sorted(collection_names)])
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error fetching collections: {str(e)}")
+        
+        self._schema_cache[cache_key] = (time.time() + MONGO_SCHEMA_CACHE_TTL_SECONDS, collections)
+        return copy.deepcopy(collections)
+    
+    async def infer_schema(self, collection, sample_size: int) -> List[Dict[str, Any]]:
+        """Merge top-level field types and presence ratios over a random sample of documents"""
+        try:
+            documents = await collection.aggregate([{"$sample": {"size": sample_size}}]).to_list(length=sample_size)
+        except OperationFailure:
+            # Some views and capped collections reject $sample
+            documents = await collection.find().limit(sample_size).to_list(length=sample_size)
+        
+        fields: Dict[str, Dict[str, int]] = {}
+        for doc in documents:
+            for key, value in doc.items():
+                types = fields.setdefault(key, {})
+                value_type = self._infer_type(value)
+                types[value_type] = types.get(value_type, 0) + 1
+        
+        columns = []
+        for key, types in fields.items():
+            present = sum(types.values())
+            non_null = {name: count for name, count in types.items() if name != "Null"}
+            columns.append({
+                "name": key,
+                # The dominant type; fields seen with several types are Mixed
+                "type": "Mixed" if len(non_null) > 1 else next(iter(non_null), "Null"),
+                "types": sorted(types, key=types.get, reverse=True),
+                "presence": round(present / len(documents), 4),
+                "nullable": present < len(documents) or "Null" in types,
+                "primary_key": key == "_id"
+            })
+        # _id first, then the most common fields
+        columns.sort(key=lambda column: (not column["primary_key"], -column["presence"]))
+        return columns
+    
+    def invalidate_schema_cache(self, connection_data: Optional[dict] = None):
+        if connection_data is None:
+            self._schema_cache.clear()
+        else:
+            self._schema_cache.pop((self._connection_string(connection_data), connection_data.get("database_name")), None)
     
     def _infer_type(self, value: Any) -> str:
         """Infer MongoDB field type"""
-        if isinstance(value, ObjectId):
+        if value is None:
+            return "Null"
+        elif isinstance(value, ObjectId):
             return "ObjectId"
         elif isinstance(value, str):
             return "String"
+        elif isinstance(value, bool):
+            # Checked before int, which bool subclasses
+            return "Boolean"
         elif isinstance(value, int):
             return "Integer"
         elif isinstance(value, float):
             return "Double"
-        elif isinstance(value, bool):
-            return "Boolean"
         elif isinstance(value, datetime.datetime):
             return "Date"
         elif isinstance(value, list):
@@ -239,6 +326,58 @@ class MongoDBManager:
         else:
             return "Mixed"
     
+    def unwind_stages(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """$unwind stages for the exploded array paths, keeping documents whose array is missing or empty"""
+        stages = []
+        for path in paths:
+            if not path or path.startswith("$"):
+                raise ValueError(f"Invalid unwind path '{path}'")
+            stages.append({"$unwind": {"path": f"${path}", "preserveNullAndEmptyArrays": True}})
+        return stages
+    
+    def _serialize_rows(self, documents: List[Dict[str, Any]], flatten: Optional[Dict[str, Any]]):
+        """Serialize documents and collect the union of their columns, in order of first appearance"""
+        with tracer.span("mongo.serialize_documents", rows=len(documents), flatten=bool(flatten)):
+            if flatten is None:
+                data = [self._serialize_document(doc) for doc in documents]
+            else:
+                array_cap = flatten.get("array_cap")
+                array_cap = MONGO_FLATTEN_ARRAY_CAP if array_cap is None else array_cap
+                data = [self._flatten_value("", doc, array_cap, {}) for doc in documents]
+            names = list(dict.fromkeys(key for row in data for key in row))
+            if flatten is not None:
+                # Tabular rows: every row carries every column
+                data = [row if len(row) == len(names) else {name: row.get(name) for name in names} for row in data]
+        return data, [{"name": name, "type": "Mixed"} for name in names]
+    
+    def _flatten_value(self, path: str, value: Any, array_cap: int, flat: Dict[str, Any]) -> Dict[str, Any]:
+        """Serialize and flatten in one pass: nested fields become a.b, array elements a.0 .. a.<cap-1>"""
+        if isinstance(value, dict) and (value or not path):
+            for key, item in value.items():
+                self._flatten_value(f"{path}.{key}" if path else str(key), item, array_cap, flat)
+        elif isinstance(value, list):
+            # Elements past the cap are dropped; unwind the path to keep all of them
+            for index, item in enumerate(value[:array_cap]):
+                self._flatten_value(f"{path}.{index}", item, array_cap, flat)
+        else:
+            flat[path] = None if isinstance(value, dict) else self._serialize_value(value)
+        return flat
+    
+    def _serialize_value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, ObjectId):
+            return str(value)
+        if isinstance(value, datetime.datetime):
+            return value.isoformat()
+        if isinstance(value, bytes):
+            try:
+                return value.decode('utf-8')
+            except UnicodeDecodeError:
+                import base64
+                return f"<binary:{base64.b64encode(value).decode('ascii')}>"
+        return str(value)
+    
     def _serialize_document(self, doc: Dict[str, Any]) -> Dict[str, Any]:
         """Serialize MongoDB document for JSON response"""
         if not doc:
@@ -277,21 +416,14 @@ class MongoDBManager:
                     serialized[key] = str(value)
         return serialized
     
-    async def execute_query(self, connection_data: dict, query: Dict[str, Any], limit: int = 1000) -> Dict[str, Any]:
-        """Execute MongoDB query"""
+    async def execute_query(self, connection_data: dict, query: Dict[str, Any], limit: int = 1000,
+                            flatten: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute MongoDB query; with flatten, rows come back as dotted-path columns"""
         try:
             start_time = time.time()
             
-            # Handle MongoDB Atlas connections
-            if connection_data.get("db_type") == "mongodb-atlas" and connection_data.get("connection_string"):
-                client = AsyncIOMotorClient(
-                    connection_data["connection_string"],
-                    serverSelectionTimeoutMS=5000,
-                    connectTimeoutMS=5000,
-                    socketTimeoutMS=5000
-                )
-            else:
-                client = await self.get_client(connection_data)
+            # Atlas connection strings are handled by get_client too
+            client = await self.get_client(connection_data)
             
             db = client[connection_data["database_name"]]
             
@@ -299,47 +431,68 @@ class MongoDBManager:
             collection_name = query.get("collection")
             operation = query.get("operation", "find")
             filter_query = query.get("filter", {})
-            projection = query.get("projection", {})
+            projection = query.get("projection") or None
             sort = query.get("sort", {})
+            options = dict(query.get("options") or {})
+            allow_disk_use = options.pop("allowDiskUse", query.get("allow_disk_use", MONGO_ALLOW_DISK_USE))
+            batch_size = options.pop("batchSize", min(limit, 10000))
+            # Chained .limit() can only narrow the request limit
+            if query.get("limit"):
+                limit = min(limit, query["limit"])
+            flatten = flatten if flatten is not None else query.get("flatten")
+            unwind = (flatten or {}).get("unwind") or []
             
             if not collection_name:
                 raise ValueError("Collection name is required")
             
             collection = db[collection_name]
             
+            if unwind and operation == "find":
+                # Exploding arrays needs $unwind, so the find runs as the equivalent pipeline
+                pipeline = [{"$match": filter_query}]
+                if sort:
+                    pipeline.append({"$sort": sort})
+                if query.get("skip"):
+                    pipeline.append({"$skip": query["skip"]})
+                if projection:
+                    pipeline.append({"$project": projection})
+                query = dict(query, pipeline=pipeline)
+                operation = "aggregate"
+            
             # Execute different operations
             if operation == "find":
-                cursor = collection.find(filter_query, projection)
+                # Sort, skip and limit all run on the server, so only the requested page crosses the wire
+                cursor = collection.find(filter_query, projection, batch_size=batch_size)
                 if sort:
                     cursor = cursor.sort(list(sort.items()))
+                    if allow_disk_use:
+                        cursor = cursor.allow_disk_use(True)
+                if query.get("skip"):
+                    cursor = cursor.skip(query["skip"])
                 cursor = cursor.limit(limit)
                 
-                documents = await cursor.to_list(length=limit)
-                data = [self._serialize_document(doc) for doc in documents]
-                
-                # Get column information from first document
-                columns = []
-                if data:
-                    for key in data[0].keys():
-                        columns.append({"name": key, "type": "Mixed"})
-                
+                with tracer.span("mongo.driver.find", collection=collection_name):
+                    documents = await cursor.to_list(length=limit)
+                data, columns = self._serialize_rows(documents, flatten)
                 row_count = len(data)
                 
             elif operation == "aggregate":
-                pipeline = query.get("pipeline", [])
-                cursor = collection.aggregate(pipeline)
-                documents = await cursor.to_list(length=limit)
-                data = [self._serialize_document(doc) for doc in documents]
-                
-                columns = []
-                if data:
-                    for key in data[0].keys():
-                        columns.append({"name": key, "type": "Mixed"})
-                
+                # One row per array element, with the row limit applied after the explosion
+                pipeline = query.get("pipeline", []) + self.unwind_stages(unwind)
+                pipeline = self.limit_pipeline(pipeline, limit)
+                if batch_size:
+                    options["batchSize"] = batch_size
+                cursor = collection.aggregate(pipeline, allowDiskUse=allow_disk_use, **options)
+                with tracer.span("mongo.driver.aggregate", collection=collection_name):
+                    documents = await cursor.to_list(length=limit)
+                data, columns = self._serialize_rows(documents, flatten)
                 row_count = len(data)
                 
             elif operation == "count":
-                count = await collection.count_documents(filter_query)
+                # Only .itcount() leaves skip/limit in place; .count() drops them, as in the shell
+                bounds = {key: query[key] for key in ("skip", "limit") if query.get(key)}
+                with tracer.span("mongo.driver.count", collection=collection_name):
+                    count = await collection.count_documents(filter_query, **bounds)
                 data = [{"count": count}]
                 columns = [{"name": "count", "type": "Integer"}]
                 row_count = 1
@@ -347,7 +500,6 @@ class MongoDBManager:
             else:
                 raise ValueError(f"Unsupported operation: {operation}")
             
-            client.close()
             execution_time = int((time.time() - start_time) * 1000)
             
             return {
@@ -369,55 +521,251 @@ class MongoDBManager:
                 "error": str(e)
             }
     
+    def limit_pipeline(self, pipeline: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Append a $limit stage so the server stops producing documents at the requested limit"""
+        if not limit or any(stage_name in stage for stage in pipeline for stage_name in WRITE_STAGES):
+            return pipeline
+        last = pipeline[-1] if pipeline else {}
+        if isinstance(last.get("$limit"), int) and last["$limit"] <= limit:
+            return pipeline
+        # A $limit right after $sort is coalesced by the server into a top-k sort
+        return pipeline + [{"$limit": limit}]
+    
+    async def explain_query(self, connection_data: dict, query: Dict[str, Any], limit: int = 1000) -> Dict[str, Any]:
+        """Run explain("queryPlanner") and return a normalized plan tree"""
+        client = await self.get_client(connection_data)
+        db = client[connection_data["database_name"]]
+        collection_name = query.get("collection")
+        operation = query.get("operation", "find")
+        if not collection_name:
+            raise ValueError("Collection name is required")
+            
+        if operation == "find":
+            command = {"find": collection_name, "filter": query.get("filter") or {},
+                       "limit": min(limit, query["limit"]) if query.get("limit") else limit}
+            if query.get("skip"):
+                command["skip"] = query["skip"]
+            if query.get("projection"):
+                command["projection"] = query["projection"]
+            if query.get("sort"):
+                command["sort"] = query["sort"]
+        elif operation == "aggregate":
+            command = {"aggregate": collection_name, "pipeline": self.limit_pipeline(query.get("pipeline", []), limit),
+                       "cursor": {}}
+        elif operation == "count":
+            command = {"count": collection_name, "query": query.get("filter") or {},
+                       **{key: query[key] for key in ("skip", "limit") if query.get(key)}}
+        else:
+            raise ValueError(f"Unsupported operation: {operation}")
+            
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            
+        # Aggregations that push work to the query layer nest the planner under $cursor
+        planner = explain.get("queryPlanner")
+        if planner is None:
+            for stage in explain.get("stages", []):
+                if "$cursor" in stage:
+                    planner = stage["$cursor"].get("queryPlanner")
+                    break
+        if planner is None:
+            return {"operation": "AGGREGATE", "relation": collection_name, "estimated_rows": None,
+                    "estimated_cost": None, "full_scan": False, "detail": "No query planner output",
+                    "children": []}
+            
+        # queryPlanner has no row estimates; a collection scan reads every document
+        document_count = await db[collection_name].estimated_document_count()
+        return self._normalize_plan(planner.get("winningPlan", {}), collection_name, document_count)
+
+    def _normalize_plan(self, stage: Dict[str, Any], collection_name: str, document_count: int) -> Dict[str, Any]:
+        # Newer servers wrap classic plans in queryPlan (slot-based execution engine)
+        if "queryPlan" in stage:
+            stage = stage["queryPlan"]
+        inputs = stage.get("inputStages") or ([stage["inputStage"]] if "inputStage" in stage else [])
+        children = [self._normalize_plan(child, collection_name, document_count) for child in inputs]
+        name = stage.get("stage", "UNKNOWN")
+        full_scan = name == "COLLSCAN"
+        estimated_rows = document_count if full_scan else None
+        if estimated_rows is None and children:
+            estimated_rows = children[0]["estimated_rows"]
+        return {
+            "operation": name,
+            "relation": collection_name if name in ("COLLSCAN", "IXSCAN", "FETCH") else None,
+            "estimated_rows": float(estimated_rows) if estimated_rows is not None else None,
+            "estimated_cost": None,
+            "full_scan": full_scan,
+            "detail": stage.get("indexName"),
+            "children": children
+        }
+
+    async def search_collection_data(self, connection_data: dict, collection_name: str, search_term: str,
+                                     column: Optional[str] = None, limit: int = 50, offset: int = 0,
+                                     time_limit_ms: int = 5000, scan_limit: int = 100000) -> Dict[str, Any]:
+        """Search a collection with its $text index when present, else a bounded regex scan"""
+        with tracer.span("mongo.search_collection_data", collection=collection_name) as span:
+            start_time = time.time()
+            if not search_term:
+                raise ValueError("Search term is required")
+            
+            client = await self.get_client(connection_data)
+            collection = client[connection_data["database_name"]][collection_name]
+                
+            text_fields = []
+            async for index in collection.list_indexes():
+                if "textIndexVersion" in index:
+                    text_fields = list(index.get("weights", {}).keys())
+                
+            if text_fields and (not column or column in text_fields or "$**" in text_fields):
+                strategy = "mongo-text-index"
+                search_fields = [column] if column else text_fields
+                text_filter = {"$text": {"$search": search_term}}
+                if column:
+                    # $text searches every indexed field; narrow to the requested one
+                    text_filter[column] = {"$regex": re.escape(search_term), "$options": "i"}
+                pipeline = [
+                    {"$match": text_filter},
+                    {"$sort": {"score": {"$meta": "textScore"}}},
+                    {"$skip": offset},
+                    {"$limit": limit + 1}
+                ]
+            else:
+                strategy = "bounded-scan"
+                if column:
+                    search_fields = [column]
+                else:
+                    sample = await collection.find_one() or {}
+                    search_fields = [key for key, value in sample.items() if isinstance(value, str)] or ["_id"]
+                pipeline = [
+                    {"$limit": scan_limit},
+                    {"$match": {"$or": [
+                        {field: {"$regex": re.escape(search_term), "$options": "i"}} for field in search_fields
+                    ]}},
+                    {"$skip": offset},
+                    {"$limit": limit + 1}
+                ]
+            if span is not None:
+                span.set_attribute("strategy", strategy)
+                
+            timed_out = False
+            try:
+                documents = await collection.aggregate(pipeline, maxTimeMS=time_limit_ms).to_list(length=limit + 1)
+            except ExecutionTimeout:
+                timed_out, documents = True, []
+            
+            has_more = len(documents) > limit
+            data = [self._serialize_document(doc) for doc in documents[:limit]]
+            columns = []
+            for doc in data:
+                for key in doc.keys():
+                    if key not in columns:
+                        columns.append(key)
+            
+            return {
+                "success": True,
+                "type": "nosql",
+                "table": collection_name,
+                "columns": columns,
+                "data": data,
+                "row_count": len(data),
+                "page": offset // limit + 1 if limit else 1,
+                "limit": limit,
+                "offset": offset,
+                "has_more": has_more,
+                "strategy": strategy,
+                "search_columns": search_fields,
+                "timed_out": timed_out,
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
+
+    async def iter_documents(self, connection_data: dict, query: Dict[str, Any], batch_size: int = 10000):
+        """Yield batches of serialized documents from a find or aggregate query"""
+        client = await self.get_client(connection_data)
+        cursor = None
+        try:
+            collection = client[connection_data["database_name"]][query["collection"]]
+            if query.get("operation", "find") == "aggregate":
+                cursor = collection.aggregate(query.get("pipeline", []), batchSize=batch_size)
+            elif query.get("operation", "find") == "find":
+                cursor = collection.find(query.get("filter", {}), query.get("projection") or None,
+                                         batch_size=batch_size)
+                if query.get("sort"):
+                    cursor = cursor.sort(list(query["sort"].items()))
+                if query.get("skip"):
+                    cursor = cursor.skip(query["skip"])
+                if query.get("limit"):
+                    cursor = cursor.limit(query["limit"])
+            else:
+                raise ValueError(f"Unsupported operation: {query.get('operation')}")
+            
+            batch = []
+            async for doc in cursor:
+                batch.append(self._serialize_document(doc))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            # The consumer may stop early; release the server-side cursor
+            if cursor is not None:
+                await cursor.close()
+
+    def build_filter(self, filters: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Translate [{column, op, value}] conditions into a find() filter"""
+        operators = {"=": "$eq", "!=": "$ne", "<": "$lt", "<=": "$lte", ">": "$gt", ">=": "$gte", "in": "$in"}
+        filter_query: Dict[str, Any] = {}
+        for condition in filters:
+            op, value = condition.get("op", "="), condition.get("value")
+            if op in operators:
+                clause = {operators[op]: value}
+            elif op == "like":
+                # SQL LIKE wildcards to an anchored regex
+                pattern = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in str(value))
+                clause = {"$regex": f"^{pattern}$"}
+            elif op == "is_null":
+                clause = {"$eq": None}
+            elif op == "not_null":
+                clause = {"$ne": None}
+            else:
+                raise ValueError(f"Unsupported filter operator '{op}'")
+            filter_query.setdefault(condition["column"], {}).update(clause)
+        return filter_query
+
     async def get_collection_data(self, connection_data: dict, collection_name: str, 
                                 limit: int = 10, offset: int = 0) -> Dict[str, Any]:
         """Get data from a MongoDB collection"""
+        with tracer.span("mongo.get_collection_data", collection=collection_name, limit=limit, offset=offset):
+            return await self._get_collection_data(connection_data, collection_name, limit, offset)
+
+    async def _get_collection_data(self, connection_data: dict, collection_name: str,
+                                   limit: int = 10, offset: int = 0) -> Dict[str, Any]:
         try:
             start_time = time.time()
             
-            # Handle MongoDB Atlas connections
-            if connection_data.get("db_type") == "mongodb-atlas" and connection_data.get("connection_string"):
-                client = AsyncIOMotorClient(
-                    connection_data["connection_string"],
-                    serverSelectionTimeoutMS=5000,
-                    connectTimeoutMS=5000,
-                    socketTimeoutMS=5000
-                )
-            else:
-                client = await self.get_client(connection_data)
+            # Atlas connection strings are handled by get_client too
+            client = await self.get_client(connection_data)
             
             db = client[connection_data["database_name"]]
             collection = db[collection_name]
             
-            # Get total count
-            total_count = await collection.count_documents({})
+            # Get total count; unfiltered, so collection metadata answers it without a scan
+            with tracer.span("mongo.driver.count", collection=collection_name):
+                total_count = await collection.estimated_document_count()
             
             # Get documents with pagination
             cursor = collection.find({}).skip(offset).limit(limit)
-            documents = await cursor.to_list(length=limit)
-            data = [self._serialize_document(doc) for doc in documents]
-            
-            # Get column information
-            columns = []
-            if data:
-                for key in data[0].keys():
-                    columns.append(key)
-            else:
-                # If no data, try to get schema from collection stats or sample
+            with tracer.span("mongo.driver.find", collection=collection_name):
+                documents = await cursor.to_list(length=limit)
+            # Union of every document's fields, in order of first appearance, as the query path does
+            data, columns = self._serialize_rows(documents, None)
+            columns = [column["name"] for column in columns]
+            if not columns:
+                # If no data, try to get schema from one sampled document
                 try:
-                    # Try to get one document to infer schema
                     sample_doc = await collection.find_one()
-                    if sample_doc:
-                        for key in sample_doc.keys():
-                            columns.append(key)
-                    else:
-                        # If still no data, use common MongoDB fields
-                        columns = ["_id"]
-                except:
+                    columns = list(sample_doc.keys()) if sample_doc else ["_id"]
+                except Exception:
                     columns = ["_id"]
             
-            client.close()
-            
             # Return in the format expected by the frontend
             return {
                 "columns": columns,
@@ -0,0 +1,321 @@
+import copy
+import datetime
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, Regex
+from bson.decimal128 import Decimal128
+from bson.int64 import Int64
+
+# Distinct query texts whose parse trees are kept
+MONGO_SHELL_CACHE_SIZE = int(os.getenv("MONGO_SHELL_CACHE_SIZE", "1024"))
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<number>[-+]?(?:0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?))
+  | (?P<name>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<punct>[{}\[\](),:.;])
+""", re.VERBOSE | re.DOTALL)
+REGEX_LITERAL_PATTERN = re.compile(r"/((?:[^/\\\n]|\\.)+)/([a-z]*)")
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+# Shell operation -> number of arguments it accepts
+OPERATIONS = {"find": 2, "findOne": 2, "aggregate": 2, "count": 1, "countDocuments": 1}
+# Cursor methods the shell prints with that do not change the result
+NO_OP_METHODS = ("pretty", "toArray")
+
+
+class Dynamic:
+    """An argument-less new Date(), ISODate() or ObjectId(): a fresh value each time a cached tree is copied"""
+    __slots__ = ("make",)
+
+    def __init__(self, make):
+        self.make = make
+
+    def __deepcopy__(self, memo):
+        return self.make()
+
+
+class Token:
+    __slots__ = ("kind", "value", "position")
+
+    def __init__(self, kind: str, value: Any, position: int):
+        self.kind = kind
+        self.value = value
+        self.position = position
+
+
+class MongoShellParser:
+    """Tokenizer and recursive-descent parser for the db.collection.operation(...) shell subset"""
+
+    def tokenize(self, text: str) -> List[Token]:
+        tokens: List[Token] = []
+        position = 0
+        while position < len(text):
+            # A slash starts a regex literal wherever a value is expected (after , : [ ( or at the start)
+            if text[position] == "/" and not text.startswith(("//", "/*"), position) and (
+                    not tokens or tokens[-1].value in (",", ":", "[", "(")):
+                match = REGEX_LITERAL_PATTERN.match(text, position)
+                if match:
+                    tokens.append(Token("regex", (match.group(1), match.group(2)), position))
+                    position = match.end()
+                    continue
+            match = TOKEN_PATTERN.match(text, position)
+            if not match:
+                raise ValueError(f"Unexpected character '{text[position]}' at position {position}")
+            kind = match.lastgroup
+            if kind == "string":
+                tokens.append(Token("string", self._unescape(match.group()[1:-1]), position))
+            elif kind == "number":
+                tokens.append(Token("number", self._number(match.group()), position))
+            elif kind != "space":
+                tokens.append(Token(kind, match.group(), position))
+            position = match.end()
+        tokens.append(Token("end", None, len(text)))
+        return tokens
+
+    def _unescape(self, body: str) -> str:
+        return re.sub(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)",
+                      lambda m: chr(int(m.group(1)[1:], 16)) if m.group(1)[0] in "ux" and len(m.group(1)) > 1
+                      else ESCAPES.get(m.group(1), m.group(1)), body, flags=re.DOTALL)
+
+    def _number(self, literal: str) -> Any:
+        if literal.lstrip("+-").lower().startswith("0x"):
+            return int(literal, 16)
+        if re.fullmatch(r"[-+]?\d+", literal):
+            return int(literal)
+        return float(literal)
+
+    def parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """Parse a shell command into a mongo_manager query dict, or None if it is not a db.* command"""
+        return copy.deepcopy(_parse_cached(self, text))
+
+    def parse_value(self, text: str) -> Any:
+        """Parse a relaxed JSON document: unquoted keys, single quotes, trailing commas and shell literals"""
+        return copy.deepcopy(_parse_value_cached(self, text))
+
+    def _parse(self, text: str) -> Optional[Dict[str, Any]]:
+        stream = TokenStream(self.tokenize(text))
+        if not stream.at("db"):
+            return None
+        stream.next()
+        collection = self._collection(stream)
+        stream.expect(".")
+        operation = stream.expect_kind("name").value
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unsupported MongoDB operation: {operation}")
+        args = self._arguments(stream, operation, OPERATIONS[operation])
+
+        if operation == "aggregate":
+            query = {"collection": collection, "operation": "aggregate", "pipeline": args[0] if args else []}
+            if not isinstance(query["pipeline"], list):
+                raise ValueError("aggregate() expects a pipeline array")
+            if len(args) > 1:
+                query["options"] = args[1]
+        elif operation in ("count", "countDocuments"):
+            query = {"collection": collection, "operation": "count", "filter": args[0] if args else {}}
+        else:
+            query = {
+                "collection": collection,
+                "operation": "find",
+                "filter": args[0] if args else {},
+                "projection": args[1] if len(args) > 1 else None
+            }
+            if operation == "findOne":
+                query["limit"] = 1
+
+        while stream.at("."):
+            stream.next()
+            method = stream.expect_kind("name").value
+            self._apply_method(query, method, self._arguments(stream, method, 1))
+
+        if stream.at(";"):
+            stream.next()
+        if stream.peek().kind != "end":
+            raise ValueError(f"Unexpected '{stream.peek().value}' at position {stream.peek().position}")
+        return query
+
+    def _collection(self, stream: "TokenStream") -> str:
+        if stream.at("["):
+            stream.next()
+            name = stream.expect_kind("string").value
+            stream.expect("]")
+            return name
+        stream.expect(".")
+        name = stream.expect_kind("name").value
+        if name == "getCollection":
+            stream.expect("(")
+            name = stream.expect_kind("string").value
+            stream.expect(")")
+        return name
+
+    def _arguments(self, stream: "TokenStream", method: str, max_args: int) -> List[Any]:
+        stream.expect("(")
+        args = []
+        while not stream.at(")"):
+            args.append(self._value(stream))
+            if not stream.at(","):
+                break
+            stream.next()
+        stream.expect(")")
+        if len(args) > max_args:
+            raise ValueError(f"{method}() takes at most {max_args} argument(s)")
+        return args
+
+    def _apply_method(self, query: Dict[str, Any], method: str, args: List[Any]):
+        if method in NO_OP_METHODS:
+            return
+        if query["operation"] != "find":
+            raise ValueError(f"Cannot chain .{method}() after {query['operation']}()")
+        argument = args[0] if args else None
+        if method == "sort":
+            if not isinstance(argument, dict):
+                raise ValueError("sort() expects a document")
+            query["sort"] = argument
+        elif method in ("limit", "skip"):
+            if not isinstance(argument, int) or isinstance(argument, bool) or argument < 0:
+                raise ValueError(f"{method}() expects a non-negative integer")
+            # limit(0) means no limit in the shell
+            if method == "skip" or argument:
+                query[method] = argument
+        elif method == "projection":
+            query["projection"] = argument
+        elif method == "allowDiskUse":
+            query["allow_disk_use"] = True if argument is None else bool(argument)
+        elif method == "count":
+            # The shell's count() ignores skip and limit
+            query["operation"] = "count"
+            query.pop("skip", None)
+            query.pop("limit", None)
+        elif method == "itcount":
+            # Counts what the cursor would return, skip and limit included
+            query["operation"] = "count"
+        else:
+            raise ValueError(f"Unsupported cursor method: {method}")
+
+    def _value(self, stream: "TokenStream") -> Any:
+        token = stream.next()
+        if token.kind in ("string", "number"):
+            return token.value
+        if token.kind == "regex":
+            return Regex(*token.value)
+        if token.value == "{":
+            return self._document(stream)
+        if token.value == "[":
+            return self._array(stream)
+        if token.kind != "name":
+            raise ValueError(f"Unexpected '{token.value}' at position {token.position}")
+
+        name = token.value
+        literals = {"true": True, "false": False, "null": None, "undefined": None,
+                    "NaN": float("nan"), "Infinity": float("inf")}
+        if name in literals:
+            return literals[name]
+        if name == "new":
+            name = stream.expect_kind("name").value
+        args = self._arguments(stream, name, 2)
+        return self._constructor(name, args, token.position)
+
+    def _constructor(self, name: str, args: List[Any], position: int) -> Any:
+        argument = args[0] if args else None
+        try:
+            # Argument-less constructors are evaluated per execution, not once for the cached parse tree
+            if name == "ObjectId":
+                return ObjectId(argument) if argument is not None else Dynamic(ObjectId)
+            if name in ("ISODate", "Date"):
+                if argument is None:
+                    return Dynamic(lambda: datetime.datetime.now(datetime.timezone.utc))
+                if isinstance(argument, (int, float)):
+                    return datetime.datetime.fromtimestamp(argument / 1000, datetime.timezone.utc)
+                return datetime.datetime.fromisoformat(str(argument).replace("Z", "+00:00"))
+            if name == "NumberInt":
+                return int(argument)
+            if name == "NumberLong":
+                return Int64(int(argument))
+            if name == "NumberDecimal":
+                return Decimal128(str(argument))
+            if name == "RegExp":
+                return Regex(argument, args[1] if len(args) > 1 else "")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {name}({argument!r}) at position {position}: {e}")
+        raise ValueError(f"Unsupported function '{name}' at position {position}")
+
+    def _document(self, stream: "TokenStream") -> Dict[str, Any]:
+        document: Dict[str, Any] = {}
+        while not stream.at("}"):
+            key = stream.next()
+            if key.kind not in ("name", "string", "number"):
+                raise ValueError(f"Expected a field name at position {key.position}")
+            stream.expect(":")
+            document[str(key.value)] = self._value(stream)
+            if not stream.at(","):
+                break
+            stream.next()
+        stream.expect("}")
+        return document
+
+    def _array(self, stream: "TokenStream") -> List[Any]:
+        items = []
+        while not stream.at("]"):
+            items.append(self._value(stream))
+            if not stream.at(","):
+                break
+            stream.next()
+        stream.expect("]")
+        return items
+
+
+class TokenStream:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.index]
+
+    def at(self, value: str) -> bool:
+        """Whether the next token is the given punctuation or bare name, never a string with that text"""
+        token = self.tokens[self.index]
+        return token.kind in ("punct", "name") and token.value == value
+
+    def next(self) -> Token:
+        token = self.tokens[self.index]
+        if token.kind != "end":
+            self.index += 1
+        return token
+
+    def expect(self, value: str) -> Token:
+        token = self.next()
+        if token.value != value or token.kind not in ("punct", "name"):
+            found = "end of query" if token.kind == "end" else f"'{token.value}'"
+            raise ValueError(f"Expected '{value}' but found {found} at position {token.position}")
+        return token
+
+    def expect_kind(self, kind: str) -> Token:
+        token = self.next()
+        if token.kind != kind:
+            found = "end of query" if token.kind == "end" else f"'{token.value}'"
+            raise ValueError(f"Expected a {kind} but found {found} at position {token.position}")
+        return token
+
+
+# Parse trees are cached by query text; callers always get a deep copy they are free to mutate,
+# in which every Dynamic placeholder has been replaced by a fresh value
+@lru_cache(maxsize=MONGO_SHELL_CACHE_SIZE)
+def _parse_cached(parser: MongoShellParser, text: str) -> Optional[Dict[str, Any]]:
+    return parser._parse(text)
+
+
+@lru_cache(maxsize=MONGO_SHELL_CACHE_SIZE)
+def _parse_value_cached(parser: MongoShellParser, text: str) -> Any:
+    stream = TokenStream(parser.tokenize(text))
+    value = parser._value(stream)
+    if stream.peek().kind != "end":
+        raise ValueError(f"Unexpected '{stream.peek().value}' at position {stream.peek().position}")
+    return value
+
+# Create global instance
+mongo_shell = MongoShellParser()
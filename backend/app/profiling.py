@@ -0,0 +1,139 @@
+import asyncio
+import cProfile
+import functools
+import heapq
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_THRESHOLD_MS = float(os.getenv("PROFILING_THRESHOLD_MS", "1000"))
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "1.0"))
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "20"))
+
+
+class Profiler:
+    """Samples cProfile runs and keeps the slowest ones above a latency threshold"""
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, threshold_ms: float = PROFILING_THRESHOLD_MS,
+                 sample_rate: float = PROFILING_SAMPLE_RATE, max_profiles: int = PROFILING_MAX_PROFILES):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        # Min-heap of (duration_ms, profile_id, record): the fastest kept profile is evicted first
+        self._profiles: List[tuple] = []
+        self._lock = threading.Lock()
+        # cProfile hooks the whole interpreter thread, so only one run is captured at a time
+        self._active = threading.Lock()
+
+    def _on_event_loop(self) -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    @contextmanager
+    def profile(self, name: str, **metadata):
+        """Profile the block when sampled; keep the result only if it was slow.
+
+        Only worker threads are profiled: on the event loop thread every coroutine that runs
+        while the block awaits would be attributed to it.
+        """
+        if not self.enabled or random.random() >= self.sample_rate or self._on_event_loop() \
+                or not self._active.acquire(blocking=False):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._active.release()
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                self._record(name, duration_ms, profiler, metadata)
+
+    def wrap(self, func: Callable, name: str, **metadata) -> Callable:
+        """func, profiled in whichever worker thread it is called from (e.g. by asyncio.to_thread)"""
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            with self.profile(name, **metadata):
+                return func(*args, **kwargs)
+        return profiled
+
+    def _record(self, name: str, duration_ms: float, profiler: cProfile.Profile, metadata: Dict[str, Any]):
+        stats = pstats.Stats(profiler)
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(30)
+
+        profile_id = uuid.uuid4().hex[:12]
+        record = {
+            "id": profile_id,
+            "name": name,
+            "duration_ms": round(duration_ms, 3),
+            "captured_at": time.time(),
+            "metadata": metadata,
+            "summary": summary.getvalue(),
+            # Same format as pstats.Stats.dump_stats, loadable with pstats/snakeviz
+            "stats": marshal.dumps(stats.stats)
+        }
+        with self._lock:
+            heapq.heappush(self._profiles, (duration_ms, profile_id, record))
+            while len(self._profiles) > self.max_profiles:
+                heapq.heappop(self._profiles)
+
+    def get_profiles(self) -> List[Dict[str, Any]]:
+        """Captured profiles, slowest first, without the raw stats payload"""
+        with self._lock:
+            records = [record for _, _, record in sorted(self._profiles, reverse=True)]
+        return [{key: value for key, value in record.items() if key not in ("stats", "summary")}
+                for record in records]
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for _, pid, record in self._profiles:
+                if pid == profile_id:
+                    return record
+        return None
+
+    def configure(self, enabled: Optional[bool] = None, threshold_ms: Optional[float] = None,
+                  sample_rate: Optional[float] = None, max_profiles: Optional[int] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if max_profiles is not None:
+            with self._lock:
+                self.max_profiles = max_profiles
+                while len(self._profiles) > max_profiles:
+                    heapq.heappop(self._profiles)
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "sample_rate": self.sample_rate,
+            "max_profiles": self.max_profiles
+        }
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+# Create global instance
+profiler = Profiler()
@@ -0,0 +1,395 @@
+import asyncio
+import os
+import re
+import shlex
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.schemas import ConnectionTestResult
+from app.tracing import tracer
+
+# COUNT hint per SCAN round trip; larger values mean fewer round trips but longer server slices
+REDIS_SCAN_COUNT = int(os.getenv("REDIS_SCAN_COUNT", "1000"))
+# Keys inspected when listing the key space; beyond this, group sizes are extrapolated from DBSIZE
+REDIS_MAX_SCAN_KEYS = int(os.getenv("REDIS_MAX_SCAN_KEYS", "10000"))
+# Commands per pipelined round trip when describing keys
+REDIS_PIPELINE_BATCH = int(os.getenv("REDIS_PIPELINE_BATCH", "500"))
+REDIS_KEY_SEPARATOR = os.getenv("REDIS_KEY_SEPARATOR", ":")
+REDIS_PREVIEW_BYTES = int(os.getenv("REDIS_PREVIEW_BYTES", "200"))
+REDIS_CLIENT_CACHE_SIZE = int(os.getenv("REDIS_CLIENT_CACHE_SIZE", "16"))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "10"))
+
+UNGROUPED = "(no prefix)"
+KEY_COLUMNS = ["key", "type", "ttl", "memory_bytes", "value"]
+
+# Only commands that cannot modify data are executed
+READ_COMMANDS = {
+    "GET", "MGET", "STRLEN", "GETRANGE", "EXISTS", "TYPE", "TTL", "PTTL", "DBSIZE", "INFO", "PING", "TIME",
+    "HGET", "HMGET", "HGETALL", "HKEYS", "HVALS", "HLEN", "HEXISTS", "HSTRLEN", "HSCAN", "HRANDFIELD",
+    "LRANGE", "LLEN", "LINDEX", "LPOS",
+    "SMEMBERS", "SCARD", "SISMEMBER", "SMISMEMBER", "SSCAN", "SRANDMEMBER", "SINTER", "SUNION", "SDIFF",
+    "ZRANGE", "ZREVRANGE", "ZRANGEBYSCORE", "ZREVRANGEBYSCORE", "ZRANGEBYLEX", "ZCARD", "ZSCORE", "ZMSCORE",
+    "ZRANK", "ZREVRANK", "ZCOUNT", "ZLEXCOUNT", "ZSCAN",
+    "XRANGE", "XREVRANGE", "XLEN", "XINFO",
+    "PFCOUNT", "BITCOUNT", "BITPOS", "GETBIT", "GEOPOS", "GEODIST", "GEOSEARCH",
+    "SCAN", "RANDOMKEY", "OBJECT", "MEMORY"
+}
+READ_SUBCOMMANDS = {"OBJECT": {"ENCODING", "FREQ", "IDLETIME", "REFCOUNT"}, "MEMORY": {"USAGE", "STATS"},
+                    "XINFO": {"STREAM", "GROUPS", "CONSUMERS"}}
+# Range reads capped to the row limit; the *BY* forms take score/lex bounds rather than positions
+RANGE_COMMANDS = ("LRANGE", "ZRANGE", "ZREVRANGE", "ZRANGEBYSCORE", "ZREVRANGEBYSCORE", "ZRANGEBYLEX")
+SCORE_RANGE_COMMANDS = ("ZRANGEBYSCORE", "ZREVRANGEBYSCORE", "ZRANGEBYLEX")
+
+
+class RedisManager:
+    """Read-only command execution and SCAN-based key-space exploration for Redis"""
+
+    def __init__(self):
+        # (event loop, host, port, db, password) -> client, least recently used first
+        self._clients: "OrderedDict[tuple, aioredis.Redis]" = OrderedDict()
+        # (host, port, db) -> {group: estimated key count} from the last key-space listing
+        self._group_counts: Dict[tuple, Dict[str, int]] = {}
+
+    async def get_client(self, connection_data: dict) -> aioredis.Redis:
+        """Shared pooled client for the connection; callers must not close it"""
+        key = (id(asyncio.get_running_loop()), connection_data.get("host") or "localhost",
+               int(connection_data.get("port") or 6379), int(connection_data.get("database_name") or 0),
+               connection_data.get("username"), connection_data.get("password"))
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            return client
+
+        client = aioredis.Redis(
+            host=key[1], port=key[2], db=key[3], username=key[4], password=key[5],
+            socket_timeout=5, socket_connect_timeout=5,
+            decode_responses=True, encoding_errors="replace",
+            max_connections=REDIS_POOL_SIZE
+        )
+        self._clients[key] = client
+        if len(self._clients) > REDIS_CLIENT_CACHE_SIZE:
+            _, evicted = self._clients.popitem(last=False)
+            await evicted.aclose()
+        return client
+
+    def _keyspace_key(self, connection_data: dict) -> tuple:
+        return (connection_data.get("host"), connection_data.get("port"), connection_data.get("database_name"))
+
+    def group_of(self, key: str) -> str:
+        return key.split(REDIS_KEY_SEPARATOR, 1)[0] + REDIS_KEY_SEPARATOR + "*" if REDIS_KEY_SEPARATOR in key else UNGROUPED
+
+    async def describe_keys(self, client: aioredis.Redis, keys: List[str]) -> List[Dict[str, Any]]:
+        """TYPE, PTTL, MEMORY USAGE and a size or value preview per key, pipelined in batches"""
+        rows = []
+        for start in range(0, len(keys), REDIS_PIPELINE_BATCH):
+            batch = keys[start:start + REDIS_PIPELINE_BATCH]
+            pipe = client.pipeline(transaction=False)
+            for key in batch:
+                pipe.type(key)
+                pipe.pttl(key)
+                pipe.memory_usage(key)
+            # MEMORY USAGE may be disabled (ACLs, managed services); errors come back in place of values
+            meta = await pipe.execute(raise_on_error=False)
+
+            pipe = client.pipeline(transaction=False)
+            types = []
+            for index, key in enumerate(batch):
+                key_type = meta[index * 3]
+                key_type = key_type if isinstance(key_type, str) else "unknown"
+                types.append(key_type)
+                if key_type == "string":
+                    pipe.getrange(key, 0, REDIS_PREVIEW_BYTES - 1)
+                elif key_type == "hash":
+                    pipe.hlen(key)
+                elif key_type == "list":
+                    pipe.llen(key)
+                elif key_type == "set":
+                    pipe.scard(key)
+                elif key_type == "zset":
+                    pipe.zcard(key)
+                elif key_type == "stream":
+                    pipe.xlen(key)
+                else:
+                    pipe.exists(key)
+            previews = await pipe.execute(raise_on_error=False)
+
+            for index, key in enumerate(batch):
+                ttl, memory, preview = meta[index * 3 + 1], meta[index * 3 + 2], previews[index]
+                key_type = types[index]
+                if isinstance(preview, Exception):
+                    preview = None
+                elif key_type not in ("string", "unknown", "none"):
+                    preview = f"{key_type} ({preview} {'fields' if key_type == 'hash' else 'entries'})"
+                rows.append({
+                    "key": key,
+                    "type": key_type,
+                    "ttl": ttl // 1000 if isinstance(ttl, int) and ttl >= 0 else None,
+                    "memory_bytes": memory if isinstance(memory, int) else None,
+                    "value": preview
+                })
+        return rows
+
+    async def get_keyspace(self, connection_data: dict) -> List[Dict[str, Any]]:
+        """Key groups by prefix, found with SCAN (never KEYS) and sized from a bounded walk"""
+        with tracer.span("redis.get_keyspace"):
+            client = await self.get_client(connection_data)
+            counts: Dict[str, int] = {}
+            scanned = 0
+            async for key in client.scan_iter(count=REDIS_SCAN_COUNT):
+                group = self.group_of(key)
+                counts[group] = counts.get(group, 0) + 1
+                scanned += 1
+                if scanned >= REDIS_MAX_SCAN_KEYS:
+                    break
+
+            total = await client.dbsize()
+            if scanned and total > scanned:
+                # The walk stopped early: scale the sampled group sizes up to the whole key space
+                counts = {group: max(1, round(count * total / scanned)) for group, count in counts.items()}
+            self._group_counts[self._keyspace_key(connection_data)] = counts
+
+            columns = [{"name": name, "type": "String" if name in ("key", "type", "value") else "Integer",
+                        "nullable": name not in ("key", "type"), "primary_key": name == "key"}
+                       for name in KEY_COLUMNS]
+            return [{"name": group, "row_count": count, "columns": columns}
+                    for group, count in sorted(counts.items(), key=lambda item: -item[1])]
+
+    async def get_key_data(self, connection_data: dict, group: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """One page of keys in a group, described in pipelined batches"""
+        with tracer.span("redis.get_key_data", group=group, limit=limit, offset=offset):
+            client = await self.get_client(connection_data)
+            # Glob characters inside the prefix itself must match literally
+            match = None if group == UNGROUPED else re.sub(r"([*?\[\]\\])", r"\\\1", group[:-1]) + "*"
+            keys: List[str] = []
+            skipped = 0
+            has_more = False
+            async for key in client.scan_iter(match=match, count=REDIS_SCAN_COUNT):
+                if group == UNGROUPED and REDIS_KEY_SEPARATOR in key:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                if len(keys) >= limit:
+                    has_more = True
+                    break
+                keys.append(key)
+
+            rows = await self.describe_keys(client, keys)
+            known = self._group_counts.get(self._keyspace_key(connection_data), {}).get(group)
+            return {
+                "columns": KEY_COLUMNS,
+                "rows": [[row[column] for column in KEY_COLUMNS] for row in rows],
+                "total_count": max(known or 0, offset + len(rows) + (1 if has_more else 0)),
+                "limit": limit,
+                "offset": offset
+            }
+
+    def parse_command(self, query: str) -> List[str]:
+        try:
+            args = shlex.split(query.strip().rstrip(";"))
+        except ValueError as e:
+            raise ValueError(f"Invalid Redis command: {e}")
+        if not args:
+            raise ValueError("Redis command is empty")
+        command = args[0].upper()
+        if command == "KEYS":
+            raise ValueError("KEYS blocks the server while it walks every key; use SCAN 0 MATCH <pattern> instead")
+        if command not in READ_COMMANDS:
+            raise ValueError(f"Redis command '{command}' is not allowed; only read-only commands can be run")
+        if command in READ_SUBCOMMANDS and (len(args) < 2 or args[1].upper() not in READ_SUBCOMMANDS[command]):
+            raise ValueError(f"Allowed {command} subcommands: {', '.join(sorted(READ_SUBCOMMANDS[command]))}")
+        return [command] + args[1:]
+
+    def _option(self, args: List[str], name: str) -> Optional[str]:
+        upper = [arg.upper() for arg in args]
+        if name in upper and upper.index(name) + 1 < len(args):
+            return args[upper.index(name) + 1]
+        return None
+
+    def _capped_range(self, args: List[str], limit: int) -> List[str]:
+        """Ask a range read for at most limit + 1 elements, so truncation shows without reading the rest.
+
+        Index ranges (LRANGE/ZRANGE key start stop) get a closer stop. Score and lex ranges keep their
+        bounds, which are not positions, and get (or tighten) LIMIT offset count instead.
+        """
+        options = [arg.upper() for arg in args[4:]]
+        if args[0] in SCORE_RANGE_COMMANDS or "BYSCORE" in options or "BYLEX" in options:
+            if "LIMIT" not in options:
+                return args + ["LIMIT", "0", str(limit + 1)]
+            index = 4 + options.index("LIMIT")
+            try:
+                count = int(args[index + 2])
+            except (IndexError, ValueError):
+                return args
+            if count < 0 or count > limit:
+                args = args[:index + 2] + [str(limit + 1)] + args[index + 3:]
+            return args
+        try:
+            start, stop = int(args[2]), int(args[3])
+        except (IndexError, ValueError):
+            return args
+        if start >= 0 and (stop < 0 or stop - start + 1 > limit):
+            args = args[:3] + [str(start + limit)] + args[4:]
+        return args
+
+    async def _collect(self, iterator, limit: int, shape) -> Tuple[List[Dict[str, Any]], bool]:
+        rows = []
+        async for item in iterator:
+            if len(rows) >= limit:
+                return rows, True
+            rows.append(shape(item))
+        return rows, False
+
+    async def _run(self, client: aioredis.Redis, args: List[str], limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        command = args[0]
+        truncated = False
+        # Whole-collection reads are streamed with the matching *SCAN and stop at the row limit
+        if command == "SCAN":
+            rows, truncated = await self._collect(
+                client.scan_iter(match=self._option(args, "MATCH"), count=REDIS_SCAN_COUNT,
+                                 _type=self._option(args, "TYPE")), limit, lambda key: key)
+            return await self.describe_keys(client, rows), truncated
+        if command in ("HGETALL", "HKEYS", "HVALS") and len(args) == 2:
+            shape = {"HGETALL": lambda item: {"field": item[0], "value": item[1]},
+                     "HKEYS": lambda item: {"field": item[0]},
+                     "HVALS": lambda item: {"value": item[1]}}[command]
+            return await self._collect(client.hscan_iter(args[1], count=REDIS_SCAN_COUNT), limit, shape)
+        if command == "SMEMBERS" and len(args) == 2:
+            return await self._collect(client.sscan_iter(args[1], count=REDIS_SCAN_COUNT), limit,
+                                       lambda member: {"member": member})
+        if command in RANGE_COMMANDS and len(args) >= 4:
+            # The extra element, if any, is dropped below and marks the result as truncated
+            args = self._capped_range(args, limit)
+
+        result = await client.execute_command(*args)
+        if command in ("ZRANGE", "ZREVRANGE", "ZRANGEBYSCORE", "ZREVRANGEBYSCORE") and \
+                "WITHSCORES" in (arg.upper() for arg in args) and isinstance(result, list):
+            pairs = result if result and isinstance(result[0], (list, tuple)) else list(zip(result[::2], result[1::2]))
+            rows = [{"member": member, "score": float(score)} for member, score in pairs]
+        elif command == "MGET":
+            rows = [{"key": key, "value": value} for key, value in zip(args[1:], result)]
+        elif isinstance(result, dict):
+            rows = [{"key": key, "value": value if isinstance(value, (str, int, float)) else str(value)}
+                    for key, value in result.items()]
+        elif isinstance(result, (list, tuple, set)):
+            rows = []
+            for index, item in enumerate(result):
+                if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[1], dict):
+                    # Stream entries: (id, fields)
+                    rows.append({"id": item[0], **item[1]})
+                else:
+                    rows.append({"index": index, "value": item if isinstance(item, (str, int, float)) or item is None
+                                 else str(item)})
+        else:
+            rows = [{"value": result}]
+        if len(rows) > limit:
+            rows, truncated = rows[:limit], True
+        return rows, truncated
+
+    async def execute_query(self, connection_data: dict, query: str, limit: int = 1000) -> Dict[str, Any]:
+        """Execute a read-only Redis command and return its reply as rows"""
+        start_time = time.time()
+        try:
+            args = self.parse_command(query)
+            client = await self.get_client(connection_data)
+            with tracer.span("redis.execute_command", command=args[0]):
+                rows, truncated = await self._run(client, args, limit)
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            return {
+                "success": True,
+                "data": rows,
+                "columns": [{"name": name, "type": "string"} for name in columns],
+                "row_count": len(rows),
+                "truncated": truncated,
+                "execution_time": int((time.time() - start_time) * 1000)
+            }
+        except (ValueError, RedisError) as e:
+            return {
+                "success": False,
+                "data": [],
+                "columns": [],
+                "row_count": 0,
+                "execution_time": int((time.time() - start_time) * 1000),
+                "error": str(e)
+            }
+
+    async def test_connection(self, connection_data: dict) -> ConnectionTestResult:
+        """Test Redis connection"""
+        try:
+            start_time = time.time()
+            
+            # First try without password
+            try:
+                r = aioredis.Redis(
+                    host=connection_data.get("host", "localhost"),
+                    port=connection_data.get("port", 6379),
+                    db=int(connection_data.get("database_name", "0")),
+                    password=None,  # Try without password first
+                    socket_timeout=5,
+                    socket_connect_timeout=5
+                )
+                
+                # Test connection with ping, without blocking the event loop for the socket timeout
+                try:
+                    await r.ping()
+                finally:
+                    await r.aclose()
+                
+                latency = int((time.time() - start_time) * 1000)
+                return ConnectionTestResult(
+                    success=True,
+                    message="Redis connection successful (no authentication)",
+                    latency=latency
+                )
+            except Exception as e1:
+                # If no password provided and connection failed
+                if not connection_data.get("password"):
+                    return ConnectionTestResult(
+                        success=False,
+                        message="Authentication required - please provide a password",
+                        error="Redis connection failed without password"
+                    )
+                
+                # Try with password
+                try:
+                    r = aioredis.Redis(
+                        host=connection_data.get("host", "localhost"),
+                        port=connection_data.get("port", 6379),
+                        db=int(connection_data.get("database_name", "0")),
+                        password=connection_data.get("password"),
+                        socket_timeout=5,
+                        socket_connect_timeout=5
+                    )
+                    
+                    # Test connection with ping
+                    try:
+                        await r.ping()
+                    finally:
+                        await r.aclose()
+                    
+                    latency = int((time.time() - start_time) * 1000)
+                    return ConnectionTestResult(
+                        success=True,
+                        message="Redis connection successful",
+                        latency=latency
+                    )
+                except Exception as e2:
+                    return ConnectionTestResult(
+                        success=False,
+                        message="Redis connection failed",
+                        error=str(e2)
+                    )
+                    
+        except Exception as e:
+            return ConnectionTestResult(
+                success=False,
+                message="Redis connection failed",
+                error=str(e)
+            )
+
+# Create global instance
+redis_manager = RedisManager()
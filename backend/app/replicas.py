@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+REPLICAS_ENABLED = os.getenv("REPLICAS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Replicas further behind than this are skipped; a replica can set its own max_lag_seconds
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+# Healthy replicas are re-probed this often, in the background
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", "10"))
+# A replica that failed a probe gets no traffic until it passes one again, tried this often
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Weight of the newest probe in the smoothed round-trip latency
+REPLICA_LATENCY_SMOOTHING = float(os.getenv("REPLICA_LATENCY_SMOOTHING", "0.3"))
+
+REPLICA_TYPES = ("postgresql", "mysql")
+# pg_last_xact_replay_timestamp() stops moving while the primary is idle, so a caught-up replica reports 0
+POSTGRES_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class Endpoint:
+    __slots__ = ("key", "healthy", "lag_seconds", "latency_ms", "inflight", "checked_at", "error", "probing")
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.healthy: Optional[bool] = None  # None until the first probe
+        self.lag_seconds: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.inflight = 0
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+        self.probing = False
+
+
+class ReplicaRouter:
+    """Sends read-only SQL to the closest caught-up replica and falls back to the primary"""
+
+    def __init__(self, enabled: bool = REPLICAS_ENABLED):
+        self.enabled = enabled
+        self.manager = None
+        # (db_type, host, port, database) -> health state shared by every connection using that replica
+        self._endpoints: Dict[tuple, Endpoint] = {}
+        self._lock = threading.Lock()
+        self._tasks = set()
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.failovers = 0
+
+    def attach(self, manager):
+        """The DatabaseManager whose pooled engines probes and reads go through"""
+        self.manager = manager
+
+    def endpoint_data(self, connection_data: dict, replica: Dict[str, Any]) -> dict:
+        """Primary connection data pointed at a replica; credentials default to the primary's"""
+        data = {key: value for key, value in connection_data.items() if key != "replicas"}
+        data["host"] = replica["host"]
+        data["port"] = replica.get("port") or connection_data.get("port")
+        if replica.get("username"):
+            data["username"] = replica["username"]
+            data["password"] = replica.get("password")
+        elif replica.get("password"):
+            data["password"] = replica["password"]
+        return data
+
+    def _endpoint(self, data: dict) -> Endpoint:
+        key = (data.get("db_type"), data.get("host"), data.get("port"), data.get("database_name"))
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = Endpoint(key)
+            return endpoint
+
+    def _measure(self, data: dict) -> float:
+        """Replication lag in seconds, on one pooled connection; blocking"""
+        with self.manager.get_connection(data) as conn:
+            if data["db_type"] == "postgresql":
+                return float(conn.execute(text(POSTGRES_LAG_QUERY)).scalar() or 0)
+            try:
+                status = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+            except Exception:
+                # MySQL before 8.0.22
+                status = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+            if status is None:
+                # Not replicating: a standalone server or the primary itself
+                return 0.0
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            # NULL while the replication threads are stopped
+            return float(lag) if lag is not None else float("inf")
+
+    async def probe(self, endpoint: Endpoint, data: dict) -> bool:
+        """Check that the replica answers and how far behind it is"""
+        endpoint.probing = True
+        start_time = time.time()
+        try:
+            with tracer.span("replica.probe", host=data.get("host")):
+                lag = await asyncio.to_thread(self._measure, data)
+            latency = (time.time() - start_time) * 1000
+            endpoint.latency_ms = latency if endpoint.latency_ms is None else \
+                REPLICA_LATENCY_SMOOTHING * latency + (1 - REPLICA_LATENCY_SMOOTHING) * endpoint.latency_ms
+            endpoint.lag_seconds = lag
+            endpoint.healthy = True
+            endpoint.error = None
+        except Exception as e:
+            if endpoint.healthy is not False:
+                logger.warning("Replica %s:%s failed its health check: %s", data.get("host"), data.get("port"), e)
+            endpoint.healthy = False
+            endpoint.error = str(e)
+        finally:
+            endpoint.checked_at = time.time()
+            endpoint.probing = False
+        return endpoint.healthy
+
+    def _probe_in_background(self, endpoint: Endpoint, data: dict):
+        task = asyncio.ensure_future(self.probe(endpoint, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def choose(self, connection_data: dict) -> Optional[tuple]:
+        """(endpoint, connection data) of the replica to read from, or None to use the primary"""
+        candidates = []
+        now = time.time()
+        for replica in connection_data.get("replicas") or []:
+            data = self.endpoint_data(connection_data, replica)
+            endpoint = self._endpoint(data)
+            if endpoint.healthy is None and not endpoint.probing:
+                # Never routed to before: find out now rather than guess
+                await self.probe(endpoint, data)
+            elif not endpoint.probing:
+                interval = REPLICA_HEALTH_INTERVAL_SECONDS if endpoint.healthy else REPLICA_RETRY_SECONDS
+                if now - endpoint.checked_at >= interval:
+                    self._probe_in_background(endpoint, data)
+            max_lag = replica.get("max_lag_seconds")
+            max_lag = REPLICA_MAX_LAG_SECONDS if max_lag is None else max_lag
+            if endpoint.healthy and endpoint.lag_seconds is not None and endpoint.lag_seconds <= max_lag:
+                candidates.append((endpoint, data))
+        if not candidates:
+            return None
+        # Fastest replica, discounted by the reads already running on it
+        return min(candidates, key=lambda candidate: (candidate[0].latency_ms or 0) * (candidate[0].inflight + 1))
+
+    async def read(self, connection_data: dict, run: Callable[[dict], Awaitable[Any]],
+                   failed: Callable[[Any], bool] = lambda result: False) -> Any:
+        """Run a read-only call on a replica when one is eligible, else (or if the replica died) on the primary"""
+        if not self.enabled or connection_data.get("db_type") not in REPLICA_TYPES or not connection_data.get("replicas"):
+            return await run(connection_data)
+
+        chosen = await self.choose(connection_data)
+        if chosen is None:
+            self.primary_reads += 1
+            return await run(connection_data)
+
+        endpoint, data = chosen
+        endpoint.inflight += 1
+        error = None
+        try:
+            with tracer.span("replica.read", host=data.get("host")):
+                result = await run(data)
+            if not failed(result):
+                self.replica_reads += 1
+                return result
+        except Exception as e:
+            error = e
+        finally:
+            endpoint.inflight -= 1
+
+        # A quick probe tells a dead replica from a query that fails anywhere
+        if await self.probe(endpoint, data):
+            self.replica_reads += 1
+            if error is not None:
+                raise error
+            return result
+        self.failovers += 1
+        self.primary_reads += 1
+        return await run(connection_data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints: List[Endpoint] = list(self._endpoints.values())
+        return {
+            "enabled": self.enabled,
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "failovers": self.failovers,
+            "endpoints": [{
+                "db_type": endpoint.key[0],
+                "host": endpoint.key[1],
+                "port": endpoint.key[2],
+                "database_name": endpoint.key[3],
+                "healthy": endpoint.healthy,
+                "lag_seconds": endpoint.lag_seconds if endpoint.lag_seconds != float("inf") else None,
+                "latency_ms": round(endpoint.latency_ms, 2) if endpoint.latency_ms is not None else None,
+                "inflight": endpoint.inflight,
+                "checked_at": endpoint.checked_at or None,
+                "error": endpoint.error
+            } for endpoint in endpoints]
+        }
+
+# Create global instance
+replica_router = ReplicaRouter()
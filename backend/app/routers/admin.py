@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Optional
+
+from app.database import get_db, User
+from app.auth import get_current_admin_user
+from app.tracing import tracer
+from app.profiling import profiler
+from app.singleflight import singleflight
+from app.scheduler import scheduler
+from app.live import live_hub
+from app.replicas import replica_router
+
+class TracingSettings(BaseModel):
+    enabled: Optional[bool] = None
+    buffer_size: Optional[int] = None
+
+class ProfilingSettings(BaseModel):
+    enabled: Optional[bool] = None
+    threshold_ms: Optional[float] = None
+    sample_rate: Optional[float] = None
+    max_profiles: Optional[int] = None
+
+class SchedulerSettings(BaseModel):
+    enabled: Optional[bool] = None
+    default_limit: Optional[int] = None
+    source: Optional[str] = None  # source key as listed by GET /scheduler
+    limit: Optional[int] = None
+
+class QueryBudget(BaseModel):
+    query_cost_budget: Optional[float] = None
+
+router = APIRouter()
+
+@router.get("/tracing")
+async def get_tracing_settings(current_user: User = Depends(get_current_admin_user)):
+    return {
+        "enabled": tracer.enabled,
+        "buffer_size": tracer.buffer_size,
+        "export_file": tracer.export_file
+    }
+
+@router.put("/tracing")
+async def update_tracing_settings(
+    settings: TracingSettings,
+    current_user: User = Depends(get_current_admin_user)
+):
+    if settings.buffer_size is not None and settings.buffer_size < 1:
+        raise HTTPException(status_code=400, detail="buffer_size must be positive")
+    tracer.configure(enabled=settings.enabled, buffer_size=settings.buffer_size)
+    return {"enabled": tracer.enabled, "buffer_size": tracer.buffer_size}
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = 50,
+    min_duration_ms: float = 0,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Most recent request traces, newest first"""
+    return tracer.get_traces(limit=limit, min_duration_ms=min_duration_ms)
+
+@router.get("/traces/{trace_id}")
+async def get_trace(
+    trace_id: str,
+    current_user: User = Depends(get_current_admin_user)
+):
+    trace = tracer.get_trace(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@router.delete("/traces")
+async def clear_traces(current_user: User = Depends(get_current_admin_user)):
+    tracer.clear()
+    return {"message": "Traces cleared"}
+
+@router.get("/profiling")
+async def get_profiling_settings(current_user: User = Depends(get_current_admin_user)):
+    return profiler.settings()
+
+@router.put("/profiling")
+async def update_profiling_settings(
+    settings: ProfilingSettings,
+    current_user: User = Depends(get_current_admin_user)
+):
+    if settings.sample_rate is not None and not 0 <= settings.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+    if settings.max_profiles is not None and settings.max_profiles < 1:
+        raise HTTPException(status_code=400, detail="max_profiles must be positive")
+    profiler.configure(**settings.dict(exclude_unset=True))
+    return profiler.settings()
+
+@router.get("/profiles")
+async def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """Captured slow-request profiles, slowest first"""
+    return profiler.get_profiles()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "text",
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download a profile as a text summary or as a pstats file (format=pstats)"""
+    record = profiler.get_profile(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "pstats":
+        return Response(
+            content=record["stats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+        )
+    elif format == "text":
+        return Response(content=record["summary"], media_type="text/plain")
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'text' or 'pstats'")
+
+@router.delete("/profiles")
+async def clear_profiles(current_user: User = Depends(get_current_admin_user)):
+    profiler.clear()
+    return {"message": "Profiles cleared"}
+
+@router.get("/singleflight")
+async def get_singleflight_stats(current_user: User = Depends(get_current_admin_user)):
+    """Executions started vs. identical concurrent calls that shared one"""
+    return singleflight.stats()
+
+@router.get("/live")
+async def get_live_stats(current_user: User = Depends(get_current_admin_user)):
+    """Live topics with a running producer and their connected subscribers"""
+    return live_hub.stats()
+
+@router.get("/scheduler")
+async def get_scheduler_stats(current_user: User = Depends(get_current_admin_user)):
+    """Per-source concurrency limits, running queries and queue depth by priority class"""
+    return scheduler.stats()
+
+@router.put("/scheduler")
+async def update_scheduler_settings(
+    settings: SchedulerSettings,
+    current_user: User = Depends(get_current_admin_user)
+):
+    if (settings.default_limit is not None and settings.default_limit < 1) or \
+            (settings.limit is not None and settings.limit < 1):
+        raise HTTPException(status_code=400, detail="Limits must be positive")
+    if (settings.source is None) != (settings.limit is None):
+        raise HTTPException(status_code=400, detail="source and limit must be set together")
+    scheduler.configure(**settings.dict(exclude_unset=True))
+    return scheduler.stats()
+
+@router.put("/users/{user_id}/query-budget")
+async def set_query_budget(
+    user_id: int,
+    budget: QueryBudget,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Set the maximum estimated planner cost a user's queries may have (null removes it)"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user.query_cost_budget = budget.query_cost_budget
+    db.commit()
+    
+    return {"user_id": user.id, "query_cost_budget": user.query_cost_budget}
+
+@router.get("/replicas")
+async def get_replica_status(current_user: User = Depends(get_current_admin_user)):
+    """Health, replication lag and latency of every read replica seen so far"""
+    return replica_router.stats()
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db, Dashboard as DBDashboard, User
-from app.schemas import DashboardCreate, DashboardUpdate, Dashboard
-from app.auth import get_current_user
+from app.database import get_db, Dashboard as DBDashboard, DatabaseConnection as DBConnection, ChartRefreshState, User
+from app.schemas import DashboardCreate, DashboardUpdate, Dashboard, ChartExecute
+from app.auth import get_current_user, get_user_from_token
+from app.incremental import incremental_refresher
+from app.scheduler import scheduler
+from app.chart_templates import chart_templates
+from app.db_manager import db_manager
+from app.routers.queries import prepare_connection_data
+from app.live import (live_hub, sse_stream, mongo_chart_watcher, dashboard_broadcaster,
+                      LIVE_REFRESH_SECONDS, LIVE_MIN_REFRESH_SECONDS)
 
 router = APIRouter()
 
@@ -26,7 +34,8 @@ async def create_dashboard(
         user_id=current_user.id,
         name=dashboard.name,
         description=dashboard.description,
-        charts=dashboard.charts  # Charts are already dictionaries
+        charts=[chart.dict() for chart in dashboard.charts],
+        filters=[dashboard_filter.dict() for dashboard_filter in dashboard.filters]
     )
     
     db.add(db_dashboard)
@@ -95,7 +104,201 @@ async def delete_dashboard(
     if not dashboard:
         raise HTTPException(status_code=404, detail="Dashboard not found")
     
+    db.query(ChartRefreshState).filter(ChartRefreshState.dashboard_id == dashboard_id).delete()
     db.delete(dashboard)
     db.commit()
     
     return {"message": "Dashboard deleted successfully"}
+
+@router.post("/{dashboard_id}/charts/{chart_index}/refresh")
+async def refresh_chart(
+    dashboard_id: int,
+    chart_index: int,
+    request: Request,
+    full: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Refresh an incremental chart, aggregating only rows past the stored watermark unless full=true"""
+    if "X-Query-Priority" not in request.headers:
+        scheduler.set_priority("dashboard")
+    
+    dashboard = db.query(DBDashboard).filter(
+        DBDashboard.id == dashboard_id,
+        DBDashboard.user_id == current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    if chart_index < 0 or chart_index >= len(dashboard.charts or []):
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    chart = dashboard.charts[chart_index]
+    if not chart.get("incremental"):
+        raise HTTPException(status_code=400, detail="Chart is not configured for incremental refresh")
+    
+    connection = db.query(DBConnection).filter(
+        DBConnection.id == chart["database_id"],
+        DBConnection.user_id == current_user.id
+    ).first()
+    
+    if not connection:
+        raise HTTPException(status_code=404, detail="Database connection not found")
+    
+    state_row = db.query(ChartRefreshState).filter(
+        ChartRefreshState.dashboard_id == dashboard_id,
+        ChartRefreshState.chart_index == chart_index
+    ).first()
+    state = None
+    if state_row and not full:
+        state = {"config_hash": state_row.config_hash, "watermark": state_row.watermark, "partials": state_row.partials,
+                 "watermark_partials": state_row.watermark_partials}
+    
+    try:
+        refreshed = await incremental_refresher.refresh(chart, prepare_connection_data(connection), state)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if refreshed["result"]["success"]:
+        if not state_row:
+            state_row = ChartRefreshState(dashboard_id=dashboard_id, chart_index=chart_index)
+            db.add(state_row)
+        state_row.config_hash = refreshed["state"]["config_hash"]
+        state_row.watermark = refreshed["state"]["watermark"]
+        state_row.partials = refreshed["state"]["partials"]
+        state_row.watermark_partials = refreshed["state"]["watermark_partials"]
+        db.commit()
+    
+    return refreshed["result"]
+
+@router.post("/{dashboard_id}/charts/{chart_index}/execute")
+async def execute_chart(
+    dashboard_id: int,
+    chart_index: int,
+    body: ChartExecute,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Run a chart's query template with typed parameter values bound server-side"""
+    if "X-Query-Priority" not in request.headers:
+        scheduler.set_priority("dashboard")
+    
+    dashboard = db.query(DBDashboard).filter(
+        DBDashboard.id == dashboard_id,
+        DBDashboard.user_id == current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    if chart_index < 0 or chart_index >= len(dashboard.charts or []):
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    chart = dashboard.charts[chart_index]
+    connection = db.query(DBConnection).filter(
+        DBConnection.id == chart["database_id"],
+        DBConnection.user_id == current_user.id
+    ).first()
+    
+    if not connection:
+        raise HTTPException(status_code=404, detail="Database connection not found")
+    try:
+        chart_templates.check_backend(db_manager.backends.get(connection.db_type))
+        params = chart_templates.resolve(chart, dashboard.filters, body.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # The template text is constant across parameter values, so it is prepared once per pooled connection
+    return await db_manager.execute_query(prepare_connection_data(connection), chart["query"],
+                                          body.limit or 1000, params, prepared=True)
+
+@router.get("/{dashboard_id}/charts/{chart_index}/live")
+async def live_chart(
+    dashboard_id: int,
+    chart_index: int,
+    request: Request,
+    token: str,
+    limit: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """Server-sent events with a MongoDB chart's result, pushed again when a change stream reports a relevant change"""
+    # EventSource cannot send an Authorization header
+    current_user = get_user_from_token(token, db)
+    
+    dashboard = db.query(DBDashboard).filter(
+        DBDashboard.id == dashboard_id,
+        DBDashboard.user_id == current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    if chart_index < 0 or chart_index >= len(dashboard.charts or []):
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    chart = dashboard.charts[chart_index]
+    connection = db.query(DBConnection).filter(
+        DBConnection.id == chart["database_id"],
+        DBConnection.user_id == current_user.id
+    ).first()
+    
+    if not connection:
+        raise HTTPException(status_code=404, detail="Database connection not found")
+    if connection.db_type not in ["mongodb", "mongodb-atlas"]:
+        raise HTTPException(status_code=400, detail="Change-stream live mode is only available for MongoDB charts")
+    
+    connection_data = prepare_connection_data(connection)
+    # The stream can stay open for hours; don't hold a metadata database session for it
+    db.close()
+    
+    # Every viewer of the same query on the same connection shares one change stream
+    key = ("mongo-chart", connection.id, chart["query"], limit)
+    producer = lambda publish: mongo_chart_watcher.run(connection_data, chart["query"], limit, publish)
+    return StreamingResponse(
+        sse_stream(live_hub, key, producer, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{dashboard_id}/live")
+async def live_dashboard(
+    dashboard_id: int,
+    request: Request,
+    token: str,
+    interval: float = LIVE_REFRESH_SECONDS,
+    limit: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """Server-sent events with every chart's result, refreshed once per interval and shared by all viewers"""
+    current_user = get_user_from_token(token, db)
+    
+    dashboard = db.query(DBDashboard).filter(
+        DBDashboard.id == dashboard_id,
+        DBDashboard.user_id == current_user.id
+    ).first()
+    
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    
+    charts = list(dashboard.charts or [])
+    connections = {}
+    for chart in charts:
+        if chart["database_id"] not in connections:
+            connection = db.query(DBConnection).filter(
+                DBConnection.id == chart["database_id"],
+                DBConnection.user_id == current_user.id
+            ).first()
+            connections[chart["database_id"]] = prepare_connection_data(connection) if connection else None
+    filters = dashboard.filters
+    interval = max(interval, LIVE_MIN_REFRESH_SECONDS)
+    # Viewers of the same dashboard version share one refresh loop
+    key = ("dashboard", dashboard.id, str(dashboard.updated_at), interval, limit)
+    db.close()
+    
+    producer = lambda publish: dashboard_broadcaster.run(
+        charts, [connections[chart["database_id"]] for chart in charts], filters, interval, limit, publish
+    )
+    return StreamingResponse(
+        sse_stream(live_hub, key, producer, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
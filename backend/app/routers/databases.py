@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import logging
 import os
-import uuid
-import shutil
+import sqlite3
 
 from app.database import get_db, DatabaseConnection as DBConnection, User
 from app.schemas import DatabaseConnectionCreate, DatabaseConnectionUpdate, DatabaseConnection, ConnectionTestResult, TableInfo
 from app.auth import get_current_user
 from app.db_manager import db_manager
+from app.mongo_manager import mongo_manager
+from app.backends import SQLITE_BACKED_TYPES
+from app.routers.queries import prepare_connection_data
+from app.sqlite_fts import sqlite_fts_manager
+from app.uploads import upload_manager
+from app.flatfile_import import flatfile_importer, FLAT_FILE_EXTENSIONS
 
 class ConnectionTestRequest(BaseModel):
     type: str  # Changed from db_type to match frontend
@@ -24,8 +31,24 @@ class ConnectionTestRequest(BaseModel):
 class ConnectWithPasswordRequest(BaseModel):
     password: str
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+def encrypt_replicas(replicas, stored: Optional[List[dict]] = None) -> Optional[List[dict]]:
+    """Replica endpoints with new passwords encrypted; an absent or empty password keeps the stored one"""
+    if replicas is None:
+        return None
+    stored_passwords = {(replica["host"], replica.get("port")): replica.get("password") for replica in stored or []}
+    encrypted = []
+    for replica in replicas:
+        if replica.password:
+            password = db_manager.encrypt_password(replica.password)
+        else:
+            password = stored_passwords.get((replica.host, replica.port))
+        encrypted.append({**replica.dict(), "password": password})
+    return encrypted
+
 @router.post("/test", response_model=ConnectionTestResult)
 async def test_connection_standalone(
     connection_request: ConnectionTestRequest,
@@ -33,53 +56,21 @@ async def test_connection_standalone(
 ):
     """Test a database connection without saving it"""
     
-    # Handle different database types
-    if connection_request.type == "mongodb-atlas":
-        if not connection_request.connectionString:
-            raise HTTPException(status_code=400, detail="MongoDB Atlas requires a connection string")
-        
-        connection_data = {
-            "db_type": "mongodb-atlas",
-            "connection_string": connection_request.connectionString,
-            "database_name": connection_request.database or "test",
-            "password": connection_request.password  # Include extracted password
-        }
-    elif connection_request.type == "sqlite":
-        if not connection_request.file_path and not connection_request.database:
-            raise HTTPException(status_code=400, detail="SQLite requires a file path")
-            
-        connection_data = {
-            "db_type": "sqlite",
-            "database_name": connection_request.file_path or connection_request.database
-        }
-    elif connection_request.type in ["redis"]:
-        connection_data = {
-            "db_type": connection_request.type,
-            "host": connection_request.host,
-            "port": connection_request.port,
-            "database_name": connection_request.database or "0",
-            "password": connection_request.password
-        }
-    else:
-        # Standard databases (PostgreSQL, MySQL, MongoDB, Cassandra)
-        required_fields = [connection_request.host, connection_request.database]
-        if connection_request.type not in ["redis"]:
-            required_fields.append(connection_request.username)
-            
-        if not all(required_fields):
-            if connection_request.type in ["redis"]:
-                raise HTTPException(status_code=400, detail="Host and database are required for Redis")
-            else:
-                raise HTTPException(status_code=400, detail="Host, database, and username are required")
-            
-        connection_data = {
-            "db_type": connection_request.type,
-            "host": connection_request.host,
-            "port": connection_request.port,
-            "database_name": connection_request.database,
-            "username": connection_request.username,
-            "password": connection_request.password
-        }
+    fields = {
+        "host": connection_request.host,
+        "port": connection_request.port,
+        "database_name": connection_request.database,
+        "username": connection_request.username,
+        "password": connection_request.password,
+        "connection_string": connection_request.connectionString,
+        "file_path": connection_request.file_path or connection_request.database
+    }
+    try:
+        backend = db_manager.backends.get(connection_request.type)
+        backend.validate(connection_request.type, fields)
+        connection_data = backend.connection_data(connection_request.type, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return await db_manager.test_connection(connection_data)
 
@@ -122,6 +113,7 @@ async def create_connection(
         password=encrypted_password,
         connection_string=connection.connection_string,  # Store MongoDB Atlas connection string
         file_path=connection.file_path,  # Store SQLite file path
+        replicas=encrypt_replicas(connection.replicas),
         status="disconnected"
     )
     
@@ -176,6 +168,8 @@ async def update_connection(
     # Encrypt password if provided
     if "password" in update_data and update_data["password"]:
         update_data["password"] = db_manager.encrypt_password(update_data["password"])
+    if "replicas" in update_data:
+        update_data["replicas"] = encrypt_replicas(connection_update.replicas, connection.replicas)
     
     # Update connection_string and file_path fields
     for field, value in update_data.items():
@@ -219,40 +213,10 @@ async def test_connection(
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
     
-    # Prepare connection data based on database type
-    if connection.db_type == "mongodb-atlas":
-        if not connection.connection_string:
-            return ConnectionTestResult(
-                success=False,
-                message="Connection failed",
-                error="MongoDB Atlas connection string not found"
-            )
-        connection_data = {
-            "db_type": connection.db_type,
-            "connection_string": connection.connection_string,
-            "database_name": connection.database_name
-        }
-    elif connection.db_type == "sqlite":
-        if not connection.file_path:
-            return ConnectionTestResult(
-                success=False,
-                message="Connection failed",
-                error="SQLite file path not found"
-            )
-        connection_data = {
-            "db_type": connection.db_type,
-            "database_name": connection.file_path
-        }
-    else:
-        # Standard databases (PostgreSQL, MySQL, etc.)
-        connection_data = {
-            "db_type": connection.db_type,
-            "host": connection.host,
-            "port": connection.port,
-            "database_name": connection.database_name,
-            "username": connection.username,
-            "password": db_manager.decrypt_password(connection.password) if connection.password else None
-        }
+    try:
+        connection_data = db_manager.connection_data_for(connection)
+    except ValueError as e:
+        return ConnectionTestResult(success=False, message="Connection failed", error=str(e))
     
     result = await db_manager.test_connection(connection_data)
     
@@ -278,50 +242,24 @@ async def connect_with_password(
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
     
-    # For MongoDB Atlas and SQLite, connect directly without password verification
-    if connection.db_type == "mongodb-atlas":
-        if not connection.connection_string:
-            return ConnectionTestResult(
-                success=False,
-                message="Connection failed",
-                error="MongoDB Atlas connection string not found"
-            )
-        connection_data = {
-            "db_type": connection.db_type,
-            "connection_string": connection.connection_string,
-            "database_name": connection.database_name
-        }
-    elif connection.db_type == "sqlite":
-        if not connection.file_path:
-            return ConnectionTestResult(
-                success=False,
-                message="Connection failed",
-                error="SQLite file path not found"
-            )
-        connection_data = {
-            "db_type": connection.db_type,
-            "database_name": connection.file_path
-        }
-    else:
-        # For other database types, verify password
-        if connection.password:
-            stored_password = db_manager.decrypt_password(connection.password)
-            if request.password != stored_password:
-                return ConnectionTestResult(
-                    success=False,
-                    message="Authentication failed",
-                    error="Invalid password"
-                )
-     
-        # Password verified, prepare connection data
-        connection_data = {
-            "db_type": connection.db_type,
-            "host": connection.host,
-            "port": connection.port,
-            "database_name": connection.database_name,
-            "username": connection.username,
-            "password": request.password
-        }
+    try:
+        backend = db_manager.backends.get(connection.db_type)
+        # For MongoDB Atlas and SQLite, connect directly without password verification
+        if backend.requires_password(connection.db_type):
+            if connection.password:
+                stored_password = db_manager.decrypt_password(connection.password)
+                if request.password != stored_password:
+                    return ConnectionTestResult(
+                        success=False,
+                        message="Authentication failed",
+                        error="Invalid password"
+                    )
+            # Password verified, connect with it
+            connection_data = db_manager.connection_data_for(connection, password=request.password)
+        else:
+            connection_data = db_manager.connection_data_for(connection)
+    except ValueError as e:
+        return ConnectionTestResult(success=False, message="Connection failed", error=str(e))
     
     result = await db_manager.test_connection(connection_data)
     
@@ -334,6 +272,7 @@ async def connect_with_password(
 @router.get("/{connection_id}/tables", response_model=List[TableInfo])
 async def get_tables(
     connection_id: int,
+    refresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -345,32 +284,11 @@ async def get_tables(
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
     
-    # Prepare connection data based on database type
-    if connection.db_type == "mongodb-atlas":
-        if not connection.connection_string:
-            raise HTTPException(status_code=400, detail="MongoDB Atlas connection string not found")
-        connection_data = {
-            "db_type": connection.db_type,
-            "connection_string": connection.connection_string,
-            "database_name": connection.database_name
-        }
-    elif connection.db_type == "sqlite":
-        if not connection.file_path:
-            raise HTTPException(status_code=400, detail="SQLite file path not found")
-        connection_data = {
-            "db_type": connection.db_type,
-            "database_name": connection.file_path
-        }
-    else:
-        # Standard databases (PostgreSQL, MySQL, etc.)
-        connection_data = {
-            "db_type": connection.db_type,
-            "host": connection.host,
-            "port": connection.port,
-            "database_name": connection.database_name,
-            "username": connection.username,
-            "password": db_manager.decrypt_password(connection.password) if connection.password else None
-        }
+    connection_data = prepare_connection_data(connection)
+    
+    if refresh and connection.db_type in ["mongodb", "mongodb-atlas"]:
+        # Sampled collection schemas are cached; refresh=true resamples them
+        mongo_manager.invalidate_schema_cache(connection_data)
     
     return await db_manager.get_tables(connection_data)
 
@@ -391,81 +309,206 @@ async def get_table_data(
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
     
-    # Prepare connection data based on database type
-    if connection.db_type == "mongodb-atlas":
-        if not connection.connection_string:
-            raise HTTPException(status_code=400, detail="MongoDB Atlas connection string not found")
-        connection_data = {
-            "db_type": connection.db_type,
-            "connection_string": connection.connection_string,
-            "database_name": connection.database_name
-        }
-    elif connection.db_type == "sqlite":
-        if not connection.file_path:
-            raise HTTPException(status_code=400, detail="SQLite file path not found")
-        connection_data = {
-            "db_type": connection.db_type,
-            "database_name": connection.file_path
-        }
-    else:
-        # Standard databases (PostgreSQL, MySQL, etc.)
-        connection_data = {
-            "db_type": connection.db_type,
-            "host": connection.host,
-            "port": connection.port,
-            "database_name": connection.database_name,
-            "username": connection.username,
-            "password": db_manager.decrypt_password(connection.password) if connection.password else None
-        }
+    connection_data = prepare_connection_data(connection)
     
     try:
         return await db_manager.get_table_data(connection_data, table_name, limit, offset)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching table data: {str(e)}")
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+
+async def finish_upload(file_path: str, original_filename: str, build_search_index: bool) -> dict:
+    """Response for a stored upload, optionally building its full-text search index"""
+    result = {
+        "success": True,
+        "message": "File uploaded successfully",
+        "file_path": file_path,
+        "unique_filename": os.path.basename(file_path),
+        "original_filename": original_filename,
+        # Extract database name (original filename without extension)
+        "database_name": os.path.splitext(original_filename)[0]
+    }
+    
+    if build_search_index:
+        try:
+            result["search_index"] = await asyncio.to_thread(sqlite_fts_manager.build_index, file_path)
+        except sqlite3.Error as e:
+            # The upload itself is still usable, search falls back to scanning
+            result["search_index_error"] = str(e)
+    
+    return result
+
 @router.post("/upload-sqlite")
 async def upload_sqlite_file(
     file: UploadFile = File(...),
+    build_search_index: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    """Upload SQLite file to backend data directory"""
+    """Upload SQLite file to backend data directory, optionally building its full-text search index"""
+    try:
+        file_path = await upload_manager.save_upload(file)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
     
-    # Validate file extension
-    if not file.filename or not file.filename.endswith(('.db', '.sqlite', '.sqlite3')):
+    return await finish_upload(file_path, file.filename, build_search_index)
+
+@router.post("/import-file", response_model=DatabaseConnection)
+async def import_flat_file(
+    file: UploadFile = File(...),
+    name: str = None,
+    table_name: str = None,
+    build_search_index: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Import a CSV/TSV/JSONL/Parquet file into a typed SQLite dataset and register it as a connection"""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in FLAT_FILE_EXTENSIONS:
         raise HTTPException(
-            status_code=400, 
-            detail="Only SQLite files (.db, .sqlite, .sqlite3) are allowed"
+            status_code=400,
+            detail=f"Only {', '.join(FLAT_FILE_EXTENSIONS)} files can be imported"
         )
     
-    # Generate unique filename to avoid conflicts
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    source_path = upload_manager.new_file_path(file.filename)
+    file_path = upload_manager.new_file_path("dataset.sqlite")
+    try:
+        await upload_manager.write_stream(upload_manager.read_upload_file(file), source_path)
+        result = await asyncio.to_thread(flatfile_importer.import_file, source_path, file_path, file.filename, table_name)
+    except HTTPException:
+        raise
+    except (ValueError, sqlite3.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+    
+    if build_search_index:
+        try:
+            await asyncio.to_thread(sqlite_fts_manager.build_index, file_path)
+        except sqlite3.Error as e:
+            logger.warning("Search index build failed for %s: %s", file_path, e)
+    
+    db_connection = DBConnection(
+        user_id=current_user.id,
+        name=name or file.filename,
+        db_type="flatfile",
+        database_name=os.path.splitext(file.filename)[0],
+        file_path=file_path,
+        status="connected"
+    )
+    
+    db.add(db_connection)
+    db.commit()
+    db.refresh(db_connection)
+    
+    return db_connection
+
+@router.post("/uploads")
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Start a resumable upload; send the file with PUT /uploads/{upload_id}?offset=N"""
+    return upload_manager.create_session(upload.filename, upload.size, current_user.id)
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Bytes received so far, i.e. the offset to resume from"""
+    return upload_manager.get_status(upload_id, current_user.id)
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = 0,
+    current_user: User = Depends(get_current_user)
+):
+    return await upload_manager.write_chunk(upload_id, current_user.id, offset, request.stream())
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    build_search_index: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    session = upload_manager.get_session(upload_id, current_user.id)
+    file_path = await upload_manager.complete_session(upload_id, current_user.id)
+    return await finish_upload(file_path, session["filename"], build_search_index)
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    await upload_manager.abort_session(upload_id, current_user.id)
+    return {"message": "Upload session aborted"}
+
+def get_sqlite_connection_file(connection_id: int, current_user: User, db: Session) -> str:
+    connection = db.query(DBConnection).filter(
+        DBConnection.id == connection_id,
+        DBConnection.user_id == current_user.id
+    ).first()
     
-    # Create data directory path
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    os.makedirs(data_dir, exist_ok=True)
+    if not connection:
+        raise HTTPException(status_code=404, detail="Connection not found")
+    if connection.db_type not in SQLITE_BACKED_TYPES:
+        raise HTTPException(status_code=400, detail="Search indexes are only available for SQLite connections")
+    if not connection.file_path or not os.path.exists(connection.file_path):
+        raise HTTPException(status_code=400, detail="SQLite file not found")
     
-    file_path = os.path.join(data_dir, unique_filename)
+    return connection.file_path
+
+@router.post("/{connection_id}/search-index")
+async def build_search_index(
+    connection_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """(Re)build the FTS5 side index used by explore search"""
+    file_path = get_sqlite_connection_file(connection_id, current_user, db)
     
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract database name (original filename without extension)
-        database_name = os.path.splitext(file.filename)[0]
-        
-        return {
-            "success": True,
-            "message": "File uploaded successfully",
-            "file_path": file_path,
-            "unique_filename": unique_filename,
-            "original_filename": file.filename,
-            "database_name": database_name
-        }
+        return await asyncio.to_thread(sqlite_fts_manager.build_index, file_path)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Search index build failed: {str(e)}")
+
+@router.get("/{connection_id}/search-index")
+async def get_search_index(
+    connection_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    file_path = get_sqlite_connection_file(connection_id, current_user, db)
+    
+    info = sqlite_fts_manager.get_index_info(file_path)
+    return {
+        "indexed": info is not None,
+        # An index file that no longer matches the database is ignored until rebuilt
+        "stale": info is None and os.path.exists(sqlite_fts_manager.index_path(file_path)),
+        "tables": [
+            {"table": table, "columns": meta["columns"], "row_count": meta["row_count"], "built_at": meta["built_at"]}
+            for table, meta in (info or {}).items()
+        ]
+    }
+
+@router.delete("/{connection_id}/search-index")
+async def delete_search_index(
+    connection_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    file_path = get_sqlite_connection_file(connection_id, current_user, db)
     
-    except Exception as e:
-        # Clean up file if upload failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
+    if not sqlite_fts_manager.delete_index(file_path):
+        raise HTTPException(status_code=404, detail="Search index not found")
+    return {"message": "Search index deleted successfully"}
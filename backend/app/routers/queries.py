@@ -1,41 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import asyncio
+import os
 
 from app.database import get_db, DatabaseConnection as DBConnection, QueryHistory, User
-from app.schemas import QueryExecute, QueryResult, QueryHistoryItem
+from app.schemas import QueryExecute, QueryResult, QueryHistoryItem, QueryPlan, FederatedQuery, FederatedQueryResult
 from app.auth import get_current_user
 from app.db_manager import db_manager
+from app.federation import federated_engine
+from app.tracing import tracer
+
+# Default per-query planner cost budget for users without their own (unset = no limit)
+QUERY_COST_BUDGET = float(os.getenv("QUERY_COST_BUDGET")) if os.getenv("QUERY_COST_BUDGET") else None
 
 router = APIRouter()
 
+def get_cost_budget(user: User) -> Optional[float]:
+    return user.query_cost_budget if user.query_cost_budget is not None else QUERY_COST_BUDGET
+
 def prepare_connection_data(connection: DBConnection):
     """Prepare connection data based on database type"""
-    if connection.db_type == "mongodb-atlas":
-        if not connection.connection_string:
-            raise HTTPException(status_code=400, detail="MongoDB Atlas connection string not found")
-        return {
-            "db_type": connection.db_type,
-            "connection_string": connection.connection_string,
-            "database_name": connection.database_name
-        }
-    elif connection.db_type == "sqlite":
-        if not connection.file_path:
-            raise HTTPException(status_code=400, detail="SQLite file path not found")
-        return {
-            "db_type": connection.db_type,
-            "database_name": connection.file_path
-        }
-    else:
-        # Standard databases (PostgreSQL, MySQL, MongoDB, etc.)
-        return {
-            "db_type": connection.db_type,
-            "host": connection.host,
-            "port": connection.port,
-            "database_name": connection.database_name,
-            "username": connection.username,
-            "password": db_manager.decrypt_password(connection.password) if connection.password else None
-        }
+    try:
+        return db_manager.connection_data_for(connection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/execute", response_model=QueryResult)
 async def execute_query(
@@ -44,6 +33,48 @@ async def execute_query(
     db: Session = Depends(get_db)
 ):
     # Get database connection
+    with tracer.span("router.load_connection"):
+        connection = db.query(DBConnection).filter(
+            DBConnection.id == query_data.database_id,
+            DBConnection.user_id == current_user.id
+        ).first()
+        
+        if not connection:
+            raise HTTPException(status_code=404, detail="Database connection not found")
+        
+        # Prepare connection data based on database type
+        connection_data = prepare_connection_data(connection)
+    
+    # Execute query, refused up front when its estimated cost exceeds the user's budget
+    result = await db_manager.execute_query(connection_data, query_data.query, query_data.limit,
+                                            flatten=query_data.flatten.dict() if query_data.flatten else None,
+                                            page_token=query_data.page_token,
+                                            cost_budget=get_cost_budget(current_user))
+    
+    # Save to query history
+    with tracer.span("router.save_query_history"):
+        query_history = QueryHistory(
+            user_id=current_user.id,
+            database_id=query_data.database_id,
+            query=query_data.query,
+            execution_time=result["execution_time"],
+            row_count=result["row_count"],
+            status="success" if result["success"] else "error",
+            error_message=result.get("error")
+        )
+        db.add(query_history)
+        db.commit()
+    
+    with tracer.span("router.build_response", rows=result["row_count"]):
+        return QueryResult(**result)
+
+@router.post("/explain", response_model=QueryPlan)
+async def explain_query(
+    query_data: QueryExecute,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Preview the execution plan and estimated cost of a query without running it"""
     connection = db.query(DBConnection).filter(
         DBConnection.id == query_data.database_id,
         DBConnection.user_id == current_user.id
@@ -52,26 +83,48 @@ async def execute_query(
     if not connection:
         raise HTTPException(status_code=404, detail="Database connection not found")
     
-    # Prepare connection data based on database type
     connection_data = prepare_connection_data(connection)
+    plan = await db_manager.explain_query(connection_data, query_data.query, query_data.limit)
     
-    # Execute query
-    result = await db_manager.execute_query(connection_data, query_data.query, query_data.limit)
+    budget = get_cost_budget(current_user)
+    plan["cost_budget"] = budget
+    if budget is not None and plan.get("estimated_cost") is not None:
+        plan["within_budget"] = plan["estimated_cost"] <= budget
     
-    # Save to query history
-    query_history = QueryHistory(
-        user_id=current_user.id,
-        database_id=query_data.database_id,
-        query=query_data.query,
-        execution_time=result["execution_time"],
-        row_count=result["row_count"],
-        status="success" if result["success"] else "error",
-        error_message=result.get("error")
-    )
-    db.add(query_history)
-    db.commit()
-    
-    return QueryResult(**result)
+    return QueryPlan(**plan)
+
+@router.post("/federated", response_model=FederatedQueryResult)
+async def execute_federated_query(
+    query_data: FederatedQuery,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Join data across connections: each source is loaded under its alias, then the query runs locally"""
+    sources = []
+    for source in query_data.sources:
+        connection = db.query(DBConnection).filter(
+            DBConnection.id == source.database_id,
+            DBConnection.user_id == current_user.id
+        ).first()
+        
+        if not connection:
+            raise HTTPException(status_code=404, detail=f"Database connection {source.database_id} not found")
+        
+        sources.append({
+            **source.dict(),
+            "filters": [condition.dict() for condition in source.filters],
+            "connection_data": prepare_connection_data(connection)
+        })
+    
+    try:
+        return await federated_engine.execute(sources, query_data.query, query_data.limit)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Federated query timed out while loading sources")
+    except HTTPException:
+        # e.g. the scheduler's 503 with Retry-After, which clients must see to back off
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Federated query failed: {str(e)}")
 
 @router.get("/history", response_model=List[QueryHistoryItem])
 async def get_query_history(
@@ -204,22 +257,24 @@ async def search_data(
     # Prepare connection data
     connection_data = prepare_connection_data(connection)
     
+    table_name = search_data.get("table")
+    search_term = search_data.get("search")
+    column = search_data.get("column")
     try:
-        table_name = search_data.get("table")
-        search_term = search_data.get("search")
-        column = search_data.get("column")
-        limit = search_data.get("limit", 50)
-        
-        if connection.db_type in ["mongodb", "mongodb-atlas"]:
-            # Search in MongoDB collection
-            from app.mongo_manager import mongo_manager
-            connection_string = db_manager.build_connection_string(connection_data)
-            result = mongo_manager.search_collection_data(connection_string, connection.database_name, table_name, search_term, limit)
-        else:
-            # Search in SQL table
-            connection_string = db_manager.build_connection_string(connection_data)
-            result = db_manager.search_table(connection_string, connection.db_type, table_name, search_term, column, limit)
-        
-        return result
+        limit = int(search_data.get("limit", 50))
+        page = int(search_data.get("page", 1))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'limit' and 'page' must be integers")
+    
+    if not table_name or not search_term:
+        raise HTTPException(status_code=400, detail="Both 'table' and 'search' are required")
+    if limit < 1 or page < 1:
+        raise HTTPException(status_code=400, detail="'limit' and 'page' must be positive")
+    
+    try:
+        return await db_manager.search_table(connection_data, table_name, search_term, column,
+                                             limit, (page - 1) * limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error searching data: {str(e)}")
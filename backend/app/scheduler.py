@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Concurrent queries admitted per source database
+SCHEDULER_SOURCE_CONCURRENCY = int(os.getenv("SCHEDULER_SOURCE_CONCURRENCY", "4"))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "200"))
+SCHEDULER_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SCHEDULER_QUEUE_TIMEOUT_SECONDS", "30"))
+# Waiters older than this are admitted ahead of higher classes so background work is never starved
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "10"))
+
+PRIORITIES = ("interactive", "dashboard", "background")
+
+_current_user = contextvars.ContextVar("scheduler_user", default=None)
+_current_priority = contextvars.ContextVar("scheduler_priority", default="interactive")
+
+
+class Waiter:
+    def __init__(self, user: Any, priority: str):
+        self.user = user
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SourceQueue:
+    """Admission state for one source: running queries plus per-class, per-user FIFO queues"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        # priority -> user -> waiters; users are served round-robin by rotating the OrderedDict
+        self.queues: Dict[str, "OrderedDict[Any, Deque[Waiter]]"] = {priority: OrderedDict() for priority in PRIORITIES}
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+
+    def queued(self) -> int:
+        return sum(len(waiters) for users in self.queues.values() for waiters in users.values())
+
+    def enqueue(self, waiter: Waiter):
+        self.queues[waiter.priority].setdefault(waiter.user, deque()).append(waiter)
+
+    def remove(self, waiter: Waiter):
+        users = self.queues[waiter.priority]
+        waiters = users.get(waiter.user)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del users[waiter.user]
+
+    def _pop_user(self, priority: str, user: Any) -> Waiter:
+        users = self.queues[priority]
+        waiter = users[user].popleft()
+        if users[user]:
+            users.move_to_end(user)
+        else:
+            del users[user]
+        return waiter
+
+    def next_waiter(self) -> Optional[Waiter]:
+        # Aged waiters first, oldest first, regardless of class
+        now = time.monotonic()
+        oldest = None
+        for priority, users in self.queues.items():
+            for user, waiters in users.items():
+                head = waiters[0]
+                if now - head.enqueued_at >= SCHEDULER_AGING_SECONDS and (
+                        oldest is None or head.enqueued_at < oldest.enqueued_at):
+                    oldest = head
+        if oldest is not None:
+            return self._pop_user(oldest.priority, oldest.user)
+
+        for priority in PRIORITIES:
+            users = self.queues[priority]
+            if users:
+                return self._pop_user(priority, next(iter(users)))
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.name,
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued(),
+            "queued_by_priority": {priority: sum(len(w) for w in users.values())
+                                   for priority, users in self.queues.items()},
+            "queued_users": len({user for users in self.queues.values() for user in users}),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_ms / self.admitted, 2) if self.admitted else 0
+        }
+
+
+class QueryScheduler:
+    """Per-source concurrency limits with priority classes and per-user fair queuing"""
+
+    def __init__(self, enabled: bool = SCHEDULER_ENABLED, default_limit: int = SCHEDULER_SOURCE_CONCURRENCY):
+        self.enabled = enabled
+        self.default_limit = default_limit
+        self.limits: Dict[str, int] = {}
+        self._sources: Dict[str, SourceQueue] = {}
+
+    def set_user(self, user_id: Any):
+        _current_user.set(user_id)
+
+    def set_priority(self, priority: str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {', '.join(PRIORITIES)}")
+        _current_priority.set(priority)
+
+    def source_key(self, connection_data: dict) -> str:
+        """The physical source, independent of which credentials or connection record reach it"""
+        parts = [connection_data.get(field) for field in
+                 ("db_type", "connection_string", "host", "port", "database_name", "file_path")]
+        digest = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:12]
+        label = connection_data.get("host") or os.path.basename(str(connection_data.get("database_name") or ""))
+        return f"{connection_data.get('db_type')}:{label}:{digest}"
+
+    def _source(self, key: str) -> SourceQueue:
+        source = self._sources.get(key)
+        if source is None:
+            source = self._sources[key] = SourceQueue(key, self.limits.get(key, self.default_limit))
+        return source
+
+    def _release(self, source: SourceQueue):
+        source.active -= 1
+        self._drain(source)
+
+    def _drain(self, source: SourceQueue):
+        """Admit waiters while the source has free slots"""
+        while source.active < source.limit:
+            waiter = source.next_waiter()
+            if waiter is None:
+                break
+            if waiter.future.done():
+                continue
+            source.active += 1
+            waiter.future.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, connection_data: dict):
+        """Hold one of the source's concurrency slots for the duration of the block"""
+        if not self.enabled:
+            yield
+            return
+
+        source = self._source(self.source_key(connection_data))
+        start = time.monotonic()
+        if source.active < source.limit and not source.queued():
+            source.active += 1
+        else:
+            if source.queued() >= SCHEDULER_MAX_QUEUE:
+                source.rejected += 1
+                raise HTTPException(status_code=503, detail="Source is overloaded, retry later",
+                                    headers={"Retry-After": "5"})
+            waiter = Waiter(_current_user.get(), _current_priority.get())
+            source.enqueue(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=SCHEDULER_QUEUE_TIMEOUT_SECONDS)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Admitted just as we gave up: hand the slot on
+                    self._release(source)
+                else:
+                    waiter.future.cancel()
+                    source.remove(waiter)
+                if isinstance(e, asyncio.TimeoutError):
+                    source.timeouts += 1
+                    raise HTTPException(status_code=503, detail="Timed out waiting for a free slot on the source",
+                                        headers={"Retry-After": "5"})
+                raise
+
+        source.admitted += 1
+        source.total_wait_ms += (time.monotonic() - start) * 1000
+        try:
+            yield
+        finally:
+            self._release(source)
+
+    def configure(self, enabled: Optional[bool] = None, default_limit: Optional[int] = None,
+                  source: Optional[str] = None, limit: Optional[int] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if default_limit is not None:
+            self.default_limit = default_limit
+            for key, queue in self._sources.items():
+                if key not in self.limits:
+                    queue.limit = default_limit
+        if source is not None and limit is not None:
+            self.limits[source] = limit
+            if source in self._sources:
+                self._sources[source].limit = limit
+        # Raised limits take effect immediately
+        for queue in self._sources.values():
+            self._drain(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "default_limit": self.default_limit,
+            "limits": self.limits,
+            "sources": [queue.stats() for queue in self._sources.values()]
+        }
+
+# Create global instance
+scheduler = QueryScheduler()
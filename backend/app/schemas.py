@@ -11,6 +11,7 @@ class DatabaseType(str, Enum):
     mongodb_atlas = "mongodb-atlas"
     redis = "redis"
     cassandra = "cassandra"
+    flatfile = "flatfile"  # CSV/JSONL/Parquet imported into SQLite
 
 class ChartType(str, Enum):
     bar = "bar"
@@ -34,12 +35,22 @@ class User(UserBase):
     id: int
     role: str
     is_active: bool
+    query_cost_budget: Optional[float] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 # Database connection schemas
+class ReplicaEndpointBase(BaseModel):
+    host: str
+    port: Optional[int] = None  # primary's port if unset
+    username: Optional[str] = None  # primary's credentials if unset
+    max_lag_seconds: Optional[float] = Field(None, ge=0)  # REPLICA_MAX_LAG_SECONDS if unset
+
+class ReplicaEndpoint(ReplicaEndpointBase):
+    password: Optional[str] = None  # on update, empty keeps the stored password of the same host and port
+
 class DatabaseConnectionBase(BaseModel):
     name: str
     db_type: DatabaseType
@@ -50,6 +61,7 @@ class DatabaseConnectionBase(BaseModel):
     password: Optional[str] = None
     connection_string: Optional[str] = None  # For MongoDB Atlas
     file_path: Optional[str] = None  # For SQLite file path
+    replicas: Optional[List[ReplicaEndpoint]] = None  # Read-only queries are routed to these
 
 class DatabaseConnectionCreate(DatabaseConnectionBase):
     pass
@@ -63,11 +75,13 @@ class DatabaseConnectionUpdate(BaseModel):
     password: Optional[str] = None
     connection_string: Optional[str] = None  # For MongoDB Atlas
     file_path: Optional[str] = None  # For SQLite file path
+    replicas: Optional[List[ReplicaEndpoint]] = None
 
 class DatabaseConnection(DatabaseConnectionBase):
     id: int
     user_id: int
     status: str
+    replicas: Optional[List[ReplicaEndpointBase]] = None  # Passwords are never returned
     created_at: datetime
     updated_at: datetime
     
@@ -75,10 +89,52 @@ class DatabaseConnection(DatabaseConnectionBase):
         from_attributes = True
 
 # Query schemas
+class MongoFlatten(BaseModel):
+    unwind: List[str] = []  # array paths exploded into one row per element, server-side
+    array_cap: Optional[int] = Field(None, ge=0)  # elements kept from other arrays; MONGO_FLATTEN_ARRAY_CAP if unset
+
 class QueryExecute(BaseModel):
     database_id: int
     query: str
     limit: Optional[int] = 1000
+    # MongoDB only: return nested documents as dotted-path columns
+    flatten: Optional[MongoFlatten] = None
+    # Cassandra only: next_page_token of the previous page
+    page_token: Optional[str] = None
+
+class FederatedFilter(BaseModel):
+    column: str
+    op: str = "="  # =, !=, <, <=, >, >=, in, like, is_null, not_null
+    value: Optional[Any] = None
+
+class FederatedSource(BaseModel):
+    alias: str  # table name of this source in the federated query
+    database_id: int
+    table: Optional[str] = None  # table/collection to project, with filters pushed down to the source
+    columns: Optional[List[str]] = None
+    filters: List[FederatedFilter] = []
+    query: Optional[str] = None  # native SQL or MongoDB query instead of table/columns/filters
+    limit: Optional[int] = None
+    index: Optional[List[str]] = None  # columns to index locally, e.g. join keys
+
+class FederatedQuery(BaseModel):
+    sources: List[FederatedSource]
+    query: str  # SQLite SQL over the source aliases
+    limit: Optional[int] = 1000
+
+class FederatedSourceStats(BaseModel):
+    alias: str
+    rows: int
+    truncated: bool
+    load_time: int
+
+class FederatedQueryResult(BaseModel):
+    success: bool
+    data: List[Dict[str, Any]]
+    columns: List[Dict[str, str]]
+    row_count: int
+    sources: List[FederatedSourceStats]
+    execution_time: int
 
 class QueryResult(BaseModel):
     success: bool
@@ -87,6 +143,29 @@ class QueryResult(BaseModel):
     row_count: int
     execution_time: int
     error: Optional[str] = None
+    next_page_token: Optional[str] = None
+
+class PlanNode(BaseModel):
+    operation: str
+    relation: Optional[str] = None
+    estimated_rows: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    full_scan: bool = False
+    detail: Optional[str] = None
+    children: List["PlanNode"] = []
+
+class QueryPlan(BaseModel):
+    success: bool
+    db_type: Optional[str] = None
+    plan: Optional[PlanNode] = None
+    estimated_rows: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    full_scan: bool = False
+    warnings: List[str] = []
+    cost_budget: Optional[float] = None
+    within_budget: Optional[bool] = None
+    execution_time: int = 0
+    error: Optional[str] = None
 
 class QueryHistoryItem(BaseModel):
     id: int
@@ -97,22 +176,62 @@ class QueryHistoryItem(BaseModel):
     executed_at: datetime
 
 # Dashboard schemas
+class IncrementalMeasure(BaseModel):
+    function: str  # count, sum, min, max, avg
+    column: Optional[str] = None  # omitted for count(*)
+    alias: str
+
+class IncrementalConfig(BaseModel):
+    watermark_column: str  # non-decreasing column, e.g. an auto-increment id or insert timestamp
+    group_by: List[str] = []
+    measures: List[IncrementalMeasure]
+
+class ParameterType(str, Enum):
+    string = "string"
+    integer = "integer"
+    number = "number"
+    boolean = "boolean"
+    date = "date"
+    datetime = "datetime"
+
+class ChartParameter(BaseModel):
+    name: str  # referenced in the query as :name
+    type: ParameterType = ParameterType.string
+    default: Optional[Any] = None
+    required: bool = False
+
+class DashboardFilter(BaseModel):
+    name: str  # fills the chart parameter with the same name
+    type: ParameterType = ParameterType.string
+    label: Optional[str] = None
+    default: Optional[Any] = None
+
 class ChartConfig(BaseModel):
     type: ChartType
     title: str
     query: str
     database_id: int
     config: Dict[str, Any]
+    # When set, query returns source rows and is aggregated incrementally from the last watermark
+    incremental: Optional[IncrementalConfig] = None
+    # Typed bind variables used by query
+    parameters: List[ChartParameter] = []
+
+class ChartExecute(BaseModel):
+    params: Dict[str, Any] = {}
+    limit: Optional[int] = 1000
 
 class DashboardCreate(BaseModel):
     name: str
     description: Optional[str] = None
     charts: List[ChartConfig]
+    filters: List[DashboardFilter] = []
 
 class DashboardUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     charts: Optional[List[ChartConfig]] = None
+    filters: Optional[List[DashboardFilter]] = None
 
 class Dashboard(BaseModel):
     id: int
@@ -120,6 +239,7 @@ class Dashboard(BaseModel):
     name: str
     description: Optional[str]
     charts: List[ChartConfig]
+    filters: Optional[List[DashboardFilter]] = None
     created_at: datetime
     updated_at: datetime
     
@@ -134,6 +254,7 @@ class ColumnInfo(BaseModel):
     primary_key: bool = False
     unique: bool = False
     default_value: Optional[str] = None
+    presence: Optional[float] = None  # share of sampled documents containing the field (MongoDB)
 
 class TableInfo(BaseModel):
     name: str
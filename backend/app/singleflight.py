@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# String literals and quoted identifiers are kept verbatim when normalizing
+QUOTED_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`)")
+READ_STATEMENT_PATTERN = re.compile(r"^\s*(\(\s*)*(SELECT|WITH|SHOW|DESCRIBE|EXPLAIN|VALUES)\b", re.IGNORECASE)
+WRITE_KEYWORD_PATTERN = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|GRANT|CALL|INTO)\b",
+                                   re.IGNORECASE)
+
+
+class Flight:
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight execution shared by every caller"""
+
+    def __init__(self, enabled: bool = SINGLEFLIGHT_ENABLED):
+        self.enabled = enabled
+        self._calls: Dict[str, Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def normalize_query(self, query: str) -> str:
+        """Collapse whitespace and trailing semicolons outside of quoted text"""
+        parts = QUOTED_PATTERN.split(query.strip().rstrip(";").strip())
+        return "".join(part if index % 2 else re.sub(r"\s+", " ", part) for index, part in enumerate(parts))
+
+    def is_read_statement(self, query: str) -> bool:
+        """Whether a SQL or CQL statement only reads"""
+        unquoted = " ".join(QUOTED_PATTERN.split(query)[::2])
+        return bool(READ_STATEMENT_PATTERN.match(unquoted)) and not WRITE_KEYWORD_PATTERN.search(unquoted)
+
+    def key(self, connection_data: dict, query: Any, *args: Any) -> str:
+        connection = json.dumps(connection_data, sort_keys=True, default=str)
+        normalized = self.normalize_query(query) if isinstance(query, str) else json.dumps(query, sort_keys=True, default=str)
+        return hashlib.sha256(json.dumps([connection, normalized, args], default=str).encode()).hexdigest()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run fn, or wait for the identical call already running; callers never share any part of a result"""
+        flight = self._calls.get(key)
+        if flight is None:
+            # A task, not the first caller's coroutine: a disconnecting caller must not cancel the others
+            flight = self._calls[key] = Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        flight.callers += 1
+        result = await asyncio.shield(flight.task)
+        # Nobody can join once the task is done, so a result with a single caller is handed over as is
+        return result if flight.callers == 1 else self.copy_result(result)
+
+    def copy_result(self, value: Any) -> Any:
+        """Copy of a JSON-shaped result down to every row and nested value"""
+        if isinstance(value, dict):
+            return {key: self.copy_result(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.copy_result(item) for item in value]
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
+
+# Create global instance
+singleflight = SingleFlight()
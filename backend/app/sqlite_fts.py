@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Declared column types with SQLite TEXT affinity (https://sqlite.org/datatype3.html#affinity)
+TEXT_AFFINITY_MARKERS = ("CHAR", "CLOB", "TEXT")
+
+
+class SQLiteFTSManager:
+    """Builds and queries contentless FTS5 side indexes stored next to uploaded SQLite files"""
+
+    def index_path(self, db_path: str) -> str:
+        return f"{db_path}.fts"
+
+    def _quote(self, identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def _open_readonly(self, path: str) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def build_index(self, db_path: str) -> Dict[str, Any]:
+        """Index every text column of every rowid table; blocking, run it off the event loop"""
+        start_time = time.time()
+        if not os.path.exists(db_path):
+            raise ValueError(f"SQLite file not found: {db_path}")
+
+        index_path = self.index_path(db_path)
+        tmp_path = f"{index_path}.building"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        source_stat = os.stat(db_path)
+        index = sqlite3.connect(tmp_path)
+        try:
+            index.execute("PRAGMA journal_mode = OFF")
+            index.execute("PRAGMA synchronous = OFF")
+            index.execute("ATTACH DATABASE ? AS src", (f"file:{db_path}?mode=ro",))
+            index.execute(
+                "CREATE TABLE fts_meta (table_name TEXT PRIMARY KEY, fts_table TEXT, columns TEXT, "
+                "row_count INTEGER, source_size INTEGER, source_mtime REAL, built_at REAL)"
+            )
+
+            tables = index.execute(
+                "SELECT name, sql FROM src.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+            indexed_tables = []
+            for position, (table_name, sql) in enumerate(tables):
+                sql_upper = (sql or "").upper()
+                # Virtual tables have no stable rowid and WITHOUT ROWID tables cannot be joined back by rowid
+                if sql_upper.startswith("CREATE VIRTUAL TABLE") or "WITHOUT ROWID" in sql_upper:
+                    continue
+                columns = [row[1] for row in index.execute(f"PRAGMA src.table_info({self._quote(table_name)})")
+                           if any(marker in (row[2] or "").upper() for marker in TEXT_AFFINITY_MARKERS)]
+                if not columns:
+                    continue
+
+                fts_table = f"fts_{position}"
+                column_list = ", ".join(self._quote(column) for column in columns)
+                index.execute(f"CREATE VIRTUAL TABLE {fts_table} USING fts5({column_list}, content='')")
+                index.execute(
+                    f"INSERT INTO {fts_table} (rowid, {column_list}) "
+                    f"SELECT rowid, {column_list} FROM src.{self._quote(table_name)}"
+                )
+                # Merge the b-tree segments written during the bulk insert into one
+                index.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('optimize')")
+                row_count = index.execute(f"SELECT COUNT(*) FROM src.{self._quote(table_name)}").fetchone()[0]
+                index.execute("INSERT INTO fts_meta VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                    table_name, fts_table, json.dumps(columns), row_count,
+                    source_stat.st_size, source_stat.st_mtime, time.time()
+                ))
+                indexed_tables.append({"table": table_name, "columns": columns, "row_count": row_count})
+
+            index.commit()
+            index.execute("DETACH DATABASE src")
+        except Exception:
+            index.close()
+            os.remove(tmp_path)
+            raise
+        index.close()
+        os.replace(tmp_path, index_path)
+
+        return {
+            "index_path": index_path,
+            "tables": indexed_tables,
+            "size_bytes": os.path.getsize(index_path),
+            "build_time": int((time.time() - start_time) * 1000)
+        }
+
+    def get_index_info(self, db_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Indexed tables keyed by name, or None if there is no index or it is stale"""
+        index_path = self.index_path(db_path)
+        if not os.path.exists(index_path) or not os.path.exists(db_path):
+            return None
+
+        index = self._open_readonly(index_path)
+        try:
+            rows = index.execute(
+                "SELECT table_name, fts_table, columns, row_count, source_size, source_mtime, built_at FROM fts_meta"
+            ).fetchall()
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            index.close()
+
+        source_stat = os.stat(db_path)
+        info = {}
+        for table_name, fts_table, columns, row_count, source_size, source_mtime, built_at in rows:
+            if source_size != source_stat.st_size or source_mtime != source_stat.st_mtime:
+                return None
+            info[table_name] = {
+                "fts_table": fts_table,
+                "columns": json.loads(columns),
+                "row_count": row_count,
+                "built_at": built_at
+            }
+        return info
+
+    def delete_index(self, db_path: str) -> bool:
+        index_path = self.index_path(db_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+            return True
+        return False
+
+    def search(self, db_path: str, table_name: str, fts_table: str, search_term: str,
+               column: Optional[str], limit: int, offset: int, time_limit_ms: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Match against the side index and fetch the matching rows from the source by rowid"""
+        phrase = '"' + search_term.replace('"', '""') + '"'
+        match_query = f"{self._quote(column)} : {phrase}" if column else phrase
+
+        conn = self._open_readonly(db_path)
+        try:
+            conn.execute("ATTACH DATABASE ? AS fts_index", (f"file:{self.index_path(db_path)}?mode=ro",))
+            deadline = time.monotonic() + time_limit_ms / 1000
+            conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+            cursor = conn.execute(
+                f"WITH matches AS (SELECT rowid, rank FROM fts_index.{fts_table} WHERE {fts_table} MATCH ? "
+                f"ORDER BY rank LIMIT ? OFFSET ?) "
+                f"SELECT source.* FROM matches JOIN main.{self._quote(table_name)} AS source "
+                f"ON source.rowid = matches.rowid ORDER BY matches.rank",
+                (match_query, limit, offset)
+            )
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return columns, rows
+        finally:
+            conn.close()
+
+# Create global instance
+sqlite_fts_manager = SQLiteFTSManager()
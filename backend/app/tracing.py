@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACING_BUFFER_SIZE = int(os.getenv("TRACING_BUFFER_SIZE", "200"))
+TRACING_EXPORT_FILE = os.getenv("TRACING_EXPORT_FILE")
+
+# The span currently open in this task/thread (None outside of a trace)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        # Set once the root span closes and the trace is exported; later spans start a trace of their own
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Span):
+        # Spans may be opened from worker threads (asyncio.to_thread copies the context)
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = self.spans[0] if self.spans else None
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": root.to_dict()["duration_ms"] if root else 0,
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+
+class Tracer:
+    """Lightweight in-process tracer producing per-request span waterfalls"""
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, buffer_size: int = TRACING_BUFFER_SIZE,
+                 export_file: Optional[str] = TRACING_EXPORT_FILE):
+        self.enabled = enabled
+        self.export_file = export_file
+        self._traces: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Open a span; starts a new trace when no span is active"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        if parent is not None and parent.trace.finished:
+            # A task that outlived its request (e.g. a live producer) copied the request's span
+            parent = None
+        trace = parent.trace if parent else Trace(name)
+        span = Span(trace, name, parent.span_id if parent else None, attributes)
+        trace.add_span(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            if parent is None:
+                self._finish(trace)
+
+    @property
+    def buffer_size(self) -> int:
+        return self._traces.maxlen
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace.trace_id if span else None
+
+    def _finish(self, trace: Trace):
+        trace.finished = True
+        trace_dict = trace.to_dict()
+        with self._lock:
+            self._traces.append(trace_dict)
+        if self.export_file:
+            try:
+                with open(self.export_file, "a") as f:
+                    f.write(json.dumps(trace_dict, default=str) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not export trace: {e}")
+
+    def get_traces(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        traces = [t for t in reversed(traces) if t["duration_ms"] >= min_duration_ms]
+        return traces[:limit]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for trace in self._traces:
+                if trace["trace_id"] == trace_id:
+                    return trace
+        return None
+
+    def configure(self, enabled: Optional[bool] = None, buffer_size: Optional[int] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if buffer_size is not None and buffer_size != self._traces.maxlen:
+            with self._lock:
+                self._traces = deque(self._traces, maxlen=buffer_size)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+# Create global instance
+tracer = Tracer()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+
+# Uploaded SQLite files and their search indexes
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "2048"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Resumable sessions untouched for this long are discarded
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+class HeaderValidator:
+    """Checks the SQLite header as soon as its first 100 bytes have been received"""
+
+    def __init__(self):
+        self.header = b""
+        self.expected_size: Optional[int] = None
+
+    def feed(self, chunk: bytes):
+        if len(self.header) >= 100:
+            return
+        self.header += chunk[:100 - len(self.header)]
+        if self.header[:len(SQLITE_HEADER)] != SQLITE_HEADER[:len(self.header)]:
+            raise HTTPException(status_code=400, detail="File is not a SQLite database")
+        if len(self.header) >= 100:
+            page_size = int.from_bytes(self.header[16:18], "big")
+            page_size = 65536 if page_size == 1 else page_size
+            page_count = int.from_bytes(self.header[28:32], "big")
+            # The in-header page count is only valid when the change counters match
+            if page_count and self.header[24:28] == self.header[92:96]:
+                self.expected_size = page_size * page_count
+
+
+class UploadManager:
+    """Streams uploads to disk off the event loop and validates them as SQLite databases"""
+
+    def __init__(self, data_dir: str = DATA_DIR, max_size_mb: int = MAX_UPLOAD_SIZE_MB):
+        self.data_dir = data_dir
+        self.sessions_dir = os.path.join(data_dir, "uploads")
+        self.max_size = max_size_mb * 1024 * 1024
+        # upload_id -> lock held while a chunk is written, the session completes or it is aborted
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def validate_filename(self, filename: Optional[str]):
+        if not filename or not filename.endswith(SQLITE_EXTENSIONS):
+            raise HTTPException(
+                status_code=400,
+                detail="Only SQLite files (.db, .sqlite, .sqlite3) are allowed"
+            )
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"File exceeds the {self.max_size // (1024 * 1024)} MB upload limit")
+
+    async def write_stream(self, chunks: AsyncIterator[bytes], path: str, offset: int = 0,
+                           validator: Optional[HeaderValidator] = None, max_size: Optional[int] = None) -> int:
+        """Append chunks to path starting at offset; returns the new file size
+
+        Stops reading as soon as the file would grow past max_size (an upload session's declared size).
+        """
+        size = offset
+        f = await asyncio.to_thread(open, path, "r+b" if offset else "wb")
+        try:
+            if offset:
+                await asyncio.to_thread(f.seek, offset)
+                await asyncio.to_thread(f.truncate)
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > self.max_size:
+                    raise self._too_large()
+                if max_size is not None and size > max_size:
+                    raise HTTPException(status_code=400, detail="Chunk extends past the declared upload size")
+                if validator:
+                    validator.feed(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return size
+
+    async def read_upload_file(self, file) -> AsyncIterator[bytes]:
+        """Iterate a Starlette UploadFile in UPLOAD_CHUNK_SIZE pieces"""
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def check_integrity(self, path: str, validator: HeaderValidator):
+        """Verify the full file; blocking, run it off the event loop"""
+        if len(validator.header) < 100:
+            raise HTTPException(status_code=400, detail="File is not a SQLite database")
+        if validator.expected_size is not None and os.path.getsize(path) < validator.expected_size:
+            raise HTTPException(status_code=400, detail="SQLite file is truncated")
+
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchall()
+        except sqlite3.DatabaseError as e:
+            raise HTTPException(status_code=400, detail=f"SQLite integrity check failed: {str(e)}")
+        finally:
+            conn.close()
+        if [row[0] for row in result] != ["ok"]:
+            problems = "; ".join(row[0] for row in result[:5])
+            raise HTTPException(status_code=400, detail=f"SQLite integrity check failed: {problems}")
+
+    def new_file_path(self, filename: str) -> str:
+        os.makedirs(self.data_dir, exist_ok=True)
+        return os.path.join(self.data_dir, f"{uuid.uuid4()}{os.path.splitext(filename)[1]}")
+
+    async def save_upload(self, file) -> str:
+        """Stream a multipart upload into the data directory and validate it"""
+        self.validate_filename(file.filename)
+        file_path = self.new_file_path(file.filename)
+        validator = HeaderValidator()
+        try:
+            await self.write_stream(self.read_upload_file(file), file_path, validator=validator)
+            await asyncio.to_thread(self.check_integrity, file_path, validator)
+        except BaseException:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        return file_path
+
+    # Resumable uploads: a .part file plus a JSON sidecar per session
+
+    def _session_paths(self, upload_id: str):
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        base = os.path.join(self.sessions_dir, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def _save_session(self, session: Dict[str, Any]):
+        _, meta_path = self._session_paths(session["upload_id"])
+        session["updated_at"] = time.time()
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(session, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _session_status(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: session[key] for key in ("upload_id", "filename", "size", "received", "chunk_size")}
+
+    def create_session(self, filename: str, size: int, user_id: int) -> Dict[str, Any]:
+        self.validate_filename(filename)
+        if size < 1:
+            raise HTTPException(status_code=400, detail="size must be positive")
+        if size > self.max_size:
+            raise self._too_large()
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self.cleanup_expired_sessions()
+
+        session = {
+            "upload_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "filename": filename,
+            "size": size,
+            "received": 0,
+            "chunk_size": UPLOAD_CHUNK_SIZE
+        }
+        part_path, _ = self._session_paths(session["upload_id"])
+        open(part_path, "wb").close()
+        self._save_session(session)
+        return self._session_status(session)
+
+    def get_session(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        _, meta_path = self._session_paths(upload_id)
+        if not os.path.exists(meta_path):
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        with open(meta_path) as f:
+            session = json.load(f)
+        if session["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return session
+
+    def get_status(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        return self._session_status(self.get_session(upload_id, user_id))
+
+    def _session_lock(self, upload_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(upload_id)
+        if lock is None:
+            lock = self._session_locks[upload_id] = asyncio.Lock()
+        return lock
+
+    async def write_chunk(self, upload_id: str, user_id: int, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Write a chunk at offset; resending from any offset up to the received size is allowed"""
+        self._session_paths(upload_id)
+        # Concurrent PUTs to one session would interleave truncates and writes on its part file
+        async with self._session_lock(upload_id):
+            session = self.get_session(upload_id, user_id)
+            if offset < 0 or offset > session["received"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Offset {offset} does not match received size {session['received']}"
+                )
+            part_path, _ = self._session_paths(upload_id)
+            validator = HeaderValidator() if offset == 0 else None
+            try:
+                size = await self.write_stream(chunks, part_path, offset, validator, max_size=session["size"])
+            except BaseException:
+                # Bytes before offset are intact; the resend after it was cut short, so resume from offset
+                await asyncio.to_thread(os.truncate, part_path, offset)
+                session["received"] = offset
+                self._save_session(session)
+                raise
+
+            session["received"] = size
+            self._save_session(session)
+            return self._session_status(session)
+
+    async def complete_session(self, upload_id: str, user_id: int) -> str:
+        """Validate the assembled file and move it into the data directory"""
+        self._session_paths(upload_id)
+        async with self._session_lock(upload_id):
+            session = self.get_session(upload_id, user_id)
+            if session["received"] != session["size"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload incomplete: received {session['received']} of {session['size']} bytes"
+                )
+            part_path, meta_path = self._session_paths(upload_id)
+            validator = HeaderValidator()
+            with open(part_path, "rb") as f:
+                validator.feed(f.read(100))
+            await asyncio.to_thread(self.check_integrity, part_path, validator)
+
+            file_path = self.new_file_path(session["filename"])
+            os.replace(part_path, file_path)
+            os.remove(meta_path)
+            return file_path
+
+    async def abort_session(self, upload_id: str, user_id: int):
+        self._session_paths(upload_id)
+        async with self._session_lock(upload_id):
+            self.get_session(upload_id, user_id)
+            for path in self._session_paths(upload_id):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def cleanup_expired_sessions(self):
+        """Remove sessions whose files have all been untouched for UPLOAD_SESSION_TTL_HOURS"""
+        cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+        sessions: Dict[str, list] = {}
+        for name in os.listdir(self.sessions_dir):
+            # <upload_id>.part, <upload_id>.json and a leftover <upload_id>.json.tmp
+            sessions.setdefault(name.split(".", 1)[0], []).append(os.path.join(self.sessions_dir, name))
+        for upload_id, paths in sessions.items():
+            lock = self._session_locks.get(upload_id)
+            if lock is not None and lock.locked():
+                continue
+            try:
+                if max(os.path.getmtime(path) for path in paths) >= cutoff:
+                    continue
+                for path in paths:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Completed or aborted meanwhile
+                continue
+
+# Create global instance
+upload_manager = UploadManager()
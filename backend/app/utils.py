@@ -39,34 +39,3 @@ def format_query_result(result: Dict[str, Any]) -> Dict[str, Any]:
                     row[key] = value.isoformat()
     
     return result
-
-def extract_json_objects(text: str):
-    """
-    Extracts all top-level JSON objects from a string.
-    Handles nested structures.
-    """
-    results = []
-    stack = []
-    start_index = -1
-
-    for i, char in enumerate(text):
-        if char == '{':
-            if not stack:
-                start_index = i
-            stack.append(char)
-        elif char == '}':
-            if stack and stack[-1] == '{':
-                stack.pop()
-                if not stack:
-                    # Found a complete top-level object
-                    obj_str = text[start_index:i+1]
-                    try:
-                        results.append(json.loads(obj_str))
-                    except json.JSONDecodeError:
-                        # This might happen with malformed json, ignore
-                        pass
-            else:
-                # Mismatched closing brace
-                pass
-    
-    return results
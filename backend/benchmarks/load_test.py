@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+HTTP load test simulating dashboard viewers against a running instance.
+
+Each virtual viewer logs in through /api/auth/login, then repeatedly opens a
+dashboard and replays its chart queries through /api/queries/execute, with up
+to --parallel-charts requests in flight per viewer (like a browser tab).
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 1,10,25,50
+
+Without --dashboard-id a SQLite dataset is generated, uploaded and wired into
+a dashboard first. Only the standard library is used.
+"""
+
+import argparse
+import datetime
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CHART_QUERIES = [
+    ("bar", "Orders by category", "SELECT category, COUNT(*) AS value FROM orders GROUP BY category"),
+    ("line", "Revenue per day", "SELECT substr(created_at, 1, 10) AS day, SUM(amount) AS value "
+                                "FROM orders GROUP BY day ORDER BY day"),
+    ("pie", "Top customers", "SELECT customer, SUM(amount) AS value FROM orders GROUP BY customer "
+                             "ORDER BY value DESC LIMIT 10"),
+    ("area", "Quantity per region", "SELECT region, SUM(quantity) AS value FROM orders GROUP BY region"),
+    ("bar", "Recent orders", "SELECT * FROM orders ORDER BY created_at DESC LIMIT 100")
+]
+
+
+class Client:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.token: Optional[str] = None
+
+    def request(self, method: str, path: str, payload: Any = None, body: bytes = None,
+                content_type: str = "application/json") -> Tuple[int, Any]:
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if payload is not None:
+            body = json.dumps(payload).encode()
+        if body is not None:
+            headers["Content-Type"] = content_type
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def login(self, email: str, password: str):
+        status, data = self.request("POST", "/api/auth/login", {"email": email, "password": password})
+        if status != 200:
+            raise RuntimeError(f"Login failed with status {status}")
+        self.token = data["token"]
+
+
+# Seeding
+
+def build_dataset(path: Path, rows: int):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, category TEXT, region TEXT, "
+                 "amount REAL, quantity INTEGER, created_at TEXT)")
+    base = datetime.datetime(2024, 1, 1)
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)", [(
+        i,
+        f"customer-{rng.randint(1, 2000)}",
+        rng.choice(["books", "games", "garden", "music", "toys"]),
+        rng.choice(["north", "south", "east", "west"]),
+        round(rng.random() * 300, 2),
+        rng.randint(1, 10),
+        (base + datetime.timedelta(minutes=i * 3)).isoformat()
+    ) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def seed(client: Client, rows: int) -> int:
+    """Upload a generated SQLite dataset and create a dashboard over it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "loadtest.sqlite"
+        build_dataset(path, rows)
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"loadtest.sqlite\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + path.read_bytes() + f"\r\n--{boundary}--\r\n".encode()
+    status, upload = client.request("POST", "/api/databases/upload-sqlite", body=body,
+                                    content_type=f"multipart/form-data; boundary={boundary}")
+    if status != 200:
+        raise RuntimeError(f"Dataset upload failed with status {status}")
+
+    status, connection = client.request("POST", "/api/databases/", {
+        "name": "Load test dataset",
+        "db_type": "sqlite",
+        "database_name": upload["database_name"],
+        "file_path": upload["file_path"]
+    })
+    if status != 200:
+        raise RuntimeError(f"Connection creation failed with status {status}")
+
+    status, dashboard = client.request("POST", "/api/dashboards/", {
+        "name": "Load test dashboard",
+        "description": "Generated by benchmarks/load_test.py",
+        "charts": [{"type": chart_type, "title": title, "query": query,
+                    "database_id": connection["id"], "config": {}}
+                   for chart_type, title, query in CHART_QUERIES]
+    })
+    if status != 200:
+        raise RuntimeError(f"Dashboard creation failed with status {status}")
+    return dashboard["id"]
+
+
+# Load generation
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.views = 0
+
+    def record(self, kind: str, latency_ms: float, ok: bool):
+        with self.lock:
+            self.latencies.setdefault(kind, []).append(latency_ms)
+            if not ok:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def timed(stats: Stats, kind: str, fn) -> Any:
+    start = time.perf_counter()
+    try:
+        status, data = fn()
+        ok = status == 200 and not (isinstance(data, dict) and data.get("success") is False)
+    except Exception:
+        status, data, ok = None, None, False
+    stats.record(kind, (time.perf_counter() - start) * 1000, ok)
+    return data
+
+
+def viewer(args, dashboard_id: int, stats: Stats, stop_at: float):
+    client = Client(args.base_url, args.timeout)
+
+    def login():
+        client.login(args.email, args.password)
+        return 200, None
+
+    timed(stats, "login", login)
+    if not client.token:
+        return
+
+    with ThreadPoolExecutor(max_workers=args.parallel_charts) as charts_pool:
+        while time.time() < stop_at:
+            dashboard = timed(stats, "dashboard", lambda: client.request("GET", f"/api/dashboards/{dashboard_id}"))
+            if dashboard:
+                futures = [charts_pool.submit(timed, stats, "chart_query", lambda chart=chart: client.request(
+                    "POST", "/api/queries/execute",
+                    {"database_id": chart["database_id"], "query": chart["query"], "limit": args.limit}
+                )) for chart in dashboard.get("charts", [])]
+                for future in futures:
+                    future.result()
+                with stats.lock:
+                    stats.views += 1
+            if args.think_time:
+                time.sleep(random.uniform(0, 2 * args.think_time))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(stats: Stats, concurrency: int, elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for kind, values in stats.latencies.items():
+        errors = stats.errors.get(kind, 0)
+        total_requests += len(values)
+        total_errors += errors
+        endpoints[kind] = {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "p50_ms": percentile(values, 50),
+            "p90_ms": percentile(values, 90),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": round(max(values), 2),
+            "mean_ms": round(statistics.mean(values), 2)
+        }
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "dashboard_views_per_s": round(stats.views / elapsed, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0,
+        "endpoints": endpoints
+    }
+
+
+def run_stage(args, dashboard_id: int, concurrency: int) -> Dict[str, Any]:
+    stats = Stats()
+    start = time.time()
+    stop_at = start + args.duration
+    threads = [threading.Thread(target=viewer, args=(args, dashboard_id, stats, stop_at), daemon=True)
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+        # Ramp viewers up over the first second instead of a synchronized burst
+        time.sleep(min(1.0 / concurrency, 0.05))
+    for thread in threads:
+        thread.join()
+    return summarize(stats, concurrency, time.time() - start)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard viewers")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--dashboard-id", type=int, help="Existing dashboard to replay (seeded when omitted)")
+    parser.add_argument("--seed-rows", type=int, default=100_000, help="Rows in the generated dataset")
+    parser.add_argument("--concurrency", default="1,5,10,25", help="Comma-separated viewer counts, one stage each")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per stage")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between dashboard refreshes")
+    parser.add_argument("--parallel-charts", type=int, default=6, help="Concurrent chart requests per viewer")
+    parser.add_argument("--limit", type=int, default=1000, help="Row limit sent with each chart query")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    dashboard_id = args.dashboard_id
+    if dashboard_id is None:
+        client = Client(args.base_url, args.timeout)
+        client.login(args.email, args.password)
+        dashboard_id = seed(client, args.seed_rows)
+        print(f"Seeded dashboard {dashboard_id} with {args.seed_rows} rows")
+
+    stages = []
+    for concurrency in [int(value) for value in args.concurrency.split(",") if value.strip()]:
+        print(f"Stage: {concurrency} concurrent viewers for {args.duration}s")
+        result = run_stage(args, dashboard_id, concurrency)
+        stages.append(result)
+        chart = result["endpoints"].get("chart_query", {})
+        print(f"  {result['throughput_rps']} req/s, {result['dashboard_views_per_s']} views/s, "
+              f"chart p50={chart.get('p50_ms')}ms p95={chart.get('p95_ms')}ms p99={chart.get('p99_ms')}ms, "
+              f"errors={result['error_rate']:.2%}")
+
+    report = {
+        "meta": {
+            "base_url": args.base_url,
+            "dashboard_id": dashboard_id,
+            "think_time": args.think_time,
+            "parallel_charts": args.parallel_charts,
+            "created_at": datetime.datetime.utcnow().isoformat()
+        },
+        "stages": stages
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
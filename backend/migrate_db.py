@@ -34,6 +34,44 @@ def migrate_database():
         else:
             print(f"✗ Error adding file_path column: {e}")
     
+    try:
+        cursor.execute("ALTER TABLE users ADD COLUMN query_cost_budget FLOAT")
+        print("✓ Added query_cost_budget column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" in str(e):
+            print("✓ query_cost_budget column already exists")
+        else:
+            print(f"✗ Error adding query_cost_budget column: {e}")
+    
+    try:
+        cursor.execute("ALTER TABLE dashboards ADD COLUMN filters JSON")
+        print("✓ Added filters column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" in str(e):
+            print("✓ filters column already exists")
+        else:
+            print(f"✗ Error adding filters column: {e}")
+    
+    try:
+        cursor.execute("ALTER TABLE database_connections ADD COLUMN replicas JSON")
+        print("✓ Added replicas column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" in str(e):
+            print("✓ replicas column already exists")
+        else:
+            print(f"✗ Error adding replicas column: {e}")
+    
+    try:
+        cursor.execute("ALTER TABLE chart_refresh_state ADD COLUMN watermark_partials JSON")
+        print("✓ Added watermark_partials column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" in str(e):
+            print("✓ watermark_partials column already exists")
+        elif "no such table" in str(e):
+            print("✓ chart_refresh_state table will be created with watermark_partials")
+        else:
+            print(f"✗ Error adding watermark_partials column: {e}")
+    
     # Commit changes and close connection
     conn.commit()
     conn.close()
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+# Before any app module is imported: keep the app database and uploads out of the source tree
+_TEST_DIR = tempfile.mkdtemp(prefix="dashboard-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'dashboard.db')}")
+os.environ.setdefault("DATA_DIR", os.path.join(_TEST_DIR, "data"))
+
+
+@pytest.fixture
+def sqlite_source(tmp_path):
+    """connection_data for a SQLite file with an events table of 5 rows"""
+    path = str(tmp_path / "source.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, amount INTEGER, ts INTEGER)")
+    conn.executemany("INSERT INTO events (kind, amount, ts) VALUES (?, ?, ?)",
+                     [("a", 1, 1), ("b", 2, 2), ("a", 3, 3), ("b", 4, 4), ("a", 5, 5)])
+    conn.commit()
+    conn.close()
+    return {"db_type": "sqlite", "database_name": path}
@@ -0,0 +1,111 @@
+import asyncio
+import contextlib
+import threading
+
+import pytest
+
+from app.backends import Backend, BackendRegistry
+from app.db_manager import db_manager
+
+
+class BrowseOnlyBackend(Backend):
+    db_types = ("partial",)
+
+    async def browse(self, connection_data: dict, table_name: str, limit: int = 10, offset: int = 0):
+        return {}
+
+
+def test_incomplete_backend_cannot_be_registered():
+    registry = BackendRegistry()
+
+    with pytest.raises(TypeError, match="connect, execute, introspect"):
+        registry.register(BrowseOnlyBackend())
+    with pytest.raises(TypeError, match="Expected a Backend instance"):
+        registry.register(BrowseOnlyBackend)
+    assert "partial" not in registry
+
+
+def test_every_registered_backend_is_complete():
+    for db_type in db_manager.backends.types():
+        assert not type(db_manager.backends.get(db_type)).__abstractmethods__
+
+
+def test_sql_backend_uses_the_public_manager_api(sqlite_source, monkeypatch):
+    backend = db_manager.backends.get("sqlite")
+    calls = []
+    for name in ("execute_sql", "explain_sql", "get_sql_table_data"):
+        method = getattr(db_manager, name)
+        monkeypatch.setattr(db_manager, name, lambda *args, method=method, name=name: calls.append(name) or method(*args))
+
+    async def main():
+        return (await backend.execute(sqlite_source, "SELECT kind FROM events", 2),
+                await backend.explain(sqlite_source, "SELECT * FROM events"),
+                await backend.browse(sqlite_source, "events", 2, 1))
+
+    executed, plan, page = asyncio.run(main())
+
+    assert calls == ["execute_sql", "explain_sql", "get_sql_table_data"]
+    assert executed["row_count"] == 2
+    assert plan["children"][0]["operation"] == "SCAN" and plan["children"][0]["full_scan"] is True
+    assert page["rows"] == [[2, "b", 2, 2], [3, "a", 3, 3]] and page["total_count"] == 5
+
+
+def stream_threads(monkeypatch):
+    """Record the thread each step of the blocking batch iterator runs on"""
+    threads = []
+    iter_query_batches = db_manager.iter_query_batches
+
+    def recording(*args):
+        batches = iter_query_batches(*args)
+        try:
+            while True:
+                threads.append(threading.get_ident())
+                batch = next(batches, None)
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            threads.append(threading.get_ident())
+            batches.close()
+
+    monkeypatch.setattr(db_manager, "iter_query_batches", recording)
+    return threads
+
+
+def test_sql_stream_keeps_the_cursor_on_one_thread(sqlite_source, monkeypatch):
+    backend = db_manager.backends.get("sqlite")
+    threads = stream_threads(monkeypatch)
+
+    async def main():
+        return [batch async for batch in backend.stream(sqlite_source, "SELECT kind, amount FROM events ORDER BY id", 2)]
+
+    batches = asyncio.run(main())
+
+    assert [[row["amount"] for row in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+    assert batches[0][0] == {"kind": "a", "amount": 1}
+    assert len(threads) == 5 and len(set(threads)) == 1
+    assert threads[0] != threading.get_ident()
+
+
+def test_sql_stream_releases_its_cursor_when_closed_early(sqlite_source, monkeypatch):
+    backend = db_manager.backends.get("sqlite")
+    threads = stream_threads(monkeypatch)
+
+    async def main():
+        async with contextlib.aclosing(backend.stream(sqlite_source, "SELECT * FROM events", 1)) as batches:
+            async for batch in batches:
+                return batch
+
+    assert asyncio.run(main()) == [{"id": 1, "kind": "a", "amount": 1, "ts": 1}]
+    # At most SQL_STREAM_PREFETCH batches were fetched, then the iterator was closed on its own thread
+    assert 2 <= len(threads) <= 4 and len(set(threads)) == 1
+
+
+def test_sql_stream_raises_driver_errors(sqlite_source):
+    backend = db_manager.backends.get("sqlite")
+
+    async def main():
+        return [batch async for batch in backend.stream(sqlite_source, "SELECT * FROM missing", 2)]
+
+    with pytest.raises(Exception, match="no such table"):
+        asyncio.run(main())
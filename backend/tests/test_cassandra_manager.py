@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import decimal
+import uuid
+
+import pytest
+
+import app.cassandra_manager as cassandra_module
+from app.backends.cassandra import CassandraBackend
+from app.cassandra_manager import CassandraManager
+
+CONNECTION = {"db_type": "cassandra", "host": "node1, node2", "port": 9042, "database_name": "ks"}
+QUERY = "SELECT * FROM events"
+
+
+class FakeResult:
+    def __init__(self, rows, paging_state):
+        self.current_rows = rows
+        self.paging_state = paging_state
+
+
+class FakeBound:
+    fetch_size = None
+
+
+class FakePrepared:
+    def bind(self, values):
+        return FakeBound()
+
+
+class FakeSession:
+    """Serves rows a page at a time; the paging state is the offset of the next row"""
+
+    def __init__(self, row_count):
+        self.rows = [{"id": i} for i in range(row_count)]
+        self.fetch_sizes = []
+        self.prepared = 0
+
+    def prepare(self, query):
+        self.prepared += 1
+        return FakePrepared()
+
+    def execute(self, statement, values=None, paging_state=None):
+        start = int(paging_state.decode()) if paging_state else 0
+        end = start + statement.fetch_size
+        self.fetch_sizes.append(statement.fetch_size)
+        return FakeResult(self.rows[start:end], str(end).encode() if end < len(self.rows) else None)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(cassandra_module, "CASSANDRA_FETCH_SIZE", 4)
+    manager = CassandraManager()
+    manager.session = FakeSession(10)
+    monkeypatch.setattr(manager, "get_session", lambda connection_data: manager.session)
+    return manager
+
+
+def test_iter_pages_walks_every_page(manager):
+    pages = list(manager.iter_pages(CONNECTION, QUERY, page_size=4))
+
+    assert [[row["id"] for row in rows] for rows, _ in pages] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert [state for _, state in pages] == [b"4", b"8", None]
+    # The statement is prepared once and reused for every page
+    assert manager.session.prepared == 1
+
+
+def test_collect_never_fetches_past_the_limit(manager):
+    rows, paging_state = manager._collect(CONNECTION, QUERY, 6, None, None)
+
+    assert [row["id"] for row in rows] == [0, 1, 2, 3, 4, 5]
+    assert paging_state == b"6"
+    assert manager.session.fetch_sizes == [4, 2]
+
+
+def test_collect_skips_rows_across_pages(manager):
+    rows, paging_state = manager._collect(CONNECTION, QUERY, 3, None, None, skip=5)
+
+    assert [row["id"] for row in rows] == [5, 6, 7]
+    assert paging_state == b"8"
+
+
+def test_collect_stops_at_the_last_page(manager):
+    rows, paging_state = manager._collect(CONNECTION, QUERY, 50, None, b"8")
+
+    assert [row["id"] for row in rows] == [8, 9]
+    assert paging_state is None
+
+
+def test_execute_query_resumes_from_its_page_token(manager):
+    first = asyncio.run(manager.execute_query(CONNECTION, QUERY + ";", 4))
+    second = asyncio.run(manager.execute_query(CONNECTION, QUERY, 4, page_token=first["next_page_token"]))
+    last = asyncio.run(manager.execute_query(CONNECTION, QUERY, 4, page_token=second["next_page_token"]))
+
+    assert [row["id"] for row in first["data"] + second["data"] + last["data"]] == list(range(10))
+    assert last["next_page_token"] is None
+
+
+def test_page_token_is_bound_to_its_query(manager):
+    token = manager.encode_page_token(QUERY, b"state")
+
+    assert manager.decode_page_token(QUERY, token) == b"state"
+    assert manager.encode_page_token(QUERY, None) is None
+    with pytest.raises(ValueError, match="does not belong"):
+        manager.decode_page_token("SELECT * FROM other", token)
+    with pytest.raises(ValueError, match="Invalid page token"):
+        manager.decode_page_token(QUERY, "not base64!")
+
+    result = asyncio.run(manager.execute_query(CONNECTION, "SELECT * FROM other", 4, page_token=token))
+    assert result["success"] is False and "does not belong" in result["error"]
+
+
+def test_browse_reports_more_rows_without_counting_them(manager):
+    first = asyncio.run(manager.get_table_data(CONNECTION, "events", limit=4, offset=4))
+    last = asyncio.run(manager.get_table_data(CONNECTION, "events", limit=4, offset=8))
+
+    assert first["rows"] == [[4], [5], [6], [7]] and first["total_count"] == 9
+    assert last["rows"] == [[8], [9]] and last["total_count"] == 10
+
+
+def test_backend_stream_yields_one_page_at_a_time(manager, monkeypatch):
+    monkeypatch.setattr("app.backends.cassandra.cassandra_manager", manager)
+
+    async def main():
+        return [batch async for batch in CassandraBackend().stream(CONNECTION, QUERY, batch_size=4)]
+
+    assert [len(batch) for batch in asyncio.run(main())] == [4, 4, 2]
+
+
+def test_serialize_row():
+    value = uuid.uuid4()
+    row = {"id": value, "price": decimal.Decimal("1.5"), "at": datetime.date(2024, 1, 2), "blob": b"\x01\xff",
+           "tags": {"b"}, "attrs": {"k": [1, 2]}}
+
+    assert CassandraManager().serialize_row(row) == {"id": str(value), "price": 1.5, "at": "2024-01-02",
+                                                      "blob": "0x01ff", "tags": ["b"], "attrs": {"k": [1, 2]}}
+
+
+def test_session_key_normalizes_contact_points():
+    key = CassandraManager()._session_key(CONNECTION)
+
+    assert key[:3] == (("node1", "node2"), 9042, "ks")
@@ -0,0 +1,39 @@
+import datetime
+
+import pytest
+
+from app.chart_templates import chart_templates
+from app.db_manager import db_manager
+
+
+@pytest.mark.parametrize("db_type", ["postgresql", "mysql", "sqlite", "flatfile"])
+def test_sql_backends_accept_templates(db_type):
+    chart_templates.check_backend(db_manager.backends.get(db_type))
+
+
+@pytest.mark.parametrize("db_type", ["mongodb", "mongodb-atlas", "redis", "cassandra"])
+def test_backends_without_prepared_statements_are_refused(db_type):
+    with pytest.raises(ValueError, match="only supported for SQL"):
+        chart_templates.check_backend(db_manager.backends.get(db_type))
+
+
+def test_bind_names_skip_casts_and_quoted_text():
+    template = "SELECT ':skip', x::text FROM t WHERE a = :a AND b > :b AND c = :a"
+
+    assert chart_templates.bind_names(template) == ["a", "b"]
+    assert chart_templates.to_positional(template) == (
+        "SELECT ':skip', x::text FROM t WHERE a = $1 AND b > $2 AND c = $1", ["a", "b"])
+
+
+def test_resolve_precedence_and_coercion():
+    chart = {"query": "SELECT * FROM t WHERE d >= :since AND n > :min", "parameters": [
+        {"name": "min", "type": "integer", "default": 1},
+        {"name": "since", "type": "date", "default": "2020-01-01"}
+    ]}
+    filters = [{"name": "since", "type": "date", "default": "2024-05-01"}]
+
+    assert chart_templates.resolve(chart, filters, {"min": "7"}) == {"since": datetime.date(2024, 5, 1), "min": 7}
+    with pytest.raises(ValueError, match="expects a value of type integer"):
+        chart_templates.resolve(chart, filters, {"min": 1.5})
+    with pytest.raises(ValueError, match="Unknown parameter"):
+        chart_templates.resolve(chart, filters, {"other": 1})
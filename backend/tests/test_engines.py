@@ -0,0 +1,102 @@
+import os
+import shutil
+import sqlite3
+import uuid
+
+import pytest
+import sqlalchemy
+from sqlalchemy import text
+
+import app.db_manager as db_module
+from app.db_manager import DatabaseManager, DATA_DIR, SQLITE_CACHE_SIZE_MB, SQLITE_MMAP_SIZE_MB
+
+
+@pytest.fixture
+def uploaded(sqlite_source):
+    """connection_data for a copy of sqlite_source inside DATA_DIR, like an uploaded dataset"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{uuid.uuid4().hex}.sqlite")
+    shutil.copyfile(sqlite_source["database_name"], path)
+    yield {"db_type": "sqlite", "database_name": path}
+    os.remove(path)
+
+
+def pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_uploaded_sqlite_is_opened_read_only_and_tuned(uploaded):
+    manager = DatabaseManager()
+
+    with manager.get_connection(uploaded) as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM events")).scalar() == 5
+        assert pragma(conn, "query_only") == 1
+        assert pragma(conn, "cache_size") == -SQLITE_CACHE_SIZE_MB * 1024
+        assert pragma(conn, "mmap_size") == SQLITE_MMAP_SIZE_MB * 1024 * 1024
+        with pytest.raises(sqlalchemy.exc.OperationalError, match="readonly|read-only|query_only"):
+            conn.execute(text("DELETE FROM events"))
+
+    engine = manager.get_sqlite_readonly_engine(uploaded["database_name"])
+    assert "mode=ro" in str(engine.url) and "immutable=1" in str(engine.url)
+    assert isinstance(engine.pool, sqlalchemy.pool.QueuePool)
+
+
+def test_sqlite_outside_the_data_dir_stays_writable(sqlite_source):
+    manager = DatabaseManager()
+
+    assert not manager.is_uploaded_sqlite(sqlite_source)
+    with manager.get_connection(sqlite_source) as conn:
+        assert pragma(conn, "query_only") == 0
+    assert manager._sqlite_engines == {}
+
+
+def test_read_only_engine_is_shared_until_the_file_changes(uploaded, monkeypatch):
+    manager = DatabaseManager()
+    path = uploaded["database_name"]
+    first = manager.get_sqlite_readonly_engine(path)
+    disposed = []
+    monkeypatch.setattr(first, "dispose", lambda: disposed.append(first))
+
+    assert manager.get_sqlite_readonly_engine(path) is first
+
+    # immutable=1 would keep serving the old pages, so a changed file gets a new engine
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO events (kind, amount, ts) VALUES ('c', 6, 6)")
+    conn.commit()
+    conn.close()
+    second = manager.get_sqlite_readonly_engine(path)
+
+    assert second is not first and disposed == [first]
+    with second.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM events")).scalar() == 6
+
+    manager.dispose_sqlite_engine(path)
+    assert path not in manager._sqlite_engines
+
+
+class FakeEngine:
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+        self.disposed = False
+
+    def dispose(self):
+        self.disposed = True
+
+
+def test_pooled_engines_are_shared_and_the_least_recently_used_is_evicted(monkeypatch):
+    monkeypatch.setattr(db_module, "create_engine", FakeEngine)
+    monkeypatch.setattr(db_module, "DB_ENGINE_CACHE_SIZE", 2)
+    manager = DatabaseManager()
+
+    a = manager.get_pooled_engine("postgresql://a")
+    b = manager.get_pooled_engine("postgresql://b")
+    assert manager.get_pooled_engine("postgresql://a") is a
+    assert a.options["pool_pre_ping"] is True and a.options["pool_size"] == db_module.DB_POOL_SIZE
+
+    # b is now the least recently used
+    c = manager.get_pooled_engine("postgresql://c")
+
+    assert list(manager._engines) == ["postgresql://a", "postgresql://c"]
+    assert b.disposed and not a.disposed and not c.disposed
+    assert manager.get_pooled_engine("postgresql://b") is not b
@@ -0,0 +1,140 @@
+import asyncio
+import sqlite3
+
+from app.db_manager import db_manager
+from app.mongo_manager import mongo_manager
+
+
+def operations(node):
+    """The plan tree as nested (operation, relation, full_scan) tuples"""
+    return (node["operation"], node["relation"], node["full_scan"], [operations(child) for child in node["children"]])
+
+
+def test_postgres_plan():
+    raw = {"Node Type": "Hash Join", "Plan Rows": 120, "Total Cost": 45.5, "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "orders", "Plan Rows": 1000, "Total Cost": 20.0},
+        {"Node Type": "Hash", "Plan Rows": 10, "Total Cost": 8.3, "Plans": [
+            {"Node Type": "Index Scan", "Relation Name": "users", "Index Name": "users_pkey", "Plan Rows": 10,
+             "Total Cost": 8.3}
+        ]}
+    ]}
+
+    plan = db_manager._normalize_postgres_plan(raw)
+
+    assert operations(plan) == ("Hash Join", None, False, [
+        ("Seq Scan", "orders", True, []),
+        ("Hash", None, False, [("Index Scan", "users", False, [])])
+    ])
+    assert plan["estimated_rows"] == 120.0 and plan["estimated_cost"] == 45.5
+    assert plan["children"][1]["children"][0]["detail"] == "users_pkey"
+    assert db_manager._collect_full_scans(plan) == ["orders"]
+
+
+def test_mysql_plan():
+    block = {
+        "select_id": 1,
+        "cost_info": {"query_cost": "12.40"},
+        "nested_loop": [
+            {"table": {"table_name": "o", "access_type": "ALL", "rows_examined_per_scan": 100,
+                       "cost_info": {"read_cost": "1.00", "prefix_cost": "11.00"}}},
+            {"table": {"table_name": "u", "access_type": "eq_ref", "key": "PRIMARY", "rows_examined_per_scan": 1,
+                       "cost_info": {"read_cost": "0.25", "prefix_cost": "12.40"}}}
+        ]
+    }
+
+    plan = db_manager._normalize_mysql_plan(block)
+
+    assert operations(plan) == ("Query", None, False, [
+        ("Table access (ALL)", "o", True, []),
+        ("Table access (eq_ref)", "u", False, [])
+    ])
+    assert plan["estimated_cost"] == 12.4 and plan["estimated_rows"] is None
+    assert plan["children"][1]["detail"] == "PRIMARY" and plan["children"][1]["estimated_cost"] == 12.4
+    assert db_manager._collect_full_scans(plan) == ["o"]
+
+
+def test_mysql_single_table_plan_takes_its_row_estimate():
+    block = {"cost_info": {"query_cost": "1.20"},
+             "table": {"table_name": "t", "access_type": "range", "key": "ix_ts", "rows_examined_per_scan": 7,
+                       "cost_info": {"read_cost": "1.20"}}}
+
+    plan = db_manager._normalize_mysql_plan(block)
+
+    assert plan["estimated_rows"] == 7.0
+    assert plan["children"][0]["estimated_cost"] == 1.2 and not plan["children"][0]["full_scan"]
+
+
+def test_mysql_derived_tables_nest_their_query_blocks():
+    block = {"table": {"table_name": "d", "access_type": "ALL", "rows_examined_per_scan": 5,
+                       "materialized_from_subquery": {"query_block": {
+                           "table": {"table_name": "t", "access_type": "ALL", "rows_examined_per_scan": 50}}}}}
+
+    plan = db_manager._normalize_mysql_plan(block)
+
+    assert operations(plan) == ("Query", None, False, [
+        ("Table access (ALL)", "d", True, [
+            ("Materialized From Subquery", None, False, [
+                ("Query Block", None, False, [("Table access (ALL)", "t", True, [])])
+            ])
+        ])
+    ])
+    assert db_manager._collect_full_scans(plan) == ["d", "t"]
+
+
+def test_sqlite_plan_rows():
+    rows = [
+        (2, 0, 0, "SCAN TABLE orders"),  # older SQLite wording
+        (4, 0, 0, "SEARCH users USING INTEGER PRIMARY KEY (rowid=?)"),
+        (7, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+        (9, 0, 0, "SCAN CONSTANT ROW"),
+    ]
+
+    plan = db_manager._normalize_sqlite_plan(rows)
+
+    assert operations(plan) == ("Query", None, False, [
+        ("SCAN", "orders", True, []),
+        ("SEARCH", "users", False, []),
+        ("USE", None, False, []),
+        ("SCAN", None, False, []),
+    ])
+    assert plan["children"][1]["detail"].startswith("SEARCH users USING")
+
+
+def test_sqlite_explain_against_a_real_database(sqlite_source):
+    conn = sqlite3.connect(sqlite_source["database_name"])
+    conn.execute("CREATE INDEX ix_kind ON events (kind)")
+    conn.close()
+
+    async def explain(query):
+        return await db_manager.explain_query(sqlite_source, query)
+
+    scan = asyncio.run(explain("SELECT * FROM events WHERE amount > 2"))
+    search = asyncio.run(explain("SELECT * FROM events WHERE kind = 'a'"))
+
+    assert scan["success"] and scan["full_scan"] is True
+    assert scan["warnings"] == ["Query scans the whole table 'events'"]
+    assert search["success"] and search["full_scan"] is False and search["warnings"] == []
+    assert search["plan"]["children"][0]["operation"] == "SEARCH"
+
+    failed = asyncio.run(explain("SELECT * FROM missing"))
+    assert failed["success"] is False and "no such table" in failed["error"]
+
+
+def test_mongo_plan():
+    winning = {"queryPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+        "stage": "OR", "inputStages": [
+            {"stage": "IXSCAN", "indexName": "status_1"},
+            {"stage": "COLLSCAN"}
+        ]}}}}
+
+    plan = mongo_manager._normalize_plan(winning, "orders", 500)
+
+    assert operations(plan) == ("LIMIT", None, False, [
+        ("FETCH", "orders", False, [
+            ("OR", None, False, [("IXSCAN", "orders", False, []), ("COLLSCAN", "orders", True, [])])
+        ])
+    ])
+    # Row estimates come from the collection size of a scan
+    assert plan["children"][0]["children"][0]["children"][1]["estimated_rows"] == 500.0
+    assert plan["children"][0]["children"][0]["children"][0]["detail"] == "status_1"
+    assert db_manager._collect_full_scans(plan) == ["orders"]
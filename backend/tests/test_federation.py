@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app.federation as federation
+from app.db_manager import db_manager
+from app.federation import LocalStore, federated_engine
+
+
+def run(sources, query, limit=1000):
+    return asyncio.run(federated_engine.execute(sources, query, limit))
+
+
+def test_source_within_limit_is_not_truncated(sqlite_source):
+    result = run([{"alias": "e", "connection_data": sqlite_source, "table": "events", "limit": 5}],
+                 "SELECT COUNT(*) AS n FROM e")
+
+    assert result["data"] == [{"n": 5}]
+    assert result["sources"][0]["rows"] == 5
+    assert result["sources"][0]["truncated"] is False
+
+
+def test_source_over_limit_is_truncated(sqlite_source):
+    result = run([{"alias": "e", "connection_data": sqlite_source, "table": "events", "limit": 3}],
+                 "SELECT COUNT(*) AS n FROM e")
+
+    assert result["data"] == [{"n": 3}]
+    assert result["sources"][0]["rows"] == 3
+    assert result["sources"][0]["truncated"] is True
+
+
+def test_query_source_is_truncated_in_batches(sqlite_source, monkeypatch):
+    monkeypatch.setattr(federation, "FEDERATION_BATCH_SIZE", 2)
+    result = run([{"alias": "e", "connection_data": sqlite_source,
+                   "query": "SELECT kind, amount FROM events ORDER BY id", "limit": 3}],
+                 "SELECT amount FROM e ORDER BY amount")
+
+    assert [row["amount"] for row in result["data"]] == [1, 2, 3]
+    assert result["sources"][0]["truncated"] is True
+
+
+def test_join_across_sources(sqlite_source):
+    result = run([
+        {"alias": "a", "connection_data": sqlite_source, "table": "events", "filters": [
+            {"column": "kind", "op": "=", "value": "a"}]},
+        {"alias": "b", "connection_data": sqlite_source, "table": "events", "columns": ["ts", "kind"]}
+    ], "SELECT a.amount, b.kind FROM a JOIN b ON a.ts = b.ts ORDER BY a.amount")
+
+    assert [(row["amount"], row["kind"]) for row in result["data"]] == [(1, "a"), (3, "a"), (5, "a")]
+
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM e",
+    "INSERT INTO e (id) VALUES (99)",
+    "CREATE TABLE other (x)",
+    "ATTACH DATABASE ':memory:' AS other",
+    "PRAGMA journal_mode = WAL",
+])
+def test_authorizer_only_allows_reads(sqlite_source, query):
+    with pytest.raises(sqlite3.DatabaseError, match="not authorized"):
+        run([{"alias": "e", "connection_data": sqlite_source, "table": "events"}], query)
+
+
+def test_store_only_allows_select_after_loading():
+    store = LocalStore()
+    try:
+        store.insert("t", ["x"], [(1,), (2,)])
+        store.finish_loading({"t": ["x"]})
+
+        assert store.query("SELECT SUM(x) FROM t", 10)[1] == [(3,)]
+        with pytest.raises(sqlite3.DatabaseError):
+            store.query("UPDATE t SET x = 0", 10)
+    finally:
+        store.close()
+    assert not os.path.exists(store.path)
+
+
+def test_timeout_stops_loader_threads_before_closing_the_store(sqlite_source, monkeypatch):
+    batches_pulled = []
+    closed = threading.Event()
+
+    def slow_batches(connection_data, statement, batch_size):
+        try:
+            while True:
+                time.sleep(0.05)
+                batches_pulled.append(1)
+                yield ["x"], [(1,)]
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(db_manager, "iter_query_batches", slow_batches)
+    monkeypatch.setattr(federation, "FEDERATION_TIMEOUT_SECONDS", 0.2)
+    stores, insert_errors = [], []
+    insert = LocalStore.insert
+
+    def recording_insert(store, *args):
+        try:
+            insert(store, *args)
+        except Exception as e:
+            insert_errors.append(e)
+            raise
+
+    monkeypatch.setattr(LocalStore, "insert", recording_insert)
+    monkeypatch.setattr(federation, "LocalStore", lambda: stores.append(LocalStore()) or stores[-1])
+
+    with pytest.raises(asyncio.TimeoutError):
+        run([{"alias": "e", "connection_data": sqlite_source, "query": "SELECT 1"}], "SELECT * FROM e")
+
+    # The loader saw the cancellation and left before the store closed: no insert hit a closed connection
+    assert insert_errors == []
+    assert closed.is_set()
+    pulled = len(batches_pulled)
+    time.sleep(0.15)
+    assert len(batches_pulled) == pulled
+    assert not os.path.exists(stores[0].path)
+
+
+def test_insert_after_cancellation_is_refused():
+    store = LocalStore()
+    store.close()
+    with pytest.raises(RuntimeError, match="cancelled"):
+        store.insert("t", ["x"], [(1,)])
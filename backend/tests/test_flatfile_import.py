@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+import pytest
+
+import app.flatfile_import as flatfile_module
+from app.flatfile_import import flatfile_importer
+
+
+def import_text(tmp_path, filename, text):
+    """Import text as filename; returns (result, rows as dicts with (value, sqlite typeof) pairs)"""
+    source = tmp_path / filename
+    source.write_text(text)
+    target = str(tmp_path / "dataset.sqlite")
+    result = flatfile_importer.import_file(str(source), target, filename)
+    conn = sqlite3.connect(target)
+    columns = [column["name"] for column in result["columns"]]
+    select = ", ".join(f'"{column}", typeof("{column}")' for column in columns)
+    rows = [{column: (row[2 * i], row[2 * i + 1]) for i, column in enumerate(columns)}
+            for row in conn.execute(f'SELECT {select} FROM "{result["table"]}"')]
+    conn.close()
+    return result, rows
+
+
+def test_numbers_are_typed_and_identifiers_keep_their_text(tmp_path):
+    result, rows = import_text(tmp_path, "People List.csv",
+                               "id,zip,phone,code,qty,price,delta,joined\n"
+                               "1,01234,+15551234,007,3,9.5,-4,2024-01-02\n"
+                               "2,98765,+15550000,123,,10,7,2024-02-03T04:05:06\n")
+
+    assert result["table"] == "people_list" and result["row_count"] == 2
+    assert {column["name"]: column["type"] for column in result["columns"]} == {
+        "id": "INTEGER", "zip": "TEXT", "phone": "TEXT", "code": "TEXT", "qty": "INTEGER",
+        "price": "REAL", "delta": "INTEGER", "joined": "TIMESTAMP"}
+    assert rows[0]["zip"] == ("01234", "text")
+    assert rows[0]["phone"] == ("+15551234", "text")
+    assert rows[0]["code"] == ("007", "text")
+    assert rows[0]["delta"] == (-4, "integer")
+    assert rows[1]["price"] == (10.0, "real")
+    assert rows[1]["qty"] == (None, "null")
+
+
+@pytest.mark.parametrize("value", ["1,000", "1e5000", " 5", "0x1F", "nan", "inf", "12345678901234567890"])
+def test_non_canonical_numbers_stay_text(tmp_path, value):
+    result, rows = import_text(tmp_path, "t.csv", f'v\n"{value}"\n')
+
+    assert result["columns"] == [{"name": "v", "type": "TEXT"}]
+    assert rows[0]["v"] == (value, "text")
+
+
+def test_types_are_inferred_over_every_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(flatfile_module, "IMPORT_BATCH_ROWS", 2)
+
+    result, rows = import_text(tmp_path, "t.csv", "a,b,c,d\n1,1,,x\n2,2,,y\n3,2.5,,z\n04,4,5,w\n")
+
+    assert [column["type"] for column in result["columns"]] == ["TEXT", "REAL", "INTEGER", "TEXT"]
+    assert [row["a"] for row in rows] == [("1", "text"), ("2", "text"), ("3", "text"), ("04", "text")]
+    assert [row["b"][0] for row in rows] == [1.0, 2.0, 2.5, 4.0]
+    assert [row["c"] for row in rows][-1] == (5, "integer")
+
+
+def test_jsonl_keeps_first_batch_keys_and_serializes_nested_values(tmp_path, monkeypatch):
+    monkeypatch.setattr(flatfile_module, "IMPORT_BATCH_ROWS", 1)
+    lines = [{"id": 1, "tags": ["a"], "zip": "01234"}, {"id": 2, "zip": "02139", "extra": True}]
+
+    result, rows = import_text(tmp_path, "events.jsonl", "\n".join(json.dumps(line) for line in lines))
+
+    assert [column["name"] for column in result["columns"]] == ["id", "tags", "zip"]
+    assert rows == [
+        {"id": (1, "integer"), "tags": ('["a"]', "text"), "zip": ("01234", "text")},
+        {"id": (2, "integer"), "tags": (None, "null"), "zip": ("02139", "text")},
+    ]
+
+
+def test_failed_import_leaves_no_files(tmp_path):
+    (tmp_path / "empty.csv").write_text("")
+
+    with pytest.raises(Exception):
+        flatfile_importer.import_file(str(tmp_path / "empty.csv"), str(tmp_path / "out.sqlite"), "empty.csv")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["empty.csv"]
+
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        list(flatfile_importer.iter_batches(str(tmp_path / "x.xlsx"), ".xlsx"))
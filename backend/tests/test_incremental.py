@@ -0,0 +1,135 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.db_manager import db_manager
+from app.incremental import incremental_refresher
+
+CONFIG = {
+    "watermark_column": "ts",
+    "group_by": ["kind"],
+    "measures": [
+        {"function": "count", "alias": "n"},
+        {"function": "sum", "column": "amount", "alias": "total"},
+        {"function": "avg", "column": "amount", "alias": "mean"},
+        {"function": "max", "column": "amount", "alias": "largest"}
+    ]
+}
+
+
+def chart(connection_data, query="SELECT * FROM events"):
+    return {"database_id": 1, "query": query, "incremental": CONFIG}
+
+
+def refresh(connection_data, state=None, query="SELECT * FROM events"):
+    return asyncio.run(incremental_refresher.refresh(chart(connection_data, query), connection_data, state))
+
+
+def by_kind(result):
+    return {row["kind"]: row for row in result["data"]}
+
+
+def insert(connection_data, rows):
+    conn = sqlite3.connect(connection_data["database_name"])
+    conn.executemany("INSERT INTO events (kind, amount, ts) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_postgres_rewrite_leaves_the_wrapped_chart_query_alone():
+    sql = incremental_refresher.build_query("SELECT * FROM events", CONFIG, "postgresql", True)
+    prepared = db_manager.prepare_sql_query({"db_type": "postgresql"}, sql, 1000)
+
+    assert prepared == f"{sql} LIMIT 1000"
+    assert "FROM (SELECT * FROM events) AS incremental_source WHERE \"ts\" >= :watermark" in prepared
+    assert prepared.startswith('SELECT "kind" AS "kind", COUNT(*) AS m0, SUM("amount") AS m1, SUM("amount") AS m2_sum')
+    assert prepared.count("MAX(\"amount\") AS m3") == 1
+
+
+def test_postgres_quotes_mixed_case_columns_of_the_chart_query():
+    sql = incremental_refresher.build_query("SELECT userId, kind, ts FROM events", CONFIG, "postgresql", False)
+    prepared = db_manager.prepare_sql_query({"db_type": "postgresql"}, sql, 1000)
+
+    assert '(SELECT "userId", kind, ts FROM events) AS incremental_source' in prepared
+    assert " WHERE " not in prepared
+
+
+def test_postgres_rewrite_only_touches_the_outermost_select_list():
+    query = "SELECT fooBar FROM (SELECT bazQux, x FROM t) AS s"
+
+    assert db_manager.preprocess_postgresql_query(query) == 'SELECT "fooBar" FROM (SELECT bazQux, x FROM t) AS s'
+
+
+def test_mysql_quotes_with_backticks():
+    sql = incremental_refresher.build_query("SELECT * FROM events", CONFIG, "mysql", True)
+
+    assert "`ts` >= :watermark" in sql
+    assert "GROUP BY `kind`, at_watermark" in sql
+
+
+def test_rejects_unmergeable_aggregates_and_bad_identifiers():
+    with pytest.raises(ValueError, match="Unsupported incremental aggregate"):
+        incremental_refresher.build_query("SELECT 1", {**CONFIG, "measures": [
+            {"function": "median", "column": "amount", "alias": "m"}]}, "sqlite", False)
+    with pytest.raises(ValueError, match="Invalid column name"):
+        incremental_refresher.build_query("SELECT 1", {**CONFIG, "group_by": ["kind; DROP TABLE x"]}, "sqlite", False)
+
+
+def test_full_refresh_aggregates_every_row(sqlite_source):
+    refreshed = refresh(sqlite_source)
+    result = refreshed["result"]
+
+    assert result["refresh_mode"] == "full"
+    assert result["watermark"] == 5
+    assert by_kind(result)["a"] == {"kind": "a", "n": 3, "total": 9, "mean": 3, "largest": 5}
+    assert by_kind(result)["b"] == {"kind": "b", "n": 2, "total": 6, "mean": 3, "largest": 4}
+
+
+def test_incremental_refresh_matches_a_full_refresh(sqlite_source):
+    state = refresh(sqlite_source)["state"]
+    insert(sqlite_source, [("a", 10, 6), ("c", 7, 7)])
+
+    refreshed = refresh(sqlite_source, state)
+
+    assert refreshed["result"]["refresh_mode"] == "incremental"
+    assert refreshed["result"]["watermark"] == 7
+    assert by_kind(refreshed["result"]) == by_kind(refresh(sqlite_source)["result"])
+
+
+def test_late_rows_sharing_the_last_watermark_are_counted_once(sqlite_source):
+    state = refresh(sqlite_source)["state"]
+    # Arrives after the refresh with the same watermark as the newest row already aggregated
+    insert(sqlite_source, [("b", 100, 5)])
+
+    first = refresh(sqlite_source, state)
+    # Nothing new: refreshing again must not count the boundary rows twice
+    second = refresh(sqlite_source, first["state"])
+    insert(sqlite_source, [("a", 1, 6)])
+    third = refresh(sqlite_source, second["state"])
+
+    assert by_kind(first["result"])["b"]["total"] == 106
+    assert by_kind(second["result"]) == by_kind(first["result"])
+    assert by_kind(third["result"]) == by_kind(refresh(sqlite_source)["result"])
+    assert by_kind(third["result"])["a"]["n"] == 4
+
+
+def test_changed_chart_config_forces_a_full_refresh(sqlite_source):
+    state = refresh(sqlite_source)["state"]
+
+    refreshed = refresh(sqlite_source, state, query="SELECT * FROM events WHERE amount > 1")
+
+    assert refreshed["result"]["refresh_mode"] == "full"
+    assert by_kind(refreshed["result"])["a"]["n"] == 2
+
+
+def test_merge_folds_partials_per_group():
+    partials = {}
+    incremental_refresher.merge(partials, [
+        {"kind": "a", "m0": 2, "m1_sum": 5, "m1_count": 2, "max_watermark": 1},
+        {"kind": "a", "m0": 1, "m1_sum": 1, "m1_count": 1, "max_watermark": 2},
+        {"kind": None, "m0": 4, "m1_sum": None, "m1_count": 0, "max_watermark": None}
+    ], {"group_by": ["kind"], "measures": [{"function": "count", "alias": "n"},
+                                           {"function": "avg", "column": "x", "alias": "mean"}]})
+
+    assert partials == {'["a"]': [3, [6, 3]]}
@@ -0,0 +1,299 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+import app.live as live_module
+import app.mongo_manager as mongo_module
+from app.db_manager import db_manager
+from app.live import LiveHub, STRUCTURAL_EVENTS, mongo_chart_watcher
+from app.mongo_manager import MongoDBManager, mongo_manager
+
+CONNECTION = {"db_type": "mongodb", "host": "localhost", "port": 27017, "database_name": "shop"}
+
+
+async def drain(queue, count, timeout=1):
+    return [await asyncio.wait_for(queue.get(), timeout) for _ in range(count)]
+
+
+def test_one_producer_fans_out_to_every_subscriber():
+    hub = LiveHub()
+    started = []
+    release = asyncio.Event()
+
+    async def producer(publish):
+        started.append(1)
+        publish({"type": "snapshot", "n": 1})
+        await release.wait()
+        publish({"type": "update", "n": 2})
+        await asyncio.Event().wait()
+
+    async def main():
+        async with hub.subscribe("chart", producer) as first:
+            assert await drain(first, 1) == [{"type": "snapshot", "n": 1}]
+            async with hub.subscribe("chart", producer) as second:
+                # A late joiner starts from the latest snapshot
+                assert await drain(second, 1) == [{"type": "snapshot", "n": 1}]
+                assert hub.stats() == {"topics": 1, "subscribers": 2}
+                release.set()
+                assert await drain(first, 1) == await drain(second, 1) == [{"type": "update", "n": 2}]
+            assert hub.stats() == {"topics": 1, "subscribers": 1}
+            task = hub._topics["chart"].task
+        await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(main())
+
+    assert started == [1]
+    assert task.cancelled()
+    assert hub.stats() == {"topics": 0, "subscribers": 0}
+
+
+def test_lagging_subscriber_is_resynchronised_with_the_snapshot(monkeypatch):
+    monkeypatch.setattr(live_module, "LIVE_QUEUE_SIZE", 2)
+    hub = LiveHub()
+
+    async def producer(publish):
+        for n in range(5):
+            publish({"type": "patch", "n": n}, {"type": "snapshot", "n": n})
+        await asyncio.Event().wait()
+
+    async def main():
+        async with hub.subscribe("chart", producer) as queue:
+            await asyncio.sleep(0.01)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    events = asyncio.run(main())
+
+    # Patches cannot be skipped, so each time the queue overflows the client restarts from the latest snapshot
+    assert events == [{"type": "snapshot", "n": 4}]
+
+
+def test_producer_errors_reach_subscribers():
+    hub = LiveHub()
+
+    async def producer(publish):
+        raise ValueError("Change streams are unavailable")
+
+    async def main():
+        async with hub.subscribe("chart", producer) as queue:
+            return await drain(queue, 1)
+
+    assert asyncio.run(main()) == [{"type": "error", "error": "Change streams are unavailable"}]
+
+
+def test_topic_limit(monkeypatch):
+    monkeypatch.setattr(live_module, "LIVE_MAX_TOPICS", 1)
+    hub = LiveHub()
+
+    async def producer(publish):
+        await asyncio.Event().wait()
+
+    async def main():
+        async with hub.subscribe("a", producer):
+            with pytest.raises(ValueError, match="Too many live subscriptions"):
+                async with hub.subscribe("b", producer):
+                    pass
+
+    asyncio.run(main())
+
+
+def test_change_pipeline_for_a_find_follows_its_result_ids():
+    query = {"collection": "orders", "operation": "find", "filter": {"status": "paid", "$or": [{"a": 1}, {"b": 2}]}}
+    order_id = ObjectId()
+
+    pipeline = mongo_chart_watcher.change_pipeline(query, [order_id])
+
+    assert pipeline == [{"$match": {"$or": [
+        {"operationType": {"$in": STRUCTURAL_EVENTS}},
+        {"fullDocument.status": "paid", "$or": [{"fullDocument.a": 1}, {"fullDocument.b": 2}],
+         "operationType": {"$in": ["insert", "update", "replace"]}},
+        {"documentKey._id": {"$in": [order_id]}},
+    ]}}]
+
+
+def test_change_pipeline_for_an_aggregate_uses_its_leading_matches():
+    query = {"collection": "orders", "operation": "aggregate",
+             "pipeline": [{"$match": {"a": 1}}, {"$match": {"b": 2}}, {"$group": {"_id": "$a"}}, {"$match": {"c": 3}}]}
+
+    clauses = mongo_chart_watcher.change_pipeline(query, None)[0]["$match"]["$or"]
+
+    assert clauses[1] == {"$and": [{"fullDocument.a": 1}, {"fullDocument.b": 2}], "operationType": "insert"}
+    assert clauses[2] == {"operationType": {"$in": ["update", "replace", "delete"]}}
+
+
+def test_change_pipeline_without_a_usable_filter_matches_every_insert():
+    query = {"collection": "orders", "operation": "find", "filter": {"$expr": {"$gt": ["$a", "$b"]}}}
+
+    clauses = mongo_chart_watcher.change_pipeline(query, None)[0]["$match"]["$or"]
+
+    assert clauses[1] == {"operationType": "insert"}
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_clients_with_open_change_streams_are_not_evicted(monkeypatch):
+    monkeypatch.setattr(mongo_module, "MONGO_CLIENT_CACHE_SIZE", 1)
+    manager = MongoDBManager()
+    monkeypatch.setattr(manager, "_create_client", FakeClient)
+
+    def host(name):
+        return {**CONNECTION, "host": name}
+
+    async def main():
+        async with manager.pinned_client(host("watched")) as watched:
+            other = await manager.get_client(host("other"))
+            third = await manager.get_client(host("third"))
+            # The watched client outlived two evictions; the unpinned one was closed
+            assert not watched.closed and other.closed
+            assert await manager.get_client(host("watched")) is watched
+        fourth = await manager.get_client(host("fourth"))
+        return watched, third, fourth
+
+    watched, third, fourth = asyncio.run(main())
+
+    # Once its stream closed the client is an ordinary cache entry again
+    assert watched.closed and third.closed and not fourth.closed
+    assert manager._pins == {}
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if self.changes:
+            return self.changes.pop(0)
+        await asyncio.sleep(0.01)
+        return None
+
+
+def test_watcher_recomputes_on_change_over_a_pinned_client(monkeypatch):
+    monkeypatch.setattr(live_module, "LIVE_DEBOUNCE_MS", 0)
+    pipelines = []
+    results = iter([{"success": True, "data": [{"_id": "a", "n": 1}]},
+                    {"success": True, "data": [{"_id": "a", "n": 2}]}])
+
+    class Collection:
+        def watch(self, pipeline, **options):
+            pipelines.append(pipeline)
+            assert mongo_manager._pins  # the stream's client is pinned while it is open
+            return FakeStream([{"operationType": "update"}])
+
+    async def get_client(connection_data):
+        return {"shop": {"orders": Collection()}}
+
+    async def execute_query(connection_data, query, limit):
+        return next(results)
+
+    monkeypatch.setattr(mongo_manager, "get_client", get_client)
+    monkeypatch.setattr(db_manager, "execute_query", execute_query)
+
+    async def main():
+        events = asyncio.Queue()
+        task = asyncio.ensure_future(mongo_chart_watcher.run(CONNECTION, "db.orders.find({})", 10, events.put_nowait))
+        try:
+            return await drain(events, 2)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    events = asyncio.run(main())
+
+    assert [event["type"] for event in events] == ["snapshot", "update"]
+    assert events[1]["result"]["data"] == [{"_id": "a", "n": 2}]
+    assert pipelines[0][0]["$match"]["$or"][2] == {"documentKey._id": {"$in": ["a"]}}
+    assert mongo_manager._pins == {}
+
+
+def result(*values, columns=("v",)):
+    return {"success": True, "columns": list(columns), "data": [{columns[0]: value} for value in values],
+            "row_count": len(values), "execution_time": 0}
+
+
+@pytest.mark.parametrize("old,new,expected", [
+    ([1, 2, 3, 4], [1, 9, 3, 4], {"length": 4, "rows": {1: {"v": 9}}}),  # update
+    ([1, 2, 3, 4], [1, 2, 3, 4, 5], {"length": 5, "rows": {4: {"v": 5}}}),  # insert at the end
+    ([1, 2, 3, 4], [1, 2, 3], {"length": 3, "rows": {}}),  # delete from the end
+    ([1, 2, 3, 4], [1, 2, 3, 4], {"length": 4, "rows": {}}),
+    # Deleting the first row shifts every later one: resending is smaller
+    ([1, 2, 3, 4], [2, 3, 4], None),
+    ([1, 2, 3, 4], [5, 6, 3, 4], {"length": 4, "rows": {0: {"v": 5}, 1: {"v": 6}}}),
+    ([1, 2, 3, 4], [5, 6, 7, 4], None),
+    ([], [1], None),
+])
+def test_diff_rows(old, new, expected):
+    assert live_module.DashboardBroadcaster().diff_rows(result(*old)["data"], result(*new)["data"]) == expected
+
+
+def test_broadcaster_sends_patches_and_falls_back_to_snapshots(monkeypatch):
+    broadcaster = live_module.DashboardBroadcaster()
+    failure = {"success": False, "data": [], "columns": [], "error": "gone"}
+    rounds = iter([
+        [result(1, 2, 3, 4), result(7)],
+        [result(1, 9, 3, 4), result(7)],
+        [result(1, 9, 3, 4, 5), result(7)],
+        [result(1, 9, 3, 4), result(7)],
+        [result(1, 9, 3, 4), result(7)],
+        [result(5, 6, 7, 8), result(8)],
+        [result(5, 6, 7, 8), result(8, columns=("w",))],
+        [failure, result(8, columns=("w",))],
+    ])
+    current = {}
+    published = []
+
+    class Done(Exception):
+        pass
+
+    async def refresh_chart(chart, connection_data, filters, limit, incremental_state, index):
+        # Charts are refreshed in order, so the first one starts each round
+        if index == 0:
+            current["charts"] = next(rounds, None)
+        if current["charts"] is None:
+            raise Done()
+        return current["charts"][index]
+
+    monkeypatch.setattr(broadcaster, "refresh_chart", refresh_chart)
+
+    async def main():
+        await broadcaster.run([{"query": "a"}, {"query": "b"}], [CONNECTION, CONNECTION], None, 0, 100,
+                              lambda *messages: published.append(messages))
+
+    with pytest.raises(Done):
+        asyncio.run(main())
+
+    def summary(message):
+        if message["type"] == "snapshot":
+            return "snapshot", {index: [row for row in chart["data"]] for index, chart in message["charts"].items()}
+        return "patch", message["charts"]
+
+    assert [summary(messages[0]) for messages in published] == [
+        ("snapshot", {0: result(1, 2, 3, 4)["data"], 1: [{"v": 7}]}),
+        ("patch", {0: {"patch": {"length": 4, "rows": {1: {"v": 9}}}}}),
+        ("patch", {0: {"patch": {"length": 5, "rows": {4: {"v": 5}}}}}),
+        ("patch", {0: {"patch": {"length": 4, "rows": {}}}}),
+        # Round 5 changed nothing and published nothing; in round 6 every chart needed its full result
+        ("snapshot", {0: result(5, 6, 7, 8)["data"], 1: [{"v": 8}]}),
+        # New columns cannot be patched
+        ("patch", {1: {"result": result(8, columns=("w",))}}),
+        ("patch", {0: {"result": failure}}),
+    ]
+    # Each patch carries the full state for viewers that join later
+    for messages in published:
+        if messages[0]["type"] == "patch":
+            assert messages[1]["type"] == "snapshot" and set(messages[1]["charts"]) == {0, 1}
+    assert published[3][1]["charts"][0]["data"] == result(1, 9, 3, 4)["data"]
@@ -0,0 +1,281 @@
+import asyncio
+import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure
+
+import app.mongo_manager as mongo_module
+from app.mongo_manager import MongoDBManager, mongo_manager
+
+CONNECTION = {"db_type": "mongodb", "host": "localhost", "port": 27017, "database_name": "shop"}
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def skip(self, count):
+        return FakeCursor(self.documents[count:])
+
+    def limit(self, count):
+        return FakeCursor(self.documents[:count])
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def estimated_document_count(self):
+        return len(self.documents)
+
+    def find(self, query):
+        return FakeCursor(self.documents)
+
+    async def find_one(self):
+        return self.documents[0] if self.documents else None
+
+
+def browse(monkeypatch, documents, limit=10, offset=0):
+    async def get_client(connection_data):
+        return {"shop": {"orders": FakeCollection(documents)}}
+
+    monkeypatch.setattr(mongo_manager, "get_client", get_client)
+    return asyncio.run(mongo_manager.get_collection_data(CONNECTION, "orders", limit, offset))
+
+
+def test_browse_columns_are_the_union_of_every_document(monkeypatch):
+    order_id = ObjectId()
+    result = browse(monkeypatch, [{"_id": order_id, "a": 1}, {"_id": 2, "b": {"c": 1}}, {"a": 3, "d": None}])
+
+    assert result["columns"] == ["_id", "a", "b", "d"]
+    assert result["rows"][0] == {"_id": str(order_id), "a": 1}
+    assert result["total_count"] == 3
+
+
+def test_browse_page_and_empty_collection(monkeypatch):
+    page = browse(monkeypatch, [{"_id": i, f"f{i}": i} for i in range(5)], limit=2, offset=3)
+    empty = browse(monkeypatch, [])
+
+    assert page["columns"] == ["_id", "f3", "f4"]
+    assert empty["columns"] == ["_id"] and empty["rows"] == []
+
+
+def test_query_rows_flatten_to_the_union_of_paths():
+    documents = [{"a": {"b": 1}, "tags": ["x", "y", "z"]}, {"a": {"c": 2}, "n": 5}]
+
+    data, columns = mongo_manager._serialize_rows(documents, {"array_cap": 2})
+
+    assert [column["name"] for column in columns] == ["a.b", "tags.0", "tags.1", "a.c", "n"]
+    assert data[1] == {"a.b": None, "tags.0": None, "tags.1": None, "a.c": 2, "n": 5}
+
+
+class RecordingCursor:
+    """Records the cursor modifiers the query applied, in order"""
+
+    def __init__(self, documents, calls):
+        self.documents = documents
+        self.calls = calls
+
+    def __getattr__(self, name):
+        def modifier(*args):
+            self.calls.append((name, *args))
+            if name == "skip":
+                return RecordingCursor(self.documents[args[0]:], self.calls)
+            if name == "limit":
+                return RecordingCursor(self.documents[:args[0]], self.calls)
+            return self
+        return modifier
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class RecordingCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = []
+
+    def find(self, filter_query, projection=None, batch_size=None):
+        self.calls.append(("find", filter_query, projection, batch_size))
+        return RecordingCursor(self.documents, self.calls)
+
+    def aggregate(self, pipeline, **options):
+        self.calls.append(("aggregate", pipeline, options))
+        return RecordingCursor(self.documents, self.calls)
+
+    async def count_documents(self, filter_query, **bounds):
+        self.calls.append(("count_documents", filter_query, bounds))
+        return 7
+
+
+def execute(monkeypatch, query, limit=1000, documents=()):
+    collection = RecordingCollection([{"_id": i, "n": i} for i in range(50)] if not documents else list(documents))
+
+    async def get_client(connection_data):
+        return {"shop": {"orders": collection}}
+
+    monkeypatch.setattr(mongo_manager, "get_client", get_client)
+    result = asyncio.run(mongo_manager.execute_query(CONNECTION, {"collection": "orders", **query}, limit))
+    assert result["success"], result.get("error")
+    return result, collection.calls
+
+
+def test_find_pushes_sort_skip_and_limit_to_the_server(monkeypatch):
+    result, calls = execute(monkeypatch, {"filter": {"n": {"$gt": 1}}, "sort": {"n": -1, "_id": 1}, "skip": 20,
+                                          "limit": 10})
+
+    assert calls == [
+        ("find", {"n": {"$gt": 1}}, None, 1000),
+        ("sort", [("n", -1), ("_id", 1)]),
+        ("allow_disk_use", True),
+        ("skip", 20),
+        ("limit", 10),
+    ]
+    assert [row["n"] for row in result["data"]] == list(range(20, 30))
+
+
+def test_find_limit_and_batch_size_follow_the_request(monkeypatch):
+    _, calls = execute(monkeypatch, {"limit": 5000, "options": {"allowDiskUse": False}}, limit=100)
+    _, unsorted = execute(monkeypatch, {}, limit=20000)
+
+    # A chained .limit() only narrows the request limit; disk use matters only for sorts
+    assert calls == [("find", {}, None, 100), ("limit", 100)]
+    assert unsorted == [("find", {}, None, 10000), ("limit", 20000)]
+
+    _, no_disk = execute(monkeypatch, {"sort": {"n": 1}, "allow_disk_use": False})
+    assert ("allow_disk_use", True) not in no_disk
+
+
+def test_aggregate_gets_a_server_side_limit_and_disk_use(monkeypatch):
+    _, calls = execute(monkeypatch, {"operation": "aggregate", "pipeline": [{"$sort": {"n": 1}}],
+                                     "options": {"maxTimeMS": 500}}, limit=25)
+
+    assert calls == [("aggregate", [{"$sort": {"n": 1}}, {"$limit": 25}],
+                      {"allowDiskUse": True, "maxTimeMS": 500, "batchSize": 25})]
+
+    _, calls = execute(monkeypatch, {"operation": "aggregate", "pipeline": [],
+                                     "options": {"allowDiskUse": False, "batchSize": 7}}, limit=25)
+    assert calls == [("aggregate", [{"$limit": 25}], {"allowDiskUse": False, "batchSize": 7})]
+
+
+def test_limit_pipeline():
+    assert mongo_manager.limit_pipeline([{"$match": {}}], 10) == [{"$match": {}}, {"$limit": 10}]
+    # An existing tighter limit is kept; a looser one is narrowed
+    assert mongo_manager.limit_pipeline([{"$limit": 5}], 10) == [{"$limit": 5}]
+    assert mongo_manager.limit_pipeline([{"$limit": 50}], 10) == [{"$limit": 50}, {"$limit": 10}]
+    # Writes must see every document
+    assert mongo_manager.limit_pipeline([{"$match": {}}, {"$out": "copy"}], 10) == [{"$match": {}}, {"$out": "copy"}]
+    assert mongo_manager.limit_pipeline([{"$merge": {"into": "copy"}}], 10) == [{"$merge": {"into": "copy"}}]
+    assert mongo_manager.limit_pipeline([{"$match": {}}], 0) == [{"$match": {}}]
+
+
+def test_count_keeps_chained_skip_and_limit(monkeypatch):
+    result, calls = execute(monkeypatch, {"operation": "count", "filter": {"n": 1}, "skip": 2, "limit": 3})
+
+    assert calls == [("count_documents", {"n": 1}, {"skip": 2, "limit": 3})]
+    assert result["data"] == [{"count": 7}]
+
+
+class SampledCollection:
+    """A collection that answers $sample, or rejects it like some views do"""
+
+    def __init__(self, documents, sample_supported=True):
+        self.documents = documents
+        self.sample_supported = sample_supported
+        self.sampled = []
+
+    def aggregate(self, pipeline):
+        if not self.sample_supported:
+            raise OperationFailure("$sample is not supported on views")
+        self.sampled.append(pipeline)
+        return FakeCursor(self.documents)
+
+    def find(self):
+        return FakeCursor(self.documents)
+
+    async def estimated_document_count(self):
+        return len(self.documents) * 10
+
+
+def test_schema_is_merged_over_the_sample():
+    when = datetime.datetime(2024, 1, 1)
+    documents = [
+        {"_id": ObjectId(), "name": "a", "qty": 1, "when": when, "flag": True},
+        {"_id": ObjectId(), "name": "b", "qty": 2.5, "tags": ["x"], "flag": False},
+        {"_id": ObjectId(), "name": None, "qty": 3, "meta": {"k": 1}},
+        {"_id": ObjectId(), "name": "d", "qty": 4},
+    ]
+    collection = SampledCollection(documents)
+
+    columns = {column["name"]: column for column in asyncio.run(mongo_manager.infer_schema(collection, 50))}
+
+    assert collection.sampled == [[{"$sample": {"size": 50}}]]
+    assert list(columns)[:3] == ["_id", "name", "qty"]
+    assert columns["_id"] == {"name": "_id", "type": "ObjectId", "types": ["ObjectId"], "presence": 1.0,
+                              "nullable": False, "primary_key": True}
+    assert columns["name"]["type"] == "String" and columns["name"]["nullable"] is True
+    assert columns["name"]["types"] == ["String", "Null"]
+    assert columns["qty"]["type"] == "Mixed" and columns["qty"]["types"] == ["Integer", "Double"]
+    assert columns["flag"]["type"] == "Boolean" and columns["flag"]["presence"] == 0.5
+    assert columns["when"]["type"] == "Date" and columns["when"]["nullable"] is True
+    assert columns["tags"]["type"] == "Array" and columns["meta"]["type"] == "Object"
+
+
+def test_schema_falls_back_when_sample_is_rejected():
+    collection = SampledCollection([{"_id": 1, "only_null": None}], sample_supported=False)
+
+    columns = asyncio.run(mongo_manager.infer_schema(collection, 50))
+
+    assert [(column["name"], column["type"]) for column in columns] == [("_id", "Integer"), ("only_null", "Null")]
+
+
+def test_collection_schemas_are_cached_per_database(monkeypatch):
+    manager = MongoDBManager()
+    collections = {"orders": SampledCollection([{"_id": 1, "total": 5}]),
+                   "users": SampledCollection([{"_id": 1, "name": "x"}])}
+
+    class FakeDatabase(dict):
+        async def list_collection_names(self):
+            return list(self)
+
+    async def get_client(connection_data):
+        return {"shop": FakeDatabase(collections)}
+
+    monkeypatch.setattr(manager, "get_client", get_client)
+
+    listed = asyncio.run(manager.get_collections(CONNECTION))
+    assert [(c["name"], c["row_count"], [col["name"] for col in c["columns"]]) for c in listed] == [
+        ("orders", 10, ["_id", "total"]), ("users", 10, ["_id", "name"])]
+
+    # Served from the cache, as a copy the caller may modify
+    listed[0]["columns"].clear()
+    assert asyncio.run(manager.get_collections(CONNECTION))[0]["columns"] != []
+    assert len(collections["orders"].sampled) == 1
+
+    manager.invalidate_schema_cache(CONNECTION)
+    asyncio.run(manager.get_collections(CONNECTION))
+    assert len(collections["orders"].sampled) == 2
+
+    monkeypatch.setattr(mongo_module, "MONGO_SCHEMA_CACHE_TTL_SECONDS", -1)
+    manager.invalidate_schema_cache()
+    asyncio.run(manager.get_collections(CONNECTION))
+    asyncio.run(manager.get_collections(CONNECTION))
+    assert len(collections["orders"].sampled) == 4
+
+
+def test_collection_listing_errors_are_reported(monkeypatch):
+    manager = MongoDBManager()
+
+    async def get_client(connection_data):
+        raise ConnectionError("no route to host")
+
+    monkeypatch.setattr(manager, "get_client", get_client)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(manager.get_collections(CONNECTION))
+    assert error.value.status_code == 400 and error.value.detail == "Error fetching collections: no route to host"
@@ -0,0 +1,114 @@
+import datetime
+import time
+
+import pytest
+from bson import ObjectId, Regex
+from bson.int64 import Int64
+
+from app.mongo_shell import mongo_shell
+
+
+def test_find_with_chained_cursor_methods():
+    query = mongo_shell.parse("db.orders.find({status: 'paid', total: {$gt: 10}}, {_id: 0})"
+                              ".sort({total: -1}).skip(20).limit(10).allowDiskUse().pretty();")
+
+    assert query == {
+        "collection": "orders",
+        "operation": "find",
+        "filter": {"status": "paid", "total": {"$gt": 10}},
+        "projection": {"_id": 0},
+        "sort": {"total": -1},
+        "skip": 20,
+        "limit": 10,
+        "allow_disk_use": True
+    }
+
+
+def test_collection_spellings_and_find_one():
+    assert mongo_shell.parse("db['my-orders'].findOne()")["collection"] == "my-orders"
+    assert mongo_shell.parse('db.getCollection("a.b").find()')["collection"] == "a.b"
+    assert mongo_shell.parse("db.c.findOne({a: 1})")["limit"] == 1
+
+
+def test_aggregate_and_count():
+    assert mongo_shell.parse("db.c.aggregate([{$match: {a: 1}}, {$count: 'n'}], {allowDiskUse: true})") == {
+        "collection": "c", "operation": "aggregate",
+        "pipeline": [{"$match": {"a": 1}}, {"$count": "n"}], "options": {"allowDiskUse": True}
+    }
+    assert mongo_shell.parse("db.c.countDocuments({a: 1})") == {"collection": "c", "operation": "count",
+                                                                 "filter": {"a": 1}}
+
+
+def test_count_ignores_skip_and_limit_but_itcount_keeps_them():
+    counted = mongo_shell.parse("db.c.find({a: 1}).skip(5).limit(10).count()")
+    iterated = mongo_shell.parse("db.c.find({a: 1}).skip(5).limit(10).itcount()")
+
+    assert counted["operation"] == "count" and "skip" not in counted and "limit" not in counted
+    assert iterated["operation"] == "count" and iterated["skip"] == 5 and iterated["limit"] == 10
+
+
+def test_shell_literals_and_constructors():
+    value = mongo_shell.parse_value("""{
+        // comment
+        id: ObjectId("5f1d7f3b9d1e8a0012345678"), at: ISODate("2024-01-02T03:04:05Z"),
+        ms: new Date(0), n: NumberLong(5), re: /ab+c/i, list: [1, 'two', null,], 'quoted key': true,
+    }""")
+
+    assert value == {
+        "id": ObjectId("5f1d7f3b9d1e8a0012345678"),
+        "at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+        "ms": datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc),
+        "n": Int64(5),
+        "re": Regex("ab+c", "i"),
+        "list": [1, "two", None],
+        "quoted key": True
+    }
+
+
+def test_strings_that_look_like_syntax_stay_strings():
+    query = mongo_shell.parse("db.c.find({note: 'db.x.drop() // not a comment', path: \"a/b\"})")
+
+    assert query["filter"] == {"note": "db.x.drop() // not a comment", "path": "a/b"}
+
+
+@pytest.mark.parametrize("text,message", [
+    ("db.c.remove({})", "Unsupported MongoDB operation"),
+    ("db.c.find({a: 1}", "Expected"),
+    ("db.c.find().limit(-1)", "non-negative integer"),
+    ("db.c.aggregate([]).sort({a: 1})", "Cannot chain"),
+    ("db.c.find({a: eval('1')})", "Unsupported function"),
+    ("db.c.find() extra", "Unexpected"),
+])
+def test_invalid_queries_are_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        mongo_shell.parse(text)
+
+
+def test_non_shell_text_is_not_parsed():
+    assert mongo_shell.parse('{"collection": "c"}') is None
+
+
+def test_cached_trees_are_copied_per_call():
+    first = mongo_shell.parse("db.cache_copy.find({tags: ['a']})")
+    first["filter"]["tags"].append("mutated")
+
+    assert mongo_shell.parse("db.cache_copy.find({tags: ['a']})")["filter"] == {"tags": ["a"]}
+
+
+def test_argumentless_date_is_evaluated_per_call_not_per_parse():
+    text = "db.events.find({ts: {$gt: new Date()}, at: ISODate()})"
+    first = mongo_shell.parse(text)
+    time.sleep(0.01)
+    second = mongo_shell.parse(text)
+
+    assert isinstance(first["filter"]["ts"]["$gt"], datetime.datetime)
+    assert second["filter"]["ts"]["$gt"] > first["filter"]["ts"]["$gt"]
+    assert second["filter"]["at"] > first["filter"]["at"]
+    assert datetime.datetime.now(datetime.timezone.utc) - second["filter"]["ts"]["$gt"] < datetime.timedelta(seconds=5)
+
+
+def test_argumentless_object_id_is_new_every_time():
+    ids = [mongo_shell.parse_value("{_id: ObjectId(), other: ObjectId()}") for _ in range(2)]
+
+    assert len({ids[0]["_id"], ids[0]["other"], ids[1]["_id"], ids[1]["other"]}) == 4
+    assert all(isinstance(value, ObjectId) for doc in ids for value in doc.values())
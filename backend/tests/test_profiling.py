@@ -0,0 +1,73 @@
+import asyncio
+import cProfile
+import marshal
+import threading
+
+from app.profiling import Profiler
+
+
+def work(n):
+    return sum(i * i for i in range(n))
+
+
+def test_wrap_profiles_calls_in_worker_threads():
+    profiler = Profiler(enabled=True, threshold_ms=0)
+    profiled = profiler.wrap(work, "db.work", db_type="sqlite")
+
+    assert profiled.__name__ == "work"
+    assert asyncio.run(asyncio.to_thread(profiled, 1000)) == work(1000)
+
+    [listed] = profiler.get_profiles()
+    assert listed["name"] == "db.work" and listed["metadata"] == {"db_type": "sqlite"}
+    assert "stats" not in listed and "summary" not in listed
+    record = profiler.get_profile(listed["id"])
+    assert "work" in record["summary"]
+    assert any(function == "work" for (_, _, function) in marshal.loads(record["stats"]))
+
+
+def test_wrap_skips_the_event_loop_thread_and_unsampled_calls():
+    profiler = Profiler(enabled=True, threshold_ms=0)
+    profiled = profiler.wrap(work, "db.work")
+
+    async def on_loop():
+        return profiled(10)
+
+    assert asyncio.run(on_loop()) == work(10)
+    assert profiler.get_profiles() == []
+
+    for settings in ({"enabled": False}, {"enabled": True, "sample_rate": 0.0}):
+        profiler.configure(**settings)
+        profiled(10)
+    assert profiler.get_profiles() == []
+
+
+def test_fast_calls_and_concurrent_calls_are_not_kept():
+    profiler = Profiler(enabled=True, threshold_ms=60_000)
+    profiler.wrap(work, "fast")(10)
+    assert profiler.get_profiles() == []
+
+    # Only one cProfile run at a time: a call made while another is active runs unprofiled
+    profiler.configure(threshold_ms=0)
+    profiler._active.acquire()
+    try:
+        thread = threading.Thread(target=profiler.wrap(work, "busy"), args=(10,))
+        thread.start()
+        thread.join()
+    finally:
+        profiler._active.release()
+    assert profiler.get_profiles() == []
+
+
+def test_only_the_slowest_profiles_are_kept():
+    profiler = Profiler(enabled=True, max_profiles=3)
+    run = cProfile.Profile()
+    run.runcall(work, 10)
+    for duration in (50, 10, 400, 30, 200):
+        profiler._record(f"q{duration}", duration, run, {})
+
+    assert [p["duration_ms"] for p in profiler.get_profiles()] == [400, 200, 50]
+
+    profiler.configure(max_profiles=2)
+    assert [p["name"] for p in profiler.get_profiles()] == ["q400", "q200"]
+    profiler.clear()
+    assert profiler.get_profiles() == []
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.db_manager import db_manager
+from app.federation import federated_engine
+from app.routers import queries
+from app.schemas import FederatedQuery
+
+BUSY = HTTPException(status_code=503, detail="Too many queries queued", headers={"Retry-After": "1"})
+
+
+class FakeUser:
+    id = 1
+    query_cost_budget = None
+
+
+class FakeQuery:
+    def filter(self, *conditions):
+        return self
+
+    def first(self):
+        return object()
+
+
+class FakeDb:
+    def query(self, model):
+        return FakeQuery()
+
+
+@pytest.fixture(autouse=True)
+def connection(monkeypatch):
+    monkeypatch.setattr(db_manager, "connection_data_for", lambda connection: {"db_type": "sqlite"})
+
+
+async def busy(*args, **kwargs):
+    raise BUSY
+
+
+async def broken(*args, **kwargs):
+    raise RuntimeError("no such table: t")
+
+
+def search(body):
+    return asyncio.run(queries.search_data(1, body, current_user=FakeUser(), db=FakeDb()))
+
+
+def federated():
+    query = FederatedQuery(sources=[{"alias": "a", "database_id": 1, "table": "t"}], query="SELECT * FROM a")
+    return asyncio.run(queries.execute_federated_query(query, current_user=FakeUser(), db=FakeDb()))
+
+
+def test_search_passes_scheduler_rejections_through(monkeypatch):
+    monkeypatch.setattr(db_manager, "search_table", busy)
+
+    with pytest.raises(HTTPException) as error:
+        search({"table": "t", "search": "x"})
+
+    assert error.value.status_code == 503 and error.value.headers == {"Retry-After": "1"}
+
+
+def test_search_reports_other_failures_as_bad_requests(monkeypatch):
+    monkeypatch.setattr(db_manager, "search_table", broken)
+
+    with pytest.raises(HTTPException) as error:
+        search({"table": "t", "search": "x"})
+
+    assert error.value.status_code == 400 and "no such table" in error.value.detail
+
+
+def test_federated_query_passes_scheduler_rejections_through(monkeypatch):
+    monkeypatch.setattr(federated_engine, "execute", busy)
+
+    with pytest.raises(HTTPException) as error:
+        federated()
+
+    assert error.value.status_code == 503
+
+
+def test_federated_query_reports_other_failures_as_bad_requests(monkeypatch):
+    monkeypatch.setattr(federated_engine, "execute", broken)
+
+    with pytest.raises(HTTPException) as error:
+        federated()
+
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("body", [
+    {"table": "t", "search": "x", "limit": "ten"},
+    {"table": "t", "search": "x", "page": None},
+    {"table": "t", "search": "x", "page": [1]},
+    {"table": "t", "search": "x", "limit": 0},
+])
+def test_search_rejects_bad_paging_with_a_bad_request(body):
+    with pytest.raises(HTTPException) as error:
+        search(body)
+
+    assert error.value.status_code == 400
+
+
+def test_search_pages_through_the_table(sqlite_source, monkeypatch):
+    monkeypatch.setattr(db_manager, "connection_data_for", lambda connection: sqlite_source)
+
+    result = search({"table": "events", "search": "a", "column": "kind", "limit": "2", "page": "2"})
+
+    assert result["offset"] == 2 and result["row_count"] == 1 and result["has_more"] is False
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.redis_manager import redis_manager
+
+
+class FakeClient:
+    """Records commands and answers them from a canned reply"""
+
+    def __init__(self, reply=None, hash_items=()):
+        self.reply = reply
+        self.hash_items = hash_items
+        self.commands = []
+
+    async def execute_command(self, *args):
+        self.commands.append(list(args))
+        return self.reply(args) if callable(self.reply) else self.reply
+
+    async def hscan_iter(self, key, count=None):
+        for item in self.hash_items:
+            yield item
+
+
+def run(client, command, limit):
+    return asyncio.run(redis_manager._run(client, redis_manager.parse_command(command), limit))
+
+
+@pytest.mark.parametrize("command", ["GET user:1", "hgetall  'my key'", "ZRANGE z 0 -1 WITHSCORES", "OBJECT ENCODING k",
+                                     "MEMORY USAGE k", "SCAN 0 MATCH user:*"])
+def test_read_commands_are_allowed(command):
+    assert redis_manager.parse_command(command)[0] == command.split()[0].upper()
+
+
+@pytest.mark.parametrize("command,message", [
+    ("SET k v", "not allowed"),
+    ("FLUSHALL", "not allowed"),
+    ("EVAL 'return 1' 0", "not allowed"),
+    ("KEYS *", "use SCAN"),
+    ("OBJECT HELP", "Allowed OBJECT subcommands"),
+    ("MEMORY PURGE", "Allowed MEMORY subcommands"),
+    ("", "empty"),
+    ("GET 'unterminated", "Invalid Redis command"),
+])
+def test_writes_and_unsafe_commands_are_refused(command, message):
+    with pytest.raises(ValueError, match=message):
+        redis_manager.parse_command(command)
+
+
+def test_quoted_arguments_keep_their_spaces():
+    assert redis_manager.parse_command('HGET "user 1" "first name";') == ["HGET", "user 1", "first name"]
+
+
+@pytest.mark.parametrize("args,expected", [
+    # Index ranges: stop clamped to limit + 1 elements
+    (["ZRANGE", "z", "0", "100000"], ["ZRANGE", "z", "0", "10"]),
+    (["LRANGE", "l", "5", "-1"], ["LRANGE", "l", "5", "15"]),
+    (["ZRANGE", "z", "0", "3", "WITHSCORES"], ["ZRANGE", "z", "0", "3", "WITHSCORES"]),
+    (["ZREVRANGE", "z", "-20", "-1"], ["ZREVRANGE", "z", "-20", "-1"]),
+    # Score and lex ranges: bounds untouched, LIMIT added or tightened
+    (["ZRANGE", "z", "0", "100000", "BYSCORE"], ["ZRANGE", "z", "0", "100000", "BYSCORE", "LIMIT", "0", "11"]),
+    (["ZRANGE", "z", "(a", "[z", "BYLEX", "REV"], ["ZRANGE", "z", "(a", "[z", "BYLEX", "REV", "LIMIT", "0", "11"]),
+    (["ZRANGE", "z", "0", "9", "byscore", "limit", "5", "500"], ["ZRANGE", "z", "0", "9", "byscore", "limit", "5", "11"]),
+    (["ZRANGE", "z", "0", "9", "BYSCORE", "LIMIT", "5", "-1"], ["ZRANGE", "z", "0", "9", "BYSCORE", "LIMIT", "5", "11"]),
+    (["ZRANGE", "z", "0", "9", "BYSCORE", "LIMIT", "5", "3"], ["ZRANGE", "z", "0", "9", "BYSCORE", "LIMIT", "5", "3"]),
+    (["ZRANGEBYSCORE", "z", "-inf", "+inf"], ["ZRANGEBYSCORE", "z", "-inf", "+inf", "LIMIT", "0", "11"]),
+    # A key named like an option is not mistaken for one
+    (["ZRANGE", "byscore", "0", "100"], ["ZRANGE", "byscore", "0", "10"]),
+])
+def test_capped_range(args, expected):
+    assert redis_manager._capped_range(args, 10) == expected
+
+
+def test_score_range_keeps_its_bounds_and_reports_truncation():
+    client = FakeClient(reply=lambda args: [f"m{i}" for i in range(int(args[-1]))])
+
+    rows, truncated = run(client, "ZRANGE z 0 100000 BYSCORE", 3)
+
+    assert client.commands == [["ZRANGE", "z", "0", "100000", "BYSCORE", "LIMIT", "0", "4"]]
+    assert [row["value"] for row in rows] == ["m0", "m1", "m2"]
+    assert truncated is True
+
+
+def test_short_range_is_not_truncated():
+    client = FakeClient(reply=["a", "b"])
+
+    rows, truncated = run(client, "LRANGE l 0 -1", 3)
+
+    assert client.commands == [["LRANGE", "l", "0", "3"]]
+    assert len(rows) == 2 and truncated is False
+
+
+def test_withscores_rows():
+    client = FakeClient(reply=["a", "1", "b", "2.5"])
+
+    rows, _ = run(client, "ZRANGE z 0 -1 WITHSCORES", 10)
+
+    assert rows == [{"member": "a", "score": 1.0}, {"member": "b", "score": 2.5}]
+
+
+def test_hgetall_streams_with_hscan_and_stops_at_the_limit():
+    client = FakeClient(hash_items=[(f"f{i}", str(i)) for i in range(100)])
+
+    rows, truncated = run(client, "HGETALL h", 5)
+
+    assert client.commands == []
+    assert rows == [{"field": f"f{i}", "value": str(i)} for i in range(5)]
+    assert truncated is True
+
+
+class FakeRedis:
+    """Async client whose ping needs the configured password and takes a while to answer"""
+
+    password = "secret"
+    closed = 0
+
+    def __init__(self, **options):
+        self.options = options
+
+    async def ping(self):
+        await asyncio.sleep(0.05)
+        if self.options["password"] != FakeRedis.password:
+            raise ConnectionError("NOAUTH Authentication required")
+        return True
+
+    async def aclose(self):
+        FakeRedis.closed += 1
+
+
+@pytest.mark.parametrize("password,success", [("secret", True), (None, False), ("wrong", False)])
+def test_connection_check_runs_on_the_async_client(monkeypatch, password, success):
+    monkeypatch.setattr("app.redis_manager.aioredis.Redis", FakeRedis)
+    monkeypatch.setattr(FakeRedis, "closed", 0)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        try:
+            return await redis_manager.test_connection({"host": "cache", "port": 6379, "database_name": "0",
+                                                        "password": password})
+        finally:
+            task.cancel()
+
+    result = asyncio.run(main())
+
+    assert result.success is success
+    # The loop kept running while the ping was outstanding
+    assert len(ticks) >= 3
+    assert FakeRedis.closed == (1 if password is None else 2)
@@ -0,0 +1,147 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.db_manager import db_manager
+from app.replicas import ReplicaRouter
+from app.routers.databases import encrypt_replicas
+from app.schemas import DatabaseConnection, ReplicaEndpoint
+
+PRIMARY = {"db_type": "postgresql", "host": "primary", "port": 5432, "database_name": "app",
+           "username": "app", "password": "secret",
+           "replicas": [{"host": "replica1"}, {"host": "replica2", "port": 5433, "max_lag_seconds": 5}]}
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """A router whose probes report lag from `lags` (host -> seconds, or an exception to raise)"""
+    router = ReplicaRouter(enabled=True)
+    router.lags = {"replica1": 0.0, "replica2": 0.0}
+
+    def measure(data):
+        lag = router.lags[data["host"]]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    monkeypatch.setattr(router, "_measure", measure)
+    return router
+
+
+def read(router, connection_data=PRIMARY, fail_on=()):
+    """Read through the router; returns (host served, result); hosts in fail_on raise"""
+    async def run(target):
+        if target["host"] in fail_on:
+            raise ConnectionError(f"{target['host']} is down")
+        return target["host"]
+
+    return asyncio.run(router.read(connection_data, run))
+
+
+def test_caught_up_replica_serves_reads_with_primary_credentials(router):
+    targets = []
+
+    async def run(target):
+        targets.append(target)
+        return target["host"]
+
+    assert asyncio.run(router.read(PRIMARY, run)) in ("replica1", "replica2")
+    assert targets[0]["username"] == "app" and targets[0]["password"] == "secret"
+    assert "replicas" not in targets[0]
+    assert router.replica_reads == 1 and router.primary_reads == 0
+
+
+def test_lagging_replicas_are_skipped(router):
+    router.lags = {"replica1": 60.0, "replica2": 6.0}
+
+    assert read(router) == "primary"
+    assert router.primary_reads == 1
+
+
+def test_per_replica_max_lag_overrides_the_default(router):
+    router.lags = {"replica1": 60.0, "replica2": 4.0}
+
+    assert read(router) == "replica2"
+
+
+def test_dead_replica_fails_over_to_the_primary(router):
+    router.lags = {"replica1": 0.0, "replica2": 60.0}
+    asyncio.run(router.choose(PRIMARY))
+    router.lags["replica1"] = ConnectionError("replica1 is down")
+
+    assert read(router, fail_on=("replica1",)) == "primary"
+    assert router.failovers == 1
+    endpoint = next(e for e in router.stats()["endpoints"] if e["host"] == "replica1")
+    assert endpoint["healthy"] is False and "down" in endpoint["error"]
+    # Unhealthy until a later probe passes: the next read goes straight to the primary
+    assert read(router) == "primary"
+    assert router.failovers == 1
+
+
+def test_query_error_on_a_healthy_replica_is_not_retried_on_the_primary(router):
+    router.lags = {"replica1": 0.0, "replica2": 60.0}
+
+    async def run(target):
+        raise ValueError(f"syntax error on {target['host']}")
+
+    with pytest.raises(ValueError, match="on replica1"):
+        asyncio.run(router.read(PRIMARY, run))
+    assert router.failovers == 0
+
+
+def test_reads_without_replicas_or_when_disabled_use_the_primary(router):
+    assert read(router, {**PRIMARY, "replicas": []}) == "primary"
+    assert read(router, {**PRIMARY, "db_type": "sqlite"}) == "primary"
+    router.enabled = False
+    assert read(router) == "primary"
+
+
+def test_failed_health_check_is_logged_once(router, caplog):
+    router.lags["replica1"] = ConnectionError("refused")
+    data = router.endpoint_data(PRIMARY, PRIMARY["replicas"][0])
+    endpoint = router._endpoint(data)
+
+    async def main():
+        return [await router.probe(endpoint, data) for _ in range(2)]
+
+    with caplog.at_level("WARNING", logger="app.replicas"):
+        assert asyncio.run(main()) == [False, False]
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Replica replica1:5432 failed its health check: refused"]
+
+
+def test_stored_replica_passwords_survive_updates():
+    stored = encrypt_replicas([ReplicaEndpoint(host="r1", password="one"), ReplicaEndpoint(host="r2", port=5433,
+                                                                                           password="two")])
+    assert db_manager.decrypt_password(stored[0]["password"]) == "one"
+
+    updated = encrypt_replicas([
+        ReplicaEndpoint(host="r1"),  # password left empty
+        ReplicaEndpoint(host="r2", port=5433, password=""),  # password cleared in the form
+        ReplicaEndpoint(host="r3", password="three"),  # new endpoint
+    ], stored)
+
+    assert updated[0]["password"] == stored[0]["password"]
+    assert updated[1]["password"] == stored[1]["password"]
+    assert db_manager.decrypt_password(updated[2]["password"]) == "three"
+    # Any password sent is new plaintext, even one that happens to equal the stored ciphertext
+    assert db_manager.decrypt_password(encrypt_replicas([ReplicaEndpoint(host="r1", password="new")],
+                                                        stored)[0]["password"]) == "new"
+    resent = encrypt_replicas([ReplicaEndpoint(host="r1", password=stored[0]["password"])], stored)[0]["password"]
+    assert db_manager.decrypt_password(resent) == stored[0]["password"]
+    # A moved endpoint does not inherit the old one
+    assert encrypt_replicas([ReplicaEndpoint(host="r1", port=6543)], stored)[0]["password"] is None
+
+
+def test_replica_passwords_are_not_returned():
+    now = datetime.datetime.now()
+    connection = DatabaseConnection.model_validate({
+        "id": 1, "user_id": 1, "status": "active", "created_at": now, "updated_at": now, "name": "db",
+        "db_type": "postgresql", "database_name": "app",
+        "replicas": [{"host": "r1", "port": 5433, "username": "ro", "password": "ciphertext", "max_lag_seconds": 5}]
+    })
+
+    assert connection.model_dump()["replicas"] == [{"host": "r1", "port": 5433, "username": "ro",
+                                                    "max_lag_seconds": 5.0}]
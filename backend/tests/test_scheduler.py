@@ -0,0 +1,227 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import app.scheduler as scheduler_module
+from app.main import apply_query_priority
+from app.scheduler import QueryScheduler, _current_priority
+
+SOURCE = {"db_type": "sqlite", "database_name": "/data/source.sqlite"}
+
+
+async def admission_order(scheduler, requests):
+    """Hold the only slot, queue requests as (user, priority, name), then release and record admissions"""
+    order = []
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(SOURCE):
+            await release.wait()
+
+    async def query(user, priority, name):
+        scheduler.set_user(user)
+        scheduler.set_priority(priority)
+        async with scheduler.slot(SOURCE):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    holder = asyncio.ensure_future(hold())
+    await asyncio.sleep(0)
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.ensure_future(query(*request)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+def test_admits_up_to_the_limit_without_queuing():
+    scheduler = QueryScheduler(enabled=True, default_limit=2)
+
+    async def main():
+        async with scheduler.slot(SOURCE), scheduler.slot(SOURCE):
+            return scheduler.stats()["sources"][0]
+
+    stats = asyncio.run(main())
+
+    assert stats["active"] == 2
+    assert stats["queued"] == 0
+    assert stats["admitted"] == 2
+    assert scheduler.stats()["sources"][0]["active"] == 0
+
+
+def test_users_are_served_round_robin():
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    order = asyncio.run(admission_order(scheduler, [
+        ("alice", "interactive", "a1"), ("alice", "interactive", "a2"), ("alice", "interactive", "a3"),
+        ("bob", "interactive", "b1")
+    ]))
+
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_higher_classes_go_first():
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    order = asyncio.run(admission_order(scheduler, [
+        ("alice", "background", "bg"), ("alice", "dashboard", "dash"), ("bob", "interactive", "int")
+    ]))
+
+    assert order == ["int", "dash", "bg"]
+
+
+def test_aged_waiters_are_admitted_ahead_of_higher_classes(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_AGING_SECONDS", 0.05)
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    async def main():
+        # The background waiter ages while the interactive one is fresh
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(SOURCE):
+                await release.wait()
+
+        async def query(priority, name):
+            scheduler.set_priority(priority)
+            async with scheduler.slot(SOURCE):
+                order.append(name)
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        background = asyncio.ensure_future(query("background", "bg"))
+        await asyncio.sleep(0.06)
+        interactive = asyncio.ensure_future(query("interactive", "int"))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, background, interactive)
+        return order
+
+    assert asyncio.run(main()) == ["bg", "int"]
+
+
+def test_full_queue_is_rejected(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_MAX_QUEUE", 1)
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(SOURCE):
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        queued = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        try:
+            async with scheduler.slot(SOURCE):
+                pass
+        finally:
+            release.set()
+            await asyncio.gather(holder, queued)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main())
+    assert error.value.status_code == 503
+    assert scheduler.stats()["sources"][0]["rejected"] == 1
+
+
+def test_queue_timeout_removes_the_waiter(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_QUEUE_TIMEOUT_SECONDS", 0.02)
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(SOURCE):
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(HTTPException) as error:
+                async with scheduler.slot(SOURCE):
+                    pass
+            return error.value.status_code, scheduler.stats()["sources"][0]
+        finally:
+            release.set()
+            await holder
+
+    status_code, stats = asyncio.run(main())
+
+    assert status_code == 503
+    assert stats["timeouts"] == 1
+    assert stats["queued"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue_and_frees_nothing():
+    scheduler = QueryScheduler(enabled=True, default_limit=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(SOURCE):
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        stats = scheduler.stats()["sources"][0]
+        release.set()
+        await holder
+        return stats
+
+    stats = asyncio.run(main())
+
+    assert stats["queued"] == 0
+    assert stats["active"] == 1
+    assert scheduler.stats()["sources"][0]["active"] == 0
+
+
+def test_disabled_scheduler_never_queues():
+    scheduler = QueryScheduler(enabled=False, default_limit=1)
+
+    async def main():
+        async with scheduler.slot(SOURCE), scheduler.slot(SOURCE):
+            return scheduler.stats()["sources"]
+
+    assert asyncio.run(main()) == []
+
+
+def test_source_key_ignores_credentials():
+    scheduler = QueryScheduler(enabled=True)
+    primary = {"db_type": "postgresql", "host": "db", "port": 5432, "database_name": "app", "username": "a"}
+
+    assert scheduler.source_key(primary) == scheduler.source_key({**primary, "username": "b", "password": "x"})
+    assert scheduler.source_key(primary) != scheduler.source_key({**primary, "host": "replica"})
+
+
+class FakeRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+@pytest.mark.parametrize("header,expected", [
+    ({"X-Query-Priority": "background"}, "background"),
+    ({"X-Query-Priority": "bogus"}, "interactive"),
+    ({}, "interactive"),
+])
+def test_priority_middleware_sets_the_scheduling_class(header, expected):
+    async def call_next(request):
+        return _current_priority.get()
+
+    async def main():
+        # A fresh task: the class set by an earlier request must not leak into this one
+        return await asyncio.ensure_future(apply_query_priority(FakeRequest(header), call_next))
+
+    assert asyncio.run(main()) == expected
@@ -0,0 +1,164 @@
+import asyncio
+import sqlite3
+
+import pytest
+import sqlalchemy
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.db_manager import db_manager, SEARCH_SCAN_LIMIT
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    """Answers catalog lookups with canned rows, for planning against servers that are not running"""
+
+    def __init__(self, dialect, rows=()):
+        self.dialect = dialect
+        self.rows = list(rows)
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return FakeResult(self.rows)
+
+
+COLUMNS = [
+    {"name": "id", "type": sqlalchemy.Integer()},
+    {"name": "title", "type": sqlalchemy.String()},
+    {"name": "body", "type": sqlalchemy.Text()},
+]
+
+
+def plan(conn, db_type, columns=COLUMNS, term="50% off_", column=None):
+    return db_manager._plan_search(conn, db_type, "posts", columns, term, column)
+
+
+def test_postgres_prefers_a_tsvector_column():
+    columns = COLUMNS + [{"name": "search_vector", "type": postgresql.TSVECTOR()}]
+
+    strategy, sql, params, searched = plan(FakeConnection(postgresql.dialect()), "postgresql", columns)
+
+    assert strategy == "postgres-tsvector"
+    assert sql == ("SELECT * FROM posts WHERE search_vector @@ plainto_tsquery(:term) "
+                   "LIMIT :search_limit OFFSET :search_offset")
+    assert params == {"term": "50% off_"} and searched == ["search_vector"]
+
+
+def test_postgres_uses_an_expression_fulltext_index():
+    conn = FakeConnection(postgresql.dialect(), [
+        ("CREATE INDEX posts_body_fts ON public.posts USING gin (to_tsvector('english'::regconfig, body))",)
+    ])
+
+    strategy, sql, params, searched = plan(conn, "postgresql")
+
+    assert strategy == "postgres-fulltext-index"
+    assert "to_tsvector('english'::regconfig, body) @@ plainto_tsquery('english'::regconfig, :term)" in sql
+    assert searched == ["body"]
+    # Searching another column cannot use that index
+    assert plan(conn, "postgresql", column="title")[0] == "bounded-scan"
+
+
+def test_postgres_uses_trigram_indexes_for_substring_search():
+    conn = FakeConnection(postgresql.dialect(), [
+        ("CREATE INDEX posts_title_trgm ON public.posts USING gin (title gin_trgm_ops)",)
+    ])
+
+    strategy, sql, params, searched = plan(conn, "postgresql")
+
+    assert strategy == "postgres-trigram-index"
+    assert sql == ("SELECT * FROM posts WHERE title ILIKE :pattern ESCAPE '!' "
+                   "LIMIT :search_limit OFFSET :search_offset")
+    assert params == {"pattern": "%50!% off!_%"} and searched == ["title"]
+
+
+def test_mysql_uses_a_matching_fulltext_index():
+    conn = FakeConnection(mysql.dialect(), [("ft_title_body", "title,body")])
+
+    strategy, sql, params, searched = plan(conn, "mysql")
+
+    assert strategy == "mysql-fulltext"
+    assert "MATCH(title, body) AGAINST (:term IN NATURAL LANGUAGE MODE)" in sql
+    assert "MAX_EXECUTION_TIME" in sql
+    assert searched == ["title", "body"]
+    # A single-column search needs an index on exactly that column
+    assert plan(conn, "mysql", column="title")[0] == "bounded-scan"
+
+
+@pytest.mark.parametrize("dialect,db_type,expected", [
+    (postgresql.dialect(), "postgresql",
+     f"SELECT * FROM (SELECT * FROM posts LIMIT {SEARCH_SCAN_LIMIT}) AS bounded_scan "
+     "WHERE title ILIKE :pattern ESCAPE '!' OR body ILIKE :pattern ESCAPE '!' "
+     "LIMIT :search_limit OFFSET :search_offset"),
+    (sqlite.dialect(), "sqlite",
+     f"SELECT * FROM (SELECT * FROM posts LIMIT {SEARCH_SCAN_LIMIT}) AS bounded_scan "
+     "WHERE title LIKE :pattern ESCAPE '!' OR body LIKE :pattern ESCAPE '!' "
+     "LIMIT :search_limit OFFSET :search_offset"),
+])
+def test_bounded_scan_searches_text_columns(dialect, db_type, expected):
+    strategy, sql, params, searched = plan(FakeConnection(dialect), db_type)
+
+    assert (strategy, sql, searched) == ("bounded-scan", expected, ["title", "body"])
+    assert params == {"pattern": "%50!% off!_%"}
+
+
+def test_bounded_scan_casts_a_non_text_column():
+    sql = plan(FakeConnection(mysql.dialect()), "mysql", column="id")[1]
+
+    assert "WHERE CAST(id AS CHAR) LIKE :pattern ESCAPE '!'" in sql
+    assert sql.startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+
+
+@pytest.fixture
+def posts(tmp_path):
+    path = str(tmp_path / "posts.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, body TEXT)")
+    conn.executemany("INSERT INTO posts (title, body) VALUES (?, ?)", [
+        ("Hello world", "first post"), ("Release notes", "world tour dates"), ("Other", "nothing here")])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def search(path, term, column=None, limit=10):
+    return asyncio.run(db_manager.search_table({"db_type": "sqlite", "database_name": path}, "posts", term,
+                                               column, limit, 0))
+
+
+def test_sqlite_search_uses_an_external_content_fts5_table(posts):
+    conn = sqlite3.connect(posts)
+    conn.execute("CREATE VIRTUAL TABLE posts_fts USING fts5(title, body, content='posts', content_rowid='id')")
+    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+    result = search(posts, "world")
+    title_only = search(posts, "world", column="title")
+
+    assert result["strategy"] == "sqlite-fts5" and result["search_columns"] == ["title", "body"]
+    assert sorted(row["id"] for row in result["data"]) == [1, 2]
+    assert [row["id"] for row in title_only["data"]] == [1]
+
+
+def test_sqlite_search_without_an_index_scans_and_pages(posts):
+    first = search(posts, "o", limit=2)
+
+    assert first["strategy"] == "bounded-scan"
+    assert first["row_count"] == 2 and first["has_more"] is True
+
+
+def test_search_validates_table_and_column(posts):
+    with pytest.raises(ValueError, match="Table 'missing' not found"):
+        asyncio.run(db_manager.search_table({"db_type": "sqlite", "database_name": posts}, "missing", "x"))
+    with pytest.raises(ValueError, match="Column 'nope' not found"):
+        search(posts, "x", column="nope")
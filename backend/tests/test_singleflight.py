@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+
+from app.db_manager import db_manager
+from app.singleflight import SingleFlight, singleflight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"success": True, "data": [1]}
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", fn) for _ in range(5)])
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(result == {"success": True, "data": [1]} for result in results)
+    assert flight.stats() == {"enabled": True, "in_flight": 0, "executions": 1, "coalesced": 4}
+
+
+def test_every_caller_gets_its_own_result_dict():
+    flight = SingleFlight(enabled=True)
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        return {"row_count": 1}
+
+    async def main():
+        return await asyncio.gather(flight.do("k", fn), flight.do("k", fn))
+
+    first, second = asyncio.run(main())
+    first["row_count"] = 99
+
+    assert second["row_count"] == 1
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "boom" for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+    # The failure is not remembered: the next call runs again
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("k", failing))
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight(enabled=True)
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", fn))
+        second = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, first_cancelled = asyncio.run(main())
+
+    assert first_cancelled
+    assert result == {"ok": True}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {}
+
+    async def main():
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+
+    asyncio.run(main())
+
+    assert len(calls) == 2
+
+
+def test_key_ignores_whitespace_outside_quotes_only():
+    connection = {"db_type": "sqlite", "database_name": "x"}
+
+    assert singleflight.key(connection, "SELECT  *\n FROM t;", 10) == singleflight.key(connection, "SELECT * FROM t", 10)
+    assert singleflight.key(connection, "SELECT 'a  b'", 10) != singleflight.key(connection, "SELECT 'a b'", 10)
+    assert singleflight.key(connection, "SELECT 1", 10) != singleflight.key(connection, "SELECT 1", 20)
+    assert singleflight.key(connection, "SELECT 1", 10) != singleflight.key({**connection, "database_name": "y"},
+                                                                            "SELECT 1", 10)
+
+
+@pytest.mark.parametrize("query,is_read", [
+    ("SELECT * FROM t", True),
+    ("  (SELECT 1)", True),
+    ("WITH x AS (SELECT 1) SELECT * FROM x", True),
+    ("SELECT 'insert into' AS label", True),
+    ("SELECT * INTO backup FROM t", False),
+    ("WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x", False),
+    ("UPDATE t SET a = 1", False),
+    ("INSERT INTO t VALUES (1)", False),
+])
+def test_is_read_statement(query, is_read):
+    assert singleflight.is_read_statement(query) is is_read
+
+
+def test_execute_query_coalesces_reads_but_not_writes(sqlite_source, monkeypatch):
+    executions = []
+    admit_and_execute = db_manager._admit_and_execute
+
+    async def counting(*args):
+        executions.append(args[1])
+        await asyncio.sleep(0.02)
+        return await admit_and_execute(*args)
+
+    monkeypatch.setattr(db_manager, "_admit_and_execute", counting)
+    monkeypatch.setattr(singleflight, "enabled", True)
+
+    async def main(query):
+        return await asyncio.gather(*[db_manager.execute_query(sqlite_source, query, 10) for _ in range(3)])
+
+    reads = asyncio.run(main("SELECT COUNT(*) AS n FROM events"))
+    assert [result["data"] for result in reads] == [[{"n": 5}]] * 3
+    assert len(executions) == 1
+
+    asyncio.run(main("UPDATE events SET amount = amount + 1 WHERE id = 1"))
+    assert len(executions) == 4
+
+
+def test_coalesced_callers_do_not_share_rows():
+    flight = SingleFlight(enabled=True)
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        return {"data": [{"a": 1, "nested": {"b": [1]}}], "columns": [{"name": "a"}]}
+
+    async def main():
+        return await asyncio.gather(flight.do("k", fn), flight.do("k", fn), flight.do("k", fn))
+
+    first, second, third = asyncio.run(main())
+    first["data"][0]["a"] = 99
+    first["data"][0]["nested"]["b"].append(2)
+    first["columns"].clear()
+    second["data"].append({"a": 2})
+
+    assert third == {"data": [{"a": 1, "nested": {"b": [1]}}], "columns": [{"name": "a"}]}
+    assert second["data"][0] == {"a": 1, "nested": {"b": [1]}}
+
+
+def test_a_lone_caller_gets_the_result_without_a_copy():
+    flight = SingleFlight(enabled=True)
+    result = {"data": [{"a": 1}]}
+
+    async def fn():
+        return result
+
+    assert asyncio.run(flight.do("k", fn)) is result
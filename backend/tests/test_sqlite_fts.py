@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from app.db_manager import db_manager
+from app.sqlite_fts import sqlite_fts_manager
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "library.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title VARCHAR(200), notes TEXT, pages INTEGER)")
+    conn.executemany("INSERT INTO books (title, notes, pages) VALUES (?, ?, ?)", [
+        ("The Sea", "a quiet novel", 200),
+        ("Sea charts", 'maps of the "open sea" and the sea floor', 90),
+        ("Mountains", "no water at all", 150),
+        ("Rivers", "where rivers meet the sea", 120),
+    ])
+    conn.execute("CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER)")
+    conn.execute("CREATE TABLE tags (name TEXT PRIMARY KEY, label TEXT) WITHOUT ROWID")
+    conn.execute("CREATE VIRTUAL TABLE notes_fts USING fts5(body)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def search(path, term, column=None, limit=10, offset=0):
+    info = sqlite_fts_manager.get_index_info(path)["books"]
+    return sqlite_fts_manager.search(path, "books", info["fts_table"], term, column, limit, offset, 5000)
+
+
+def test_build_indexes_text_columns_of_rowid_tables(source):
+    built = sqlite_fts_manager.build_index(source)
+
+    assert built["index_path"] == source + ".fts" and os.path.exists(built["index_path"])
+    assert not os.path.exists(built["index_path"] + ".building")
+    # Integer-only, WITHOUT ROWID and virtual tables are skipped
+    assert built["tables"] == [{"table": "books", "columns": ["title", "notes"], "row_count": 4}]
+
+    info = sqlite_fts_manager.get_index_info(source)
+    assert list(info) == ["books"]
+    assert info["books"]["columns"] == ["title", "notes"] and info["books"]["row_count"] == 4
+
+
+def test_search_returns_source_rows_by_rank(source):
+    sqlite_fts_manager.build_index(source)
+
+    columns, rows = search(source, "sea")
+
+    assert columns == ["id", "title", "notes", "pages"]
+    assert sorted(row["id"] for row in rows) == [1, 2, 4]
+    # The row mentioning the term most often ranks first
+    assert rows[0]["id"] == 2 and rows[0]["pages"] == 90
+    assert [row["id"] for row in search(source, "sea", column="title")[1]] in ([1, 2], [2, 1])
+    assert len(search(source, "sea", limit=2)[1]) == 2 and len(search(source, "sea", limit=2, offset=2)[1]) == 1
+    # The term is matched as a phrase, so quotes and FTS syntax are literal
+    assert [row["id"] for row in search(source, '"open sea"')[1]] == [2]
+    assert search(source, "sea OR water")[1] == []
+
+
+def test_index_goes_stale_when_the_source_changes(source):
+    sqlite_fts_manager.build_index(source)
+    conn = sqlite3.connect(source)
+    conn.execute("INSERT INTO books (title, notes, pages) VALUES ('Sea again', 'more sea', 10)")
+    conn.commit()
+    conn.close()
+
+    assert sqlite_fts_manager.get_index_info(source) is None
+    assert sqlite_fts_manager.delete_index(source) is True
+    assert sqlite_fts_manager.delete_index(source) is False
+
+
+def test_missing_or_corrupt_index(source, tmp_path):
+    with pytest.raises(ValueError, match="SQLite file not found"):
+        sqlite_fts_manager.build_index(str(tmp_path / "missing.sqlite"))
+    assert sqlite_fts_manager.get_index_info(source) is None
+
+    with open(sqlite_fts_manager.index_path(source), "wb") as index:
+        index.write(b"not a database" * 100)
+    assert sqlite_fts_manager.get_index_info(source) is None
+
+
+def test_table_search_prefers_a_fresh_side_index(source):
+    connection_data = {"db_type": "sqlite", "database_name": source}
+
+    def table_search(term, column=None):
+        return asyncio.run(db_manager.search_table(connection_data, "books", term, column, 2, 0))
+
+    assert table_search("sea")["strategy"] != "sqlite-fts5-side-index"
+
+    sqlite_fts_manager.build_index(source)
+    result = table_search("sea")
+    assert result["strategy"] == "sqlite-fts5-side-index" and result["search_columns"] == ["title", "notes"]
+    assert result["row_count"] == 2 and result["has_more"] is True
+    # A column the index does not cover falls back to a plain search
+    assert table_search("90", column="pages")["strategy"] != "sqlite-fts5-side-index"
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import json
+
+import pytest
+
+from app.live import LiveHub
+from app.tracing import Tracer, tracer as global_tracer
+
+
+def test_nested_spans_form_one_trace():
+    tracer = Tracer(enabled=True)
+
+    with tracer.span("request", path="/x") as root:
+        with tracer.span("db.execute") as child:
+            with tracer.span("db.driver.execute") as grandchild:
+                trace_id = tracer.current_trace_id()
+        with tracer.span("serialize"):
+            pass
+
+    trace = tracer.get_trace(trace_id)
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert trace["name"] == "request"
+    assert [span["name"] for span in trace["spans"]] == ["request", "db.execute", "db.driver.execute", "serialize"]
+    assert spans["request"]["parent_id"] is None and spans["request"]["attributes"] == {"path": "/x"}
+    assert spans["db.execute"]["parent_id"] == root.span_id
+    assert spans["db.driver.execute"]["parent_id"] == child.span_id
+    assert spans["serialize"]["parent_id"] == root.span_id
+    assert grandchild.trace is root.trace
+    assert tracer.current_trace_id() is None
+
+
+def test_errors_are_recorded_and_reraised():
+    tracer = Tracer(enabled=True)
+
+    with pytest.raises(KeyError):
+        with tracer.span("request"):
+            with tracer.span("lookup"):
+                raise KeyError("missing")
+
+    spans = tracer.get_traces()[0]["spans"]
+    assert [span["error"] for span in spans] == ["KeyError: 'missing'"] * 2
+
+
+def test_worker_threads_join_the_trace():
+    tracer = Tracer(enabled=True)
+
+    def work():
+        with tracer.span("worker"):
+            pass
+
+    async def main():
+        with tracer.span("request") as root:
+            await asyncio.to_thread(work)
+            return root.span_id
+
+    root_id = asyncio.run(main())
+
+    assert tracer.get_traces()[0]["spans"][1]["parent_id"] == root_id
+
+
+def test_span_opened_after_the_root_finished_starts_a_new_trace():
+    tracer = Tracer(enabled=True)
+
+    with tracer.span("request"):
+        # What a task created during the request (e.g. a live producer) carries around
+        leftover = contextvars.copy_context()
+
+    def refresh():
+        with tracer.span("refresh"):
+            return tracer.current_trace_id()
+
+    first_id, second_id = leftover.run(refresh), leftover.run(refresh)
+
+    traces = tracer.get_traces()
+    request = next(trace for trace in traces if trace["name"] == "request")
+    assert [span["name"] for span in request["spans"]] == ["request"]
+    assert first_id != second_id and first_id != request["trace_id"]
+    assert [trace["name"] for trace in traces[:2]] == ["refresh", "refresh"]
+
+
+def test_live_producer_does_not_inherit_the_request_span(monkeypatch):
+    monkeypatch.setattr(global_tracer, "enabled", True)
+    hub = LiveHub()
+    parents = []
+
+    async def producer(publish):
+        with global_tracer.span("live.refresh") as span:
+            parents.append(span.parent_id)
+        publish({"type": "snapshot"})
+
+    async def main():
+        with global_tracer.span("request"):
+            async with hub.subscribe("topic", producer) as queue:
+                return await asyncio.wait_for(queue.get(), 1)
+
+    assert asyncio.run(main()) == {"type": "snapshot"}
+    assert parents == [None]
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+
+    with tracer.span("request") as span:
+        assert span is None
+
+    assert tracer.get_traces() == []
+
+
+def test_buffer_filter_and_export(tmp_path):
+    export_file = tmp_path / "traces.jsonl"
+    tracer = Tracer(enabled=True, buffer_size=2, export_file=str(export_file))
+
+    for name in ("a", "b", "c"):
+        with tracer.span(name):
+            pass
+
+    assert [trace["name"] for trace in tracer.get_traces()] == ["c", "b"]
+    assert tracer.get_traces(min_duration_ms=60_000) == []
+    exported = [json.loads(line) for line in export_file.read_text().splitlines()]
+    assert [trace["name"] for trace in exported] == ["a", "b", "c"]
+    assert exported[0]["spans"][0]["duration_ms"] >= 0
+
+    tracer.configure(buffer_size=1)
+    assert [trace["name"] for trace in tracer.get_traces()] == ["c"]
+    tracer.clear()
+    assert tracer.get_traces() == []
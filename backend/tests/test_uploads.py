@@ -0,0 +1,180 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.uploads import UploadManager
+
+USER = 7
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return UploadManager(data_dir=str(tmp_path / "data"), max_size_mb=1)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Bytes of a valid SQLite file of a few pages"""
+    path = tmp_path / "source.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO t (name) VALUES (?)", [("x" * 200,) for _ in range(100)])
+    conn.commit()
+    conn.close()
+    return path.read_bytes()
+
+
+async def stream(data, chunk_size=1000, consumed=None):
+    for start in range(0, len(data), chunk_size):
+        if consumed is not None:
+            consumed.append(start)
+        yield data[start:start + chunk_size]
+
+
+def put(manager, upload_id, offset, data, **kwargs):
+    return asyncio.run(manager.write_chunk(upload_id, USER, offset, stream(data, **kwargs)))
+
+
+def part_size(manager, upload_id):
+    return os.path.getsize(os.path.join(manager.sessions_dir, f"{upload_id}.part"))
+
+
+def test_upload_resumes_from_any_received_offset(manager, database):
+    upload_id = manager.create_session("app.sqlite", len(database), USER)["upload_id"]
+
+    assert put(manager, upload_id, 0, database[:5000])["received"] == 5000
+    # The client lost the reply to its second chunk and resends from an earlier offset
+    assert put(manager, upload_id, 4096, database[4096:8000])["received"] == 8000
+    assert manager.get_status(upload_id, USER)["received"] == 8000
+    assert put(manager, upload_id, 8000, database[8000:])["received"] == len(database)
+
+    path = asyncio.run(manager.complete_session(upload_id, USER))
+
+    with open(path, "rb") as f:
+        assert f.read() == database
+    assert os.listdir(manager.sessions_dir) == []
+
+
+def test_offset_past_the_received_size_is_refused(manager, database):
+    upload_id = manager.create_session("app.sqlite", len(database), USER)["upload_id"]
+    put(manager, upload_id, 0, database[:1000])
+
+    with pytest.raises(HTTPException) as error:
+        put(manager, upload_id, 2000, database[2000:3000])
+
+    assert error.value.status_code == 409
+
+
+def test_oversize_chunk_is_cut_off_while_streaming(manager, database):
+    upload_id = manager.create_session("app.sqlite", 3000, USER)["upload_id"]
+    put(manager, upload_id, 0, database[:1000])
+    consumed = []
+
+    with pytest.raises(HTTPException) as error:
+        put(manager, upload_id, 1000, database[1000:], consumed=consumed)
+
+    assert error.value.status_code == 400 and "declared upload size" in error.value.detail
+    # Reading stopped at the chunk that crossed the declared size
+    assert len(consumed) == 3
+    assert manager.get_status(upload_id, USER)["received"] == 1000
+    assert part_size(manager, upload_id) == 1000
+
+
+def test_uploads_over_the_limit_are_refused_up_front(manager):
+    with pytest.raises(HTTPException) as error:
+        manager.create_session("big.sqlite", 2 * 1024 * 1024, USER)
+
+    assert error.value.status_code == 413
+
+
+@pytest.mark.parametrize("filename,data,status", [
+    ("app.sqlite", b"PK\x03\x04 not a database" * 10, 400),
+    ("notes.txt", b"", 400),
+])
+def test_bad_files_are_rejected(manager, filename, data, status):
+    with pytest.raises(HTTPException) as error:
+        upload_id = manager.create_session(filename, len(data) or 1, USER)["upload_id"]
+        put(manager, upload_id, 0, data)
+
+    assert error.value.status_code == status
+    if filename.endswith(".sqlite"):
+        assert manager.get_status(upload_id, USER)["received"] == 0
+        assert part_size(manager, upload_id) == 0
+
+
+def test_incomplete_and_foreign_sessions(manager, database):
+    upload_id = manager.create_session("app.sqlite", len(database), USER)["upload_id"]
+    put(manager, upload_id, 0, database[:1000])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(manager.complete_session(upload_id, USER))
+    assert error.value.status_code == 409
+    with pytest.raises(HTTPException) as error:
+        manager.get_status(upload_id, USER + 1)
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        manager.get_status("../../etc/passwd", USER)
+    assert error.value.status_code == 404
+
+
+def test_concurrent_puts_to_one_session_are_serialised(manager, database):
+    upload_id = manager.create_session("app.sqlite", len(database), USER)["upload_id"]
+    active = []
+
+    async def slow(data):
+        active.append(1)
+        assert len(active) == 1
+        async for chunk in stream(data):
+            await asyncio.sleep(0)
+            yield chunk
+        active.pop()
+
+    async def main():
+        return await asyncio.gather(*[manager.write_chunk(upload_id, USER, 0, slow(database)) for _ in range(2)])
+
+    results = asyncio.run(main())
+
+    assert [result["received"] for result in results] == [len(database)] * 2
+    assert asyncio.run(manager.complete_session(upload_id, USER))
+
+
+def test_cleanup_removes_only_idle_sessions(manager, database):
+    expired = manager.create_session("old.sqlite", 10, USER)["upload_id"]
+    active = manager.create_session("new.sqlite", 10, USER)["upload_id"]
+    old = time.time() - 48 * 3600
+    for name in os.listdir(manager.sessions_dir):
+        os.utime(os.path.join(manager.sessions_dir, name), (old, old))
+    os.utime(os.path.join(manager.sessions_dir, f"{active}.part"))
+
+    manager.cleanup_expired_sessions()
+
+    assert sorted(os.listdir(manager.sessions_dir)) == [f"{active}.json", f"{active}.part"]
+    with pytest.raises(HTTPException):
+        manager.get_status(expired, USER)
+
+
+def test_cleanup_skips_a_session_being_written(manager):
+    upload_id = manager.create_session("app.sqlite", 10, USER)["upload_id"]
+    old = time.time() - 48 * 3600
+    for name in os.listdir(manager.sessions_dir):
+        os.utime(os.path.join(manager.sessions_dir, name), (old, old))
+
+    async def main():
+        async with manager._session_lock(upload_id):
+            manager.cleanup_expired_sessions()
+
+    asyncio.run(main())
+
+    assert len(os.listdir(manager.sessions_dir)) == 2
+
+
+def test_abort_removes_the_session(manager):
+    upload_id = manager.create_session("app.sqlite", 10, USER)["upload_id"]
+
+    asyncio.run(manager.abort_session(upload_id, USER))
+
+    assert os.listdir(manager.sessions_dir) == []